@@ -0,0 +1,331 @@
+# analysis.py
+# Shared engine-analysis helpers for the coach: a position-keyed LRU cache so the same
+# position is never sent to the engine twice for the same search budget, a background
+# worker so engine calls never run on the pygame thread, speculative "ponder" analysis
+# that fills the cache while the human is thinking, and a streaming (infinite) analysis
+# that deepens the current position in place.
+
+import itertools
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import chess
+import chess.polyglot
+
+
+def limit_key(limit) -> Tuple:
+    """Hashable summary of a chess.engine.Limit (only the fields we ever set)."""
+    return (limit.time, limit.depth, limit.nodes, limit.mate)
+
+
+def limit_covers(have: Tuple, want: Tuple) -> bool:
+    """True if a search run with `have` is at least as thorough as one run with `want`
+    (same kind of limit, every bound >=). Lets a 0.25 s result answer a 0.2 s request."""
+    if have == want:
+        return True
+    if have[3] != want[3]:
+        return False
+    for h, w in zip(have[:3], want[:3]):
+        if (h is None) != (w is None):
+            return False
+        if w is not None and h < w:
+            return False
+    return True
+
+
+class AnalysisCache:
+    """
+    LRU cache of engine `analyse` results keyed by zobrist hash, then by search limit.
+    - a lookup is answered by an exact limit or by any stored search that covers it.
+    - maxsize (positions) <= 0 disables caching (every call goes to the engine).
+    - hits / misses are counted for the sidebar / debugging (peek() counts neither).
+    - safe to share between the UI thread and an AnalysisWorker.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[int, Dict[Tuple, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _find(self, zkey: int, lkey: Tuple) -> Optional[dict]:
+        by_limit = self.entries.get(zkey)  # caller holds _lock
+        if by_limit is None:
+            return None
+        info = by_limit.get(lkey)
+        if info is None:
+            info = next((v for k, v in by_limit.items() if limit_covers(k, lkey)), None)
+        return info
+
+    def peek(self, board: chess.Board, limit) -> Optional[dict]:
+        """get() without counting a hit or miss or refreshing the entry's LRU position."""
+        zkey, lkey = chess.polyglot.zobrist_hash(board), limit_key(limit)
+        with self._lock:
+            return self._find(zkey, lkey)
+
+    def get(self, board: chess.Board, limit) -> Optional[dict]:
+        zkey, lkey = chess.polyglot.zobrist_hash(board), limit_key(limit)
+        with self._lock:
+            info = self._find(zkey, lkey)
+            if info is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(zkey)
+            self.hits += 1
+            return info
+
+    def put(self, board: chess.Board, limit, info: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        zkey = chess.polyglot.zobrist_hash(board)
+        with self._lock:
+            self.entries.setdefault(zkey, {})[limit_key(limit)] = info
+            self.entries.move_to_end(zkey)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def analyse(self, engine, board: chess.Board, limit) -> dict:
+        """engine.analyse(board, limit), answered from the cache when possible."""
+        info = self.get(board, limit)
+        if info is None:
+            info = engine.analyse(board, limit)
+            self.put(board, limit, info)
+        return info
+
+    def analyse_many(self, engine, boards: List[chess.Board], limits: List) -> List[dict]:
+        """analyse() for several positions; the misses go to the engine as one batch when it
+        can run them concurrently (EnginePool.analyse_many), otherwise one after another."""
+        infos = [self.get(b, lim) for b, lim in zip(boards, limits)]
+        todo = [i for i, info in enumerate(infos) if info is None]
+        if todo and hasattr(engine, "analyse_many"):
+            fresh = engine.analyse_many([boards[i] for i in todo], [limits[i] for i in todo])
+        else:
+            fresh = [engine.analyse(boards[i], limits[i]) for i in todo]
+        for i, info in zip(todo, fresh):
+            self.put(boards[i], limits[i], info)
+            infos[i] = info
+        return infos
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class AnalysisWorker:
+    """
+    Single background thread that runs coach jobs (engine analysis, bot moves) in
+    priority order and hands results back as concurrent.futures.Future objects.
+    The UI thread only ever submits work and polls `future.done()`, so it never blocks.
+    One thread is enough: every job ends up talking to the same engine process.
+    on_done (optional) is called on the worker thread after each job, e.g. to wake an idle UI.
+    """
+
+    URGENT, NORMAL, IDLE = 0, 1, 2
+
+    def __init__(self, name: str = "pybot-analysis", on_done: Optional[Callable[[], None]] = None):
+        self.on_done = on_done
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args, priority: int = NORMAL) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            self._pending.add(fut)
+        fut.add_done_callback(self._forget)
+        self._queue.put((priority, next(self._seq), fut, fn, args))
+        return fut
+
+    def _forget(self, fut: Future) -> None:
+        with self._lock:
+            self._pending.discard(fut)
+
+    @property
+    def busy(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def cancel_pending(self) -> None:
+        """Cancel every job that has not started yet (the running one finishes)."""
+        with self._lock:
+            pending = list(self._pending)
+        for fut in pending:
+            fut.cancel()
+
+    def _run(self) -> None:
+        while True:
+            _, _, fut, fn, args = self._queue.get()
+            if fut is None:
+                return
+            if not fut.set_running_or_notify_cancel():
+                continue  # cancelled while queued
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as e:  # surfaced to the caller via fut.result()
+                fut.set_exception(e)
+            if self.on_done is not None:
+                self.on_done()
+
+    def close(self, timeout: float = 2.0) -> None:
+        self.cancel_pending()
+        self._queue.put((-1, next(self._seq), None, None, None))
+        self._thread.join(timeout)
+
+
+class Ponderer:
+    """
+    Speculative analysis while the human is thinking. Analyses the current position with
+    multipv=top_n, caches it, then analyses the position after each candidate reply, all at
+    IDLE priority on the shared AnalysisWorker. When the human plays one of the candidates,
+    coaching for that move is a cache hit.
+    - budget caps the engine seconds spent per position (time limits only).
+    - start() on a new position cancels whatever is still queued for the old one.
+    """
+
+    def __init__(self, worker: AnalysisWorker, cache: AnalysisCache, top_n: int = 3, budget: float = 1.0):
+        self.worker = worker
+        self.cache = cache
+        self.top_n = top_n
+        self.budget = budget
+        self._gen = 0
+        self._jobs: List[Future] = []
+        self._lock = threading.Lock()
+
+    def start(self, engine, board: chess.Board, limit) -> None:
+        if self.top_n <= 0 or engine is None:
+            return
+        self.cancel()
+        with self._lock:
+            gen = self._gen
+            self._jobs.append(self.worker.submit(self._root, engine, board.copy(), limit, gen,
+                                                 priority=AnalysisWorker.IDLE))
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._gen += 1
+            jobs, self._jobs = self._jobs, []
+        for fut in jobs:
+            fut.cancel()
+
+    def _root(self, engine, board: chess.Board, limit, gen: int) -> None:
+        infos = engine.analyse(board, limit, multipv=self.top_n)
+        if not infos:
+            return
+        if self.cache.peek(board, limit) is None:
+            self.cache.put(board, limit, infos[0])
+        cost = limit.time or 0.0
+        spent = cost
+        for info in infos:
+            pv = info.get("pv")
+            if not pv or spent + cost > self.budget:
+                break
+            spent += cost
+            child = board.copy(stack=False)
+            child.push(pv[0])
+            with self._lock:
+                if gen != self._gen:
+                    return  # board changed while we were searching
+                self._jobs.append(self.worker.submit(self.cache.analyse, engine, child, limit,
+                                                     priority=AnalysisWorker.IDLE))
+
+
+class AnalysisStream:
+    """
+    One infinite `engine.analysis()` per position, deepened in place on its own thread.
+    - request(board) switches position: the running search is stopped and a new one started.
+    - snapshot() returns (version, info) where info merges every update for the current
+      position (depth, score, pv, ...); version bumps on each update so callers can redraw lazily.
+    - on_update (optional) is called on the stream thread after each update.
+    - if the engine fails (won't start, dies, rejects the position) the stream stops for good:
+      `error` holds the exception and on_update is called once more.
+    While a stream is running it owns the engine: don't issue `analyse` calls on the same engine.
+    """
+
+    def __init__(self, engine, name: str = "pybot-stream", on_update: Optional[Callable[[], None]] = None):
+        self.engine = engine
+        self.on_update = on_update
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._want: Optional[chess.Board] = None
+        self._gen = 0
+        self._result = None
+        self._closing = False
+        self.version = 0
+        self.info: dict = {}
+        self.error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def request(self, board: chess.Board) -> None:
+        with self._lock:
+            self._want = board.copy()
+            self._gen += 1
+            self.info = {}
+            self.version += 1
+            running = self._result
+        if running is not None:
+            running.stop()
+        self._wake.set()
+
+    def snapshot(self) -> Tuple[int, dict]:
+        with self._lock:
+            return self.version, dict(self.info)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                if self._closing:
+                    return
+                board, gen = self._want, self._gen
+            if board is None or board.is_game_over():
+                continue
+            try:
+                with self.engine.analysis(board) as result:
+                    with self._lock:
+                        if gen != self._gen:
+                            continue  # superseded before it started; __exit__ stops it
+                        self._result = result
+                    for info in result:
+                        with self._lock:
+                            if gen != self._gen:
+                                break
+                            if not ("score" in info or "pv" in info):
+                                continue  # skip currmove / hashfull chatter
+                            self.info.update(info)
+                            self.version += 1
+                        if self.on_update is not None:
+                            self.on_update()
+            except Exception as e:
+                with self._lock:
+                    self._result = None
+                    self.error = e
+                    self.version += 1
+                if self.on_update is not None:
+                    self.on_update()
+                return
+            finally:
+                with self._lock:
+                    self._result = None
+
+    def close(self, timeout: float = 2.0) -> None:
+        with self._lock:
+            self._closing = True
+            self._gen += 1
+            running = self._result
+        if running is not None:
+            running.stop()
+        self._wake.set()
+        self._thread.join(timeout)
@@ -0,0 +1,220 @@
+# annotate.py
+# Headless batch annotation of PGN archives with PyBot's coach: every move gets the eval,
+# the engine's best move, a good / inaccuracy / blunder verdict, hanging pieces (by static
+# exchange), and the forks and pins on the board.
+# Games are streamed one at a time and spread over a process pool (one engine per worker);
+# output is written in input order, and --resume continues an interrupted run.
+#
+#   python3 annotate.py students.pgn graded.pgn --engine /usr/bin/stockfish --workers 8
+#   python3 annotate.py students.pgn graded.jsonl --resume
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chess
+import chess.engine
+import chess.pgn
+
+import coach
+from chess_ai import ChessAI
+from search import Searcher
+
+# (game index, headers, starting FEN or None, moves in UCI) — cheap to pickle, parsed once
+Task = Tuple[int, Dict[str, str], Optional[str], List[str]]
+NAGS = {"inaccuracy": chess.pgn.NAG_DUBIOUS_MOVE, "blunder": chess.pgn.NAG_BLUNDER}
+
+
+# ---------------- annotation (runs in the workers) ----------------
+def annotate_game(bot: ChessAI, start: chess.Board, moves: List[chess.Move], think: float) -> List[dict]:
+    """One record per move. Each position is analysed once: the eval after move i is also
+    the reference for move i + 1."""
+    board = start.copy()
+    analysis = coach.engine_eval_and_pv(bot, board, time_limit=think)
+    records = []
+    for ply, move in enumerate(moves, 1):
+        before_cp, best_pv = analysis
+        san = board.san(move)
+        best = best_pv[0] if best_pv else None
+        best_san = board.san(best) if best is not None else None
+        suggestion = coach.describe_move(board, best) if best is not None else None
+        mover = board.turn
+        board.push(move)
+        analysis = coach.engine_eval_and_pv(bot, board, time_limit=think)
+        after_cp = analysis[0]
+        loss = None
+        verdict = None
+        if before_cp is not None and after_cp is not None:
+            loss = 0 if move == best else coach.cp_loss(before_cp, after_cp, mover)
+            verdict = coach.classify_loss(loss)
+        records.append({
+            "ply": ply, "move": san, "uci": move.uci(), "side": coach.side_word(mover),
+            "eval": after_cp, "best": best_san, "best_uci": best.uci() if best is not None else None,
+            "loss": loss, "verdict": verdict, "suggestion": suggestion if verdict not in (None, "good") else None,
+            "hanging": [coach.human_square(s) for s in coach.find_hanging_pieces(board, mover)],
+            **_motifs(board, mover),
+        })
+    return records
+
+def _motifs(board: chess.Board, mover: bool) -> dict:
+    """Forks the mover now has, and every pin on the board, as square names."""
+    rep = coach.state_for(board).tactics
+    name = coach.human_square
+    return {"forks": [{"piece": board.piece_at(f.square).symbol().upper() + name(f.square),
+                       "targets": [name(t) for t in f.targets]} for f in rep.forks if f.color == mover],
+            "pins": [{"piece": board.piece_at(p.square).symbol().upper() + name(p.square),
+                      "side": coach.side_word(board.color_at(p.square)), "by": name(p.pinner)} for p in rep.pins]}
+
+def comment_for(rec: dict) -> str:
+    parts = []
+    if rec["verdict"] == "blunder":
+        parts.append(f"Blunder (-{rec['loss']} cp). Better: {rec['best']} ({rec['suggestion']}).")
+    elif rec["verdict"] == "inaccuracy":
+        parts.append(f"Not the best (-{rec['loss']} cp). Better: {rec['best']}.")
+    if rec["hanging"]:
+        parts.append(f"Hanging: {', '.join(rec['hanging'])}.")
+    for f in rec["forks"]:
+        parts.append(f"Fork: {f['piece']} hits {', '.join(f['targets'])}.")
+    return " ".join(parts)
+
+def to_pgn(headers: Dict[str, str], start: chess.Board, moves: List[chess.Move], records: List[dict]) -> str:
+    game = chess.pgn.Game()
+    game.headers.update(headers)
+    if start.fen() != chess.STARTING_FEN:
+        game.setup(start)
+    game.headers.setdefault("Annotator", "PyBot")
+    node = game
+    for i, move in enumerate(moves):
+        if i >= len(records):
+            node = node.add_variation(move)
+            continue
+        rec = records[i]
+        node = node.add_variation(move, comment=comment_for(rec))
+        if rec["verdict"] in NAGS:
+            node.nags.add(NAGS[rec["verdict"]])
+        if rec["eval"] is not None:
+            node.set_eval(chess.engine.PovScore(chess.engine.Cp(rec["eval"]), chess.WHITE))
+    return str(game) + "\n\n"
+
+_bot: Optional[ChessAI] = None
+_opts: Optional[argparse.Namespace] = None
+
+def _init_worker(opts: argparse.Namespace) -> None:
+    global _bot, _opts
+    _opts = opts
+    coach.ANALYSIS_CACHE.maxsize = opts.analysis_cache  # openings repeat across games
+    engine = None
+    if opts.engine:
+        try:
+            engine = chess.engine.SimpleEngine.popen_uci(opts.engine)
+            if "Threads" in engine.options: engine.configure({"Threads": 1})
+            # quit the engine when the pool shuts this worker down
+            mp.util.Finalize(engine, engine.quit, exitpriority=10)
+        except Exception as e:
+            print(f"[PyBot] Engine failed to start in worker: {e}. Using the built-in search.")
+            engine = None
+    _bot = ChessAI(engine=engine or Searcher())
+
+def _annotate_task(task: Task) -> Tuple[int, str]:
+    index, headers, fen, ucis = task
+    start = chess.Board(fen) if fen else chess.Board()
+    moves = [chess.Move.from_uci(u) for u in ucis]
+    try:
+        records = annotate_game(_bot, start, moves, _opts.time)
+    except Exception as e:  # keep the game (unannotated) rather than stall or drop the archive
+        records = []
+        headers = dict(headers, Annotator=f"PyBot (failed: {e})")
+    if _opts.format == "jsonl":
+        return index, json.dumps({"game": index, "headers": headers, "moves": records}) + "\n"
+    return index, to_pgn(headers, start, moves, records)
+
+
+# ---------------- streaming driver ----------------
+def read_tasks(path: str, skip: int = 0) -> Iterator[Task]:
+    """Games from a PGN file, one at a time (never the whole file in memory)."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for _ in range(skip):
+            if not chess.pgn.skip_game(f):
+                return
+        index = skip
+        while True:
+            game = chess.pgn.read_game(f)
+            if game is None:
+                return
+            fen = game.headers.get("FEN") if game.headers.get("SetUp") == "1" else None
+            yield index, dict(game.headers), fen, [m.uci() for m in game.mainline_moves()]
+            index += 1
+
+def load_progress(path: str) -> Tuple[int, int]:
+    try:
+        with open(path) as f:
+            p = json.load(f)
+        return p["games"], p["offset"]
+    except (OSError, ValueError, KeyError):
+        return 0, 0
+
+def save_progress(path: str, games: int, offset: int) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"games": games, "offset": offset}, f)
+    os.replace(tmp, path)
+
+def run(opts: argparse.Namespace) -> int:
+    progress = opts.out + ".progress"
+    done, offset = load_progress(progress) if opts.resume else (0, 0)
+    mode = "r+b" if done and os.path.exists(opts.out) else "wb"
+    if mode == "wb":
+        done = offset = 0
+    t0 = time.perf_counter()
+    written = 0
+    with open(opts.out, mode) as out, mp.get_context("spawn").Pool(opts.workers, initializer=_init_worker,
+                                                                    initargs=(opts,)) as pool:
+        out.truncate(offset)  # drop a game that was half-written when the last run stopped
+        out.seek(offset)
+        if done:
+            print(f"[PyBot] Resuming after {done} games")
+        pending: deque = deque()
+        window = 4 * opts.workers  # bounded read-ahead keeps memory flat on huge archives
+        tasks = read_tasks(opts.pgn, skip=done)
+        while True:
+            while len(pending) < window:
+                task = next(tasks, None)
+                if task is None or (opts.max_games and task[0] >= opts.max_games):
+                    break
+                pending.append(pool.apply_async(_annotate_task, (task,)))
+            if not pending:
+                break
+            _, text = pending.popleft().get()
+            out.write(text.encode("utf-8"))
+            out.flush()
+            done += 1; written += 1
+            save_progress(progress, done, out.tell())
+            if written % opts.log_every == 0:
+                print(f"[PyBot] Annotated {done} games ({written / (time.perf_counter() - t0):.2f} games/s)")
+    print(f"[PyBot] Done: {done} games annotated → {opts.out}")
+    return done
+
+def main():
+    ap = argparse.ArgumentParser(description="Annotate a PGN archive with PyBot's coach (headless)")
+    ap.add_argument("pgn", help="input PGN (any size; read one game at a time)")
+    ap.add_argument("out", help="output file: annotated PGN, or JSONL when it ends in .jsonl")
+    ap.add_argument("--engine", type=str, default="", help="UCI engine (auto-detected; built-in search if none)")
+    ap.add_argument("--time", type=float, default=0.1, help="engine seconds per position")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="annotation processes (one engine each)")
+    ap.add_argument("--format", choices=["pgn", "jsonl"], default=None, help="output format (default: from extension)")
+    ap.add_argument("--resume", action="store_true", help="continue an interrupted run (uses OUT.progress)")
+    ap.add_argument("--max-games", type=int, default=0, help="stop after this many games (0 = all)")
+    ap.add_argument("--analysis-cache", type=int, default=4096, help="positions cached per worker")
+    ap.add_argument("--log-every", type=int, default=50)
+    opts = ap.parse_args()
+    opts.format = opts.format or ("jsonl" if opts.out.endswith(".jsonl") else "pgn")
+    opts.engine = coach.autodetect_engine(opts.engine)
+    print(f"[PyBot] Engine: {opts.engine or 'built-in search'} | {opts.workers} workers | {opts.format}")
+    run(opts)
+
+if __name__ == "__main__":
+    main()
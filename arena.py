@@ -0,0 +1,374 @@
+# arena.py
+# Headless matches between two PyBot configurations, for deciding whether a change made the
+# bot stronger. Games are played in a process pool (one engine per worker when a player uses
+# one), in pairs: both games of a pair start from the same opening with colours swapped, so
+# an unbalanced opening cancels out. Openings come from a FEN/EPD file, a walk through an
+# opening book, or a few random plies. After every pair the match reports Elo with a 95%
+# interval, and an SPRT stops it as soon as "A is at least elo1 stronger" or "A is no
+# stronger than elo0" is statistically clear.
+#
+#   python3 arena.py --a qtable=new.json,epsilon=0.05 --b qtable=old.json,epsilon=0.05 --book book.bin
+#   python3 arena.py --a policy=search,nodes=4000 --b engine=/usr/bin/stockfish,depth=1 --no-sprt --games 200
+#
+# A player spec is comma-separated key=value pairs (a bare path means qtable=PATH):
+#   qtable=PATH   move from a trained Q-table (JSON, .bin or .pbq); none = random mover
+#   policy=search the built-in alpha-beta search; engine=PATH a UCI engine
+#   time=S depth=N nodes=N   search/engine limits (nodes or depth stay fair under load)
+#   epsilon=F     chance of a random move;  book=PATH  the player's own opening book
+#   symmetry=1    the Q-table was trained with train_pybot.py --symmetry
+#   name=TEXT     label in the report
+
+import argparse
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chess
+import chess.engine
+
+from book import OpeningBook
+from chess_ai import canonical_state, open_qtable, transform_move
+from rollout import Rollout
+from search import Searcher
+
+SPEC_KEYS = {"name": str, "qtable": str, "policy": str, "engine": str, "time": float, "depth": int,
+             "nodes": int, "epsilon": float, "book": str, "symmetry": lambda v: v.lower() in ("1", "true", "yes")}
+POLICIES = ("q", "search", "engine")
+
+# (game index, opening FEN, A plays White, seed)
+Task = Tuple[int, str, bool, int]
+
+
+# ---------------- players ----------------
+def parse_spec(text: str, default_name: str) -> Dict[str, object]:
+    """"qtable=a.json,epsilon=0.05" -> {"qtable": "a.json", "epsilon": 0.05, "policy": "q", ...}."""
+    spec: Dict[str, object] = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        key, sep, value = part.partition("=")
+        if not sep:
+            key, value = "qtable", part
+        if key not in SPEC_KEYS:
+            raise ValueError(f"unknown player option {key!r} (expected one of {', '.join(SPEC_KEYS)})")
+        spec[key] = SPEC_KEYS[key](value)
+    spec.setdefault("policy", "engine" if spec.get("engine") else "q")
+    if spec["policy"] not in POLICIES:
+        raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+    if spec["policy"] == "engine" and not spec.get("engine"):
+        raise ValueError("policy=engine needs engine=PATH")
+    if spec["policy"] != "q" and not any(k in spec for k in ("time", "depth", "nodes")):
+        spec["time"] = 0.05
+    spec.setdefault("name", default_name)
+    return spec
+
+def describe(spec: Dict[str, object]) -> str:
+    opts = [f"{k}={spec[k]}" for k in ("qtable", "engine", "time", "depth", "nodes", "epsilon", "book", "symmetry") if k in spec]
+    if spec["policy"] == "q" and "qtable" not in spec:
+        opts.insert(0, "random")
+    return f"{spec['name']} ({spec['policy']}: {', '.join(opts)})"
+
+
+class Player:
+    """Moves for one spec: own book first, then ε-random, then the engine/search or Q-table."""
+
+    def __init__(self, spec: Dict[str, object]):
+        self.name = spec["name"]
+        self.epsilon = float(spec.get("epsilon", 0.0))
+        self.book = OpeningBook([spec["book"]]) if spec.get("book") else None
+        self.limit = chess.engine.Limit(time=spec.get("time"), depth=spec.get("depth"), nodes=spec.get("nodes"))
+        self.q = open_qtable(spec["qtable"]) if spec.get("qtable") else None
+        self.symmetry = bool(spec.get("symmetry"))
+        self.engine = None
+        if spec["policy"] == "search":
+            self.engine = Searcher()  # one per player: the opponents never share a transposition table
+        elif spec["policy"] == "engine":
+            try:
+                self.engine = chess.engine.SimpleEngine.popen_uci(spec["engine"])
+                if "Threads" in self.engine.options: self.engine.configure({"Threads": 1})
+                mp.util.Finalize(self.engine, self.engine.quit, exitpriority=10)
+            except Exception as e:
+                print(f"[PyBot] Engine failed to start for {self.name}: {e}. Using the built-in search.")
+                self.engine = Searcher()
+
+    def choose(self, board: chess.Board, legal: List[chess.Move]) -> chess.Move:
+        if self.book is not None:
+            entry = self.book.lookup(board)
+            if entry is not None:
+                return entry.choose()
+        if self.epsilon and random.random() < self.epsilon:
+            return random.choice(legal)
+        if self.engine is not None:
+            pv = self.engine.analyse(board, self.limit).get("pv")
+            if pv:
+                return pv[0]
+        elif self.q is not None:
+            if self.symmetry:
+                s, sym = canonical_state(board, self.q.state_key)
+                best = self.q.best_move(s, [transform_move(m, sym) for m in legal])
+                if best is not None:
+                    return transform_move(best, sym)
+            else:
+                best = self.q.best_move(self.q.state_key(board), legal)
+                if best is not None:
+                    return best
+        return random.choice(legal)
+
+
+def play_game(white: Player, black: Player, fen: str, max_plies: int) -> Tuple[str, int]:
+    """(result, plies). Games still going after max_plies are adjudicated as draws.
+    The Rollout drops its move stack, so engine and search players are shown a board that
+    keeps the game's moves: they see repetitions coming."""
+    game = Rollout(chess.Board(fen))
+    history = chess.Board(fen) if white.engine is not None or black.engine is not None else None
+    players = (black, white)  # indexed by board.turn
+    plies = 0
+    while not game.over and plies < max_plies:
+        legal = game.legal_moves()
+        if game.over:
+            break
+        player = players[game.board.turn]
+        move = player.choose(history if player.engine is not None else game.board, legal)
+        game.push(move)
+        if history is not None:
+            history.push(move)
+        plies += 1
+    return game.result or "1/2-1/2", plies
+
+
+# ---------------- workers ----------------
+_players: Optional[Tuple[Player, Player]] = None
+_max_plies = 300
+
+def _init_worker(spec_a: dict, spec_b: dict, max_plies: int) -> None:
+    global _players, _max_plies
+    _players, _max_plies = (Player(spec_a), Player(spec_b)), max_plies
+
+def _play_task(task: Task) -> Tuple[int, float, int]:
+    """(game index, A's score, plies). Each game is seeded on its own, so a match replays the
+    same way whatever the worker count (time-limited players aside)."""
+    g, fen, a_white, seed = task
+    random.seed(seed)
+    a, b = _players
+    result, plies = play_game(a, b, fen, _max_plies) if a_white else play_game(b, a, fen, _max_plies)
+    white_score = {"1-0": 1.0, "0-1": 0.0}.get(result, 0.5)
+    return g, white_score if a_white else 1.0 - white_score, plies
+
+
+# ---------------- openings ----------------
+def openings(opts: argparse.Namespace) -> Iterator[str]:
+    """One starting FEN per game pair, reproducible from --seed: lines of --openings (shuffled,
+    reused when exhausted), or up to --book-plies weighted book moves, then --random-plies.
+    ValueError if a full pass over the lines gives no position that is still in play."""
+    rng = random.Random(opts.seed)
+    lines: List[str] = []
+    if opts.openings:
+        with open(opts.openings) as f:
+            lines = [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+        rng.shuffle(lines)
+    book = OpeningBook(opts.book) if opts.book else None
+    random_plies = opts.random_plies if opts.random_plies is not None else (0 if lines or book else 4)
+    k = fresh = 0  # fresh: playable openings since the last full pass over the lines
+    while True:
+        if lines:
+            line = lines[k % len(lines)]
+            board = chess.Board() if line == "startpos" else _board_from(line)
+        else:
+            board = chess.Board()
+        if book is not None:
+            for _ in range(opts.book_plies):
+                entry = book.lookup(board)
+                if entry is None:
+                    break
+                board.push(entry.choose(rng))
+        for _ in range(random_plies):
+            legal = list(board.legal_moves)
+            if not legal:
+                break
+            board.push(rng.choice(legal))
+        if not board.is_game_over():
+            fresh += 1
+            yield board.fen()
+        k += 1
+        if lines and k % len(lines) == 0:
+            if not fresh:
+                raise ValueError(f"no playable opening in {opts.openings}: every line is a finished game")
+            fresh = 0
+
+def _board_from(line: str) -> chess.Board:
+    """A FEN, or an EPD line (operations after the four position fields are ignored)."""
+    fields = line.split()
+    if len(fields) >= 6 and fields[4].isdigit():
+        return chess.Board(" ".join(fields[:6]))
+    return chess.Board(" ".join(fields[:4]) + " 0 1")
+
+
+# ---------------- statistics ----------------
+# Scores are per pair (the mean of its two games, so 0, ¼, ½, ¾ or 1): the pentanomial model.
+# Pairs absorb the opening's bias, which makes the variance — and so the games needed — smaller
+# than counting games one by one. Half a lost and half a won pair are added as a prior, so a
+# one-sided match (zero variance) still gets a finite interval and a deciding LLR.
+PRIOR = Counter({0.0: 0.5, 1.0: 0.5})
+
+def expected_score(elo: float) -> float:
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+def elo_of(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0) + 0.0  # no "-0"
+
+def mean_var(pairs: Counter) -> Tuple[float, float, float]:
+    """(pairs, mean score, variance of a pair's score), prior included."""
+    counts = pairs + PRIOR
+    n = sum(counts.values())
+    mean = sum(s * c for s, c in counts.items()) / n
+    return n, mean, sum((s - mean) ** 2 * c for s, c in counts.items()) / n
+
+def elo_interval(pairs: Counter) -> Tuple[float, float, float]:
+    """Elo difference (A − B) and its 95% interval."""
+    n, mean, var = mean_var(pairs)
+    half = 1.96 * math.sqrt(var / n)
+    return elo_of(mean), elo_of(mean - half), elo_of(mean + half)
+
+def llr(pairs: Counter, elo0: float, elo1: float) -> float:
+    """Log-likelihood ratio of H1 (Elo = elo1) against H0 (Elo = elo0), in the normal
+    approximation of the generalised SPRT."""
+    if not pairs:
+        return 0.0
+    n, mean, var = mean_var(pairs)
+    s0, s1 = expected_score(elo0), expected_score(elo1)
+    return n * (s1 - s0) * (2 * mean - s0 - s1) / (2 * var)
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+def los(wins: int, losses: int) -> float:
+    """Likelihood of superiority: chance A is really the stronger, from decisive games."""
+    return 0.5 * (1 + math.erf((wins - losses) / math.sqrt(2 * (wins + losses)))) if wins + losses else 0.5
+
+
+# ---------------- match driver ----------------
+def run_match(opts: argparse.Namespace, spec_a: dict, spec_b: dict) -> dict:
+    """Play up to opts.games games (in pairs); stop early once the SPRT decides."""
+    wdl = Counter()          # A's wins / draws / losses
+    pairs: Counter = Counter()
+    half: Dict[int, float] = {}  # first game of a pair, waiting for its partner
+    plies = 0
+    lower, upper = sprt_bounds(opts.alpha, opts.beta)
+    verdict, ratio = None, 0.0
+    fens = openings(opts)
+
+    def tasks() -> Iterator[Task]:
+        for g in range(0, opts.games, 2):
+            fen = next(fens)
+            yield g, fen, True, opts.seed * 1_000_003 + g
+            yield g + 1, fen, False, opts.seed * 1_000_003 + g + 1
+
+    def report(done: int) -> str:
+        elo, lo, hi = elo_interval(pairs)
+        sprt = f" | LLR {ratio:+.2f} [{lower:.2f}, {upper:.2f}]" if opts.sprt else ""
+        return (f"[PyBot] Arena {done} games: {spec_a['name']} W:{wdl['W']} D:{wdl['D']} L:{wdl['L']}"
+                f" | Elo {elo:+.0f} [{lo:+.0f}, {hi:+.0f}] | LOS {los(wdl['W'], wdl['L']):.0%}{sprt}")
+
+    t0 = time.perf_counter()
+    done = reported = 0
+    ctx = mp.get_context("spawn")  # workers own engines; don't fork this process's state
+    pool = ctx.Pool(opts.workers, initializer=_init_worker, initargs=(spec_a, spec_b, opts.max_plies)) \
+        if opts.workers > 1 else None
+    if pool is None:
+        _init_worker(spec_a, spec_b, opts.max_plies)
+    try:
+        pending: deque = deque()
+        window = 4 * opts.workers  # bounded look-ahead: little compute is wasted when the SPRT stops
+        todo = tasks()
+        while verdict is None:
+            while len(pending) < window:
+                task = next(todo, None)
+                if task is None:
+                    break
+                pending.append(pool.apply_async(_play_task, (task,)) if pool is not None else task)
+            if not pending:
+                break
+            item = pending.popleft()
+            g, score, n = item.get() if pool is not None else _play_task(item)
+            done += 1
+            plies += n
+            wdl["W" if score == 1.0 else "L" if score == 0.0 else "D"] += 1
+            if g % 2 == 0:
+                half[g] = score
+                continue
+            pairs[(half.pop(g - 1) + score) / 2] += 1
+            if opts.sprt:
+                ratio = llr(pairs, opts.elo0, opts.elo1)
+                if ratio >= upper:
+                    verdict = "H1"
+                elif ratio <= lower:
+                    verdict = "H0"
+            if done - reported >= opts.log_every:
+                print(report(done))
+                reported = done
+    finally:
+        if pool is not None:
+            if verdict is None and not pending:
+                pool.close()  # finished: workers exit normally and quit their engines
+            else:
+                pool.terminate()  # drop the games queued past the SPRT decision
+            pool.join()
+    elapsed = time.perf_counter() - t0
+    if done != reported:
+        print(report(done))
+    elo, lo, hi = elo_interval(pairs)
+    return {"games": done, "pairs": sum(pairs.values()), "wins": wdl["W"], "draws": wdl["D"], "losses": wdl["L"],
+            "elo": elo, "elo_low": lo, "elo_high": hi, "los": los(wdl["W"], wdl["L"]), "llr": ratio,
+            "verdict": verdict, "plies_per_game": plies / done if done else 0.0,
+            "games_per_s": done / elapsed if elapsed else 0.0}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Headless PyBot match between two configurations (Elo + SPRT)")
+    ap.add_argument("--a", type=str, required=True, help="player A spec, e.g. qtable=new.json,epsilon=0.05 (the candidate)")
+    ap.add_argument("--b", type=str, required=True, help="player B spec (the baseline)")
+    ap.add_argument("--games", type=int, default=2000, help="most games to play (rounded up to whole pairs)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="game processes (1 = play in this process)")
+    ap.add_argument("--max-plies", type=int, default=300, help="adjudicate a draw after this many plies")
+    ap.add_argument("--openings", type=str, default="", help="FEN/EPD file, one opening per line (used in shuffled order)")
+    ap.add_argument("--book", type=str, action="append", default=[],
+                    help="opening book (Polyglot .bin or book.py JSON) walked to make openings; repeatable")
+    ap.add_argument("--book-plies", type=int, default=8, help="book moves per opening")
+    ap.add_argument("--random-plies", type=int, default=None,
+                    help="random moves after the opening (default 4 without --openings/--book, else 0)")
+    ap.add_argument("--seed", type=int, default=1, help="openings and per-game move randomness")
+    ap.add_argument("--elo0", type=float, default=0.0, help="SPRT H0: A is no stronger than this (Elo)")
+    ap.add_argument("--elo1", type=float, default=10.0, help="SPRT H1: A is at least this much stronger (Elo)")
+    ap.add_argument("--alpha", type=float, default=0.05, help="SPRT false-positive rate")
+    ap.add_argument("--beta", type=float, default=0.05, help="SPRT false-negative rate")
+    ap.add_argument("--no-sprt", dest="sprt", action="store_false", help="play every game; report Elo only")
+    ap.add_argument("--log-every", type=int, default=100, help="games between progress lines")
+    opts = ap.parse_args()
+    opts.games += opts.games % 2
+    try:
+        spec_a, spec_b = parse_spec(opts.a, "A"), parse_spec(opts.b, "B")
+    except ValueError as e:
+        ap.error(str(e))
+    if opts.sprt and opts.elo1 <= opts.elo0:
+        ap.error("--elo1 must be greater than --elo0")
+
+    print(f"[PyBot] Arena: {describe(spec_a)} vs {describe(spec_b)} | {opts.workers} workers"
+          + (f" | SPRT elo0={opts.elo0:g} elo1={opts.elo1:g} α={opts.alpha:g} β={opts.beta:g}" if opts.sprt else ""))
+    try:
+        r = run_match(opts, spec_a, spec_b)
+    except ValueError as e:
+        ap.error(str(e))
+    print(f"[PyBot] {r['games']} games in pairs ({r['games_per_s']:.1f} games/s, {r['plies_per_game']:.0f} plies/game): "
+          f"{spec_a['name']} − {spec_b['name']} = {r['elo']:+.0f} Elo [{r['elo_low']:+.0f}, {r['elo_high']:+.0f}]")
+    if r["verdict"] == "H1":
+        print(f"[PyBot] SPRT: H1 accepted — {spec_a['name']} is stronger (≥ {opts.elo1:g} Elo)")
+    elif r["verdict"] == "H0":
+        print(f"[PyBot] SPRT: H0 accepted — {spec_a['name']} is not stronger (≤ {opts.elo0:g} Elo)")
+    elif opts.sprt:
+        print(f"[PyBot] SPRT: undecided after {r['games']} games (LLR {r['llr']:+.2f})")
+
+if __name__ == "__main__":
+    main()
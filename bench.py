@@ -0,0 +1,822 @@
+# bench.py
+# Micro-benchmarks for PyBot's hot paths. Fixed seeds, no engine, no window.
+#   python3 bench.py qtable --entries 100000
+#   python3 bench.py selfplay --games 40 --workers 4
+#   python3 bench.py rollout --games 100
+#   python3 bench.py symmetry --games 300
+#   python3 bench.py linear --games 300
+#   python3 bench.py eval --positions 20000
+#   python3 bench.py search --time 1.0
+#   python3 bench.py replay --transitions 200000
+#   python3 bench.py render --frames 300
+#   python3 bench.py text
+#   python3 bench.py tactics --positions 20000
+#   python3 bench.py suite --out bench.json                    # every hot path, JSON results
+#   python3 bench.py suite --compare bench.json                # flag regressions vs a baseline
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import chess
+import chess.pgn
+
+import evaluator
+from chess_ai import ChessAI, CompactQTable, QTable, encode_move
+from replay import ReplayBuffer
+from search import Searcher
+
+
+def sample_positions(n: int, seed: int = 7) -> List[Tuple[chess.Board, List[chess.Move]]]:
+    """n (board, legal moves) pairs from random games, fixed seed."""
+    rng = random.Random(seed)
+    out: List[Tuple[chess.Board, List[chess.Move]]] = []
+    board = chess.Board()
+    while len(out) < n:
+        if board.is_game_over() or board.ply() > 120:
+            board = chess.Board()
+        legal = list(board.legal_moves)
+        out.append((board.copy(stack=False), legal))
+        board.push(rng.choice(legal))
+    return out
+
+
+def rate(fn: Callable[[], int], min_time: float = 0.5) -> float:
+    """Operations per second: fn() does some work and returns how many ops it did."""
+    ops = 0
+    t0 = time.perf_counter()
+    while True:
+        ops += fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time:
+            return ops / dt
+
+
+def best_time(fn: Callable[[], object], repeat: int = 3) -> float:
+    """Fastest of `repeat` wall-clock runs of fn() (seconds)."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# ---------------- qtable ----------------
+def bench_qtable(args) -> None:
+    rng = random.Random(11)
+    moves_per_state = 4
+    positions = sample_positions(max(1, args.entries // moves_per_state))
+    print(f"{len(positions)} states x {moves_per_state} moves, {args.entries} entries target")
+    for name, cls in (("dict", QTable), ("compact", CompactQTable)):
+        keys = [cls.state_key(b) for b, _ in positions]
+
+        def fill():
+            table = cls()
+            for key, (_, legal) in zip(keys, positions):
+                for m in legal[:moves_per_state]:
+                    table.set(key, m, rng.random())
+            return table
+
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        q = fill()
+        used = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        n = len(q)
+        t0 = time.perf_counter()
+        fill()
+        fill_time = time.perf_counter() - t0
+
+        probe = [(keys[i], positions[i][1][0]) for i in (rng.randrange(len(keys)) for _ in range(10000))]
+        get_rate = rate(lambda: sum(1 for k, m in probe if q.get(k, m) is not None))
+        best_rate = rate(lambda: sum(1 for k, (_, legal) in zip(keys[:2000], positions) if q.best_move(k, legal) or True))
+        maxq_rate = rate(lambda: sum(1 for k in keys[:10000] if q.max_q(k) is not None))
+        print(f"{name:8s} entries={n:>9d}  bytes/entry={used / max(1, n):7.1f}  "
+              f"set={n / fill_time:>10,.0f}/s  get={get_rate:>10,.0f}/s  "
+              f"best_move={best_rate:>9,.0f}/s  max_q={maxq_rate:>10,.0f}/s")
+
+
+# ---------------- selfplay ----------------
+def bench_selfplay(args) -> None:
+    from train_pybot import GAMES, build_parser, parallel_games
+
+    random.seed(5)
+    bot = ChessAI(qtable=args.qtable)
+    t0 = time.perf_counter()
+    for _ in range(args.games):
+        GAMES[args.rollout](bot)
+    serial = args.games / (time.perf_counter() - t0)
+    print(f"serial      {serial:8.2f} games/s")
+
+    for workers in sorted({2, args.workers} - {1}):
+        with tempfile.TemporaryDirectory() as tmp:
+            opts = build_parser().parse_args(["--games", str(args.games), "--workers", str(workers), "--qtable", args.qtable,
+                                              "--save", os.path.join(tmp, "q"), "--rollout", args.rollout])
+            learner = ChessAI(qtable=args.qtable)
+            t0 = time.perf_counter()
+            for _ in parallel_games(learner, opts, lambda: 0):
+                pass
+            rate_ = args.games / (time.perf_counter() - t0)
+        print(f"workers={workers:<3d} {rate_:8.2f} games/s  speedup x{rate_ / serial:.2f}  (incl. pool start-up)")
+
+
+# ---------------- rollout ----------------
+def bench_rollout(args) -> None:
+    from train_pybot import GAMES
+
+    for qtable in ("dict", "compact"):
+        base = None
+        for name in ("full", "fast"):
+            random.seed(args.seed)
+            bot = ChessAI(qtable=qtable)
+            moves = [0]
+            choose = bot.choose_move
+            def counted(*a, **k):
+                moves[0] += 1
+                return choose(*a, **k)
+            bot.choose_move = counted  # learner moves: games differ in length, moves/s doesn't care
+            results = {}
+            t0 = time.perf_counter()
+            for _ in range(args.games):
+                r = GAMES[name](bot)
+                results[r] = results.get(r, 0) + 1
+            dt = time.perf_counter() - t0
+            base = base or moves[0] / dt
+            print(f"{qtable:8s} {name:5s} {args.games / dt:7.2f} games/s  {moves[0] / dt:8,.0f} learner moves/s  "
+                  f"x{moves[0] / dt / base:.2f}  results {dict(sorted(results.items()))}")
+
+
+# ---------------- symmetry ----------------
+def bench_symmetry(args) -> None:
+    """Same seeded training with and without canonical (mirrored) states: table size, how often
+    a greedy move finds its state already learned, and the trained table's score vs random."""
+    from arena import Player, play_game
+    from train_pybot import play_rollout_game
+
+    def greedy_hits(bot: ChessAI, counts: List[int]) -> None:
+        best_move = bot.q.best_move
+        def counted(s, legal):
+            m = best_move(s, legal)
+            counts[m is not None] += 1
+            return m
+        bot.q.best_move = counted
+
+    for qtable in ("dict", "compact"):
+        base = None
+        for symmetry in (False, True):
+            random.seed(args.seed)
+            bot = ChessAI(qtable=qtable, symmetry=symmetry)
+            counts = [0, 0]  # greedy moves in an unknown / a known state, over the second half
+            t0 = time.perf_counter()
+            for g in range(args.games):
+                if g == args.games // 2:
+                    greedy_hits(bot, counts)
+                play_rollout_game(bot)
+            dt = time.perf_counter() - t0
+            del bot.q.best_move
+            states = len(bot.q.table) if qtable == "dict" else len({s for s, _, _ in bot.q.items()})
+            base = base or (len(bot.q), states)
+            learner = Player({"name": "bot", "policy": "q", "symmetry": symmetry})
+            learner.q = bot.q
+            rand = Player({"name": "random", "policy": "q"})
+            scores = []
+            for white in (True, False):
+                total = 0.0
+                for g in range(args.eval):
+                    random.seed(args.seed * 1000 + g)
+                    result, _ = play_game(learner, rand, chess.STARTING_FEN, 200) if white else \
+                        play_game(rand, learner, chess.STARTING_FEN, 200)
+                    total += {"1-0": 1.0, "0-1": 0.0}.get(result, 0.5) if white else {"1-0": 0.0, "0-1": 1.0}.get(result, 0.5)
+                scores.append(total / args.eval)
+            print(f"{qtable:8s} {'mirrored' if symmetry else 'plain':8s} entries={len(bot.q):>8,d} (x{len(bot.q) / base[0]:.2f})  "
+                  f"states={states:>8,d} (x{states / base[1]:.2f})  {args.games / dt:6.2f} games/s  "
+                  f"known states {counts[1] / max(1, sum(counts)):5.1%}  vs random: White {scores[0]:.0%} Black {scores[1]:.0%}")
+
+
+# ---------------- linear ----------------
+def _score_vs_random(q, games: int, seed: int, symmetry: bool = False) -> Tuple[float, float]:
+    """Greedy play of a trained table/model against a random mover: (score as White, as Black)."""
+    from arena import Player, play_game
+
+    learner = Player({"name": "bot", "policy": "q", "symmetry": symmetry})
+    learner.q = q
+    rand = Player({"name": "random", "policy": "q"})
+    scores = []
+    for white in (True, False):
+        total = 0.0
+        for g in range(games):
+            random.seed(seed * 1000 + g)
+            result, _ = play_game(learner, rand, chess.STARTING_FEN, 200) if white else \
+                play_game(rand, learner, chess.STARTING_FEN, 200)
+            total += {"1-0": 1.0, "0-1": 0.0}.get(result, 0.5) if white else {"1-0": 0.0, "0-1": 1.0}.get(result, 0.5)
+        scores.append(total / games)
+    return scores[0], scores[1]
+
+
+def bench_linear(args) -> None:
+    """Tabular Q-tables vs the linear Q-function: size, training speed and strength after the
+    same seeded training, then the cost of scoring every legal move of a position."""
+    from linear_q import LinearQ, move_features
+    from train_pybot import play_rollout_game
+
+    configs = [("dict", "q", 0), ("compact", "q", 0), ("linear", "linear", 0), ("linear+replay", "linear", 20000)]
+    for name, policy, replay in configs:
+        random.seed(args.seed)
+        bot = ChessAI(qtable="compact" if name == "compact" else "dict", policy=policy,
+                      replay=ReplayBuffer(replay, int_keys=False) if replay else None, replay_batch=128)
+        moves = [0]
+        choose = bot.choose_move
+        def counted(*a, **k):
+            moves[0] += 1
+            return choose(*a, **k)
+        bot.choose_move = counted
+        t0 = time.perf_counter()
+        for _ in range(args.games):
+            play_rollout_game(bot)
+        dt = time.perf_counter() - t0
+        size = f"{len(bot.q):>8,d} weights ({bot.q.w.nbytes} B)" if policy == "linear" else f"{len(bot.q):>8,d} entries"
+        white, black = _score_vs_random(bot.q, args.eval, args.seed)
+        print(f"{name:14s} {size:28s} {moves[0] / dt:8,.0f} learner moves/s  vs random: White {white:.0%} Black {black:.0%}")
+
+    positions = [b for b, _ in sample_positions(args.positions)]
+    q = LinearQ()
+    q.w[:] = [random.uniform(-1, 1) for _ in q.w]
+    t_feat = best_time(lambda: [move_features(b, list(b.generate_legal_moves())) for b in positions])
+    states = [q.state_key(b) for b in positions]
+    t_mat = best_time(lambda: [q.best_move(s, s.moves) for s in states])
+    w = q.w.tolist()
+    rows = [s.phi.tolist() for s in states]
+    t_py = best_time(lambda: [max(range(len(r)), key=lambda i, r=r: sum(x * y for x, y in zip(r[i], w))) if r else None
+                              for r in rows])
+    n = len(positions)
+    print(f"features {t_feat / n * 1e6:6.1f} us/position  |  score all legal moves: one matvec "
+          f"{t_mat / n * 1e6:5.1f} us, per-move Python dot products {t_py / n * 1e6:5.1f} us (x{t_py / t_mat:.1f})")
+
+
+# ---------------- eval ----------------
+def _squareset_material_eval(board: chess.Board) -> int:
+    """The original SquareSet/len() material eval, kept as the reference."""
+    score = 0
+    for piece_type, value in evaluator.PIECE_VALUES.items():
+        score += len(board.pieces(piece_type, chess.WHITE)) * value
+        score -= len(board.pieces(piece_type, chess.BLACK)) * value
+    return score if board.turn == chess.WHITE else -score
+
+
+def bench_eval(args) -> None:
+    boards = [b for b, _ in sample_positions(args.positions)]
+    reference = [_squareset_material_eval(b) for b in boards]
+    assert [evaluator.simple_material_eval(b) for b in boards] == reference, "material mismatch"
+    assert evaluator.evaluate_batch(boards) == reference, "batch material mismatch"
+    assert evaluator.evaluate_batch(boards, positional=True) == [evaluator.positional_eval(b) for b in boards], \
+        "batch positional mismatch"
+    print(f"{len(boards)} positions, material scores match the reference exactly")
+    n = len(boards)
+    base = None
+    for name, fn in (("squareset (old)", lambda: [_squareset_material_eval(b) for b in boards]),
+                     ("material", lambda: [evaluator.simple_material_eval(b) for b in boards]),
+                     ("material batch", lambda: evaluator.evaluate_batch(boards)),
+                     ("positional", lambda: [evaluator.positional_eval(b) for b in boards]),
+                     ("positional batch", lambda: evaluator.evaluate_batch(boards, positional=True))):
+        r = rate(lambda: n if fn() is not None else 0)
+        base = base or r
+        print(f"{name:18s} {r:>12,.0f} positions/s  x{r / base:.2f}")
+
+
+# ---------------- search ----------------
+SEARCH_FENS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/3PP3/5N2/PPP2PPP/RNBQKB1R b KQkq - 0 3",          # Scotch
+    "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4",       # mate in 1
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",      # "kiwipete"
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",                                 # rook endgame
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",                                     # back-rank mate
+]
+
+
+def bench_search(args) -> None:
+    total_nodes = total_time = 0.0
+    for fen in SEARCH_FENS:
+        searcher = Searcher()  # fresh transposition table per position
+        board = chess.Board(fen)
+        info = searcher.search(board, time_limit=args.time)
+        total_nodes += info["nodes"]; total_time += info["time"]
+        best = board.san(info["pv"][0]) if info["pv"] else "-"
+        print(f"depth={info['depth']:<3d} nodes={info['nodes']:>8d} nps={info['nps']:>8,d} "
+              f"score={str(info['score'].relative):>6s} best={best:7s} {fen}")
+    print(f"total {total_nodes / total_time:,.0f} nps over {len(SEARCH_FENS)} positions")
+
+
+# ---------------- replay ----------------
+def bench_replay(args) -> None:
+    positions = sample_positions(min(args.transitions, 50000) + 1)
+    rng = random.Random(3)
+    for qtable in ("dict", "compact"):
+        keys = [QTable.state_key(b) if qtable == "dict" else CompactQTable.state_key(b) for b, _ in positions]
+        buf = ReplayBuffer(args.transitions, int_keys=qtable != "dict")
+        for k in range(args.transitions):
+            i = k % (len(positions) - 1)
+            buf.push(keys[i], encode_move(positions[i][1][0]), rng.uniform(-1, 1), keys[i + 1])
+        moves = [positions[k % (len(positions) - 1)][1][0] for k in range(args.transitions)]
+
+        def online_run() -> None:
+            bot = ChessAI(qtable=qtable)
+            for k in range(args.transitions):
+                bot.update(buf.states[k], moves[k], buf.rewards[k], buf.nexts[k])
+
+        online = args.transitions / best_time(online_run)
+        print(f"{qtable:8s} online update        {online:>10,.0f} transitions/s")
+        for batch in (64, 256, 1024):
+            r = args.transitions / best_time(
+                lambda: ChessAI(qtable=qtable, replay=buf, replay_batch=batch).learn_from_replay(args.transitions))
+            print(f"{qtable:8s} replay batch={batch:<5d}  {r:>10,.0f} transitions/s  x{r / online:.2f}")
+
+
+# ---------------- render ----------------
+def _legacy_frame(screen, board, last_move, selected, targets, pieces, panel_font, small_font, info_lines) -> None:
+    """The original per-frame path: fill, 64 rects, fresh overlay Surfaces, every line re-rendered."""
+    import pygame
+    import play_pygame_pro as ui
+    screen.fill(ui.BG)
+    for r in range(8):
+        for f in range(8):
+            pygame.draw.rect(screen, ui.LIGHT if (r + f) % 2 == 0 else ui.DARK,
+                             (ui.MARGIN_X + f * ui.SQ, ui.MARGIN_TOP + r * ui.SQ, ui.SQ, ui.SQ))
+    for sq in (last_move.from_square, last_move.to_square):
+        s = pygame.Surface((ui.SQ, ui.SQ), pygame.SRCALPHA)
+        s.fill((*ui.LASTMOVE, 90))
+        screen.blit(s, ui.square_to_xy(sq))
+    s = pygame.Surface((ui.SQ, ui.SQ), pygame.SRCALPHA)
+    s.fill((*ui.HIGHLIGHT, 110))
+    screen.blit(s, ui.square_to_xy(selected))
+    for sq in targets:
+        tx, ty = ui.square_to_xy(sq)
+        pygame.draw.circle(screen, (20, 20, 20), (tx + ui.SQ // 2, ty + ui.SQ // 2), 8)
+    for sq, piece in board.piece_map().items():
+        x, y = ui.square_to_xy(sq)
+        img = pieces[(piece.piece_type, piece.color)]
+        screen.blit(img, img.get_rect(center=(x + ui.SQ // 2, y + ui.SQ // 2)))
+    pr = ui.sidebar_rect()
+    pygame.draw.rect(screen, ui.PANEL_BG, pr, border_radius=10)
+    y = pr.top + 12
+    for ln in ui.wrap_lines_by_width(info_lines, small_font, pr.width - 24):
+        screen.blit(small_font.render(ln, True, ui.TEXT), (pr.left + 12, y)); y += 20
+    pygame.display.flip()
+
+
+def bench_render(args) -> None:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import play_pygame_pro as ui
+    pygame.init()
+    screen = pygame.display.set_mode((ui.MARGIN_X * 2 + ui.BOARD_SIZE + ui.GAP + ui.SIDEBAR_W,
+                                      ui.MARGIN_TOP * 2 + ui.BOARD_SIZE))
+    panel_font = pygame.font.SysFont("arial", 18, bold=True)
+    small_font = pygame.font.SysFont("arial", 16)
+    pieces = ui.load_pieces("pieces-png", size=ui.SQ - 8)
+    boards = [b for b, _ in sample_positions(args.frames)]
+    last = chess.Move.from_uci("e2e4")
+    info = ["You played: Pawn e2→e4 — grabs the center and opens lines for the bishop and queen.",
+            "Coach suggests: Knight g1→f3", "Eval (cp): 30", "Plan: Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7"]
+    score = {"W": 0, "D": 0, "L": 0}
+    toggles = {"H": True, "O": False, "T": True}
+    renderer = ui.Renderer(pieces, panel_font, small_font)
+
+    def frame(board, sidebar_lines, selected=chess.E2) -> None:
+        dirty = renderer.draw(screen, board, last, selected, [chess.E3, chess.E4], False, None, [], False,
+                              (sidebar_lines, score, 300, "Human vs Bot", "White to move", toggles, "Yes", False))
+        if dirty:
+            pygame.display.update(dirty)
+
+    def run(fn) -> float:
+        return best_time(lambda: [fn(k) for k in range(args.frames)]) / args.frames * 1000
+
+    legacy = run(lambda k: _legacy_frame(screen, boards[k], last, chess.E2, [chess.E3, chess.E4], pieces,
+                                         panel_font, small_font, info))
+    print(f"legacy full redraw   {legacy:7.3f} ms/frame")
+    rows = [
+        ("cached, full repaint", lambda k: (renderer.invalidate(), frame(boards[k], info))),
+        ("cached, new position", lambda k: frame(boards[k], info)),
+        ("cached, selection",    lambda k: frame(boards[0], info, selected=chess.SQUARES[k % 64])),
+        ("cached, sidebar text", lambda k: frame(boards[0], info[:3] + [f"Eval (cp): {k}"])),
+        ("idle (nothing new)",   lambda k: frame(boards[0], info)),
+    ]
+    for name, fn in rows:
+        ms = run(fn)
+        print(f"{name:20s} {ms:7.3f} ms/frame  x{legacy / max(ms, 1e-9):.1f}  ({ms / (1000 / 60) * 100:.2f}% of a 60 fps frame)")
+    pygame.quit()
+
+
+# ---------------- text ----------------
+def _legacy_wrap(lines: List[str], font, max_px: int) -> List[str]:
+    """The original wrap_lines_by_width: one font.size() per word, nothing remembered."""
+    wrapped: List[str] = []
+    for line in lines:
+        words = line.split()
+        if not words:
+            wrapped.append("")
+            continue
+        cur = words[0]
+        for w in words[1:]:
+            if font.size(cur + " " + w)[0] <= max_px:
+                cur += " " + w
+            else:
+                wrapped.append(cur)
+                cur = w
+        wrapped.append(cur)
+    return wrapped
+
+
+def bench_text(args) -> None:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import play_pygame_pro as ui
+    import text_layout
+    pygame.init()
+    screen = pygame.display.set_mode((ui.MARGIN_X * 2 + ui.BOARD_SIZE + ui.GAP + ui.SIDEBAR_W,
+                                      ui.MARGIN_TOP * 2 + ui.BOARD_SIZE))
+    panel_font = pygame.font.SysFont("arial", 18, bold=True)
+    small_font = pygame.font.SysFont("arial", 16)
+    max_w = ui.SIDEBAR_W - 24
+    rng = random.Random(5)
+    vocab = ("You played: Knight g1→f3 — develops a piece and controls the center. Coach suggests: "
+             "Pawn d2→d4 ⛔ Blunder: this loses too much compared with the best move. Eval (cp): -35 "
+             "Plan: Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6 c3 O-O h3").split()
+    lines = [" ".join(rng.choice(vocab) for _ in range(rng.randint(4, 30))) for _ in range(40)]
+    score = {"W": 0, "D": 0, "L": 0}
+    toggles = {"H": True, "O": False, "T": True}
+
+    def legacy_sidebar(info: List[str]) -> None:
+        pr = ui.sidebar_rect()
+        pygame.draw.rect(screen, ui.PANEL_BG, pr, border_radius=10)
+        screen.blit(panel_font.render("Human vs Bot | White to move", True, ui.TEXT), (pr.left + 12, pr.top + 12))
+        y = pr.top + 38
+        head = ["W:0  D:0  L:0   |   Speed: 300 ms",
+                "Hints(H): ON   Openings(O): OFF   Tactics(T): ON   Engine: Yes"]
+        for ln in _legacy_wrap(head, small_font, max_w) + _legacy_wrap(info, small_font, max_w):
+            screen.blit(small_font.render(ln, True, ui.TEXT), (pr.left + 12, y)); y += 20
+
+    def sidebar(info: List[str]) -> None:
+        ui.draw_sidebar(screen, panel_font, small_font, info, score, 300, "Human vs Bot", "White to move",
+                        toggles, "Yes")
+
+    ms = lambda fn: best_time(lambda: [fn() for _ in range(args.frames)]) / args.frames * 1000
+    for n in (5, 20, 40):
+        info = lines[:n]
+        legacy_wrap = ms(lambda: _legacy_wrap(info, small_font, max_w))
+        text_layout._LAYOUTS.clear()
+        t0 = time.perf_counter()
+        wrapped = text_layout.wrap_lines_by_width(info, small_font, max_w)
+        cold = (time.perf_counter() - t0) * 1000
+        warm = ms(lambda: text_layout.wrap_lines_by_width(info, small_font, max_w))
+        print(f"{n:2d} info lines ({len(wrapped):3d} wrapped)  wrap: legacy {legacy_wrap:7.3f} ms  "
+              f"first {cold:7.3f} ms  memoised {warm:7.4f} ms  x{legacy_wrap / warm:.0f}")
+        legacy = ms(lambda: legacy_sidebar(info))
+        new = ms(lambda: sidebar(info))
+        print(f"{'':38s}sidebar: legacy {legacy:7.3f} ms  cached {new:7.3f} ms  x{legacy / new:.1f}")
+    pygame.quit()
+
+
+# ---------------- tactics ----------------
+def _is_attacked_by_hanging(board: chess.Board, color: bool) -> List[int]:
+    """The original find_hanging_pieces: two is_attacked_by calls per piece, undefended only."""
+    hangs = []
+    for sq, pc in board.piece_map().items():
+        if pc.color == color and board.is_attacked_by(not color, sq) and not board.is_attacked_by(color, sq):
+            hangs.append(sq)
+    return hangs
+
+
+def bench_tactics(args) -> None:
+    import tactics
+    boards = [b for b, _ in sample_positions(args.positions)]
+    rows = [("is_attacked_by (original)", lambda b: _is_attacked_by_hanging(b, b.turn)),
+            ("hanging_pieces (SEE)", lambda b: tactics.hanging_pieces(b, b.turn)),
+            ("analyse (SEE+forks+pins)", tactics.analyse)]
+    base = None
+    for name, fn in rows:
+        r = len(boards) / best_time(lambda: [fn(b) for b in boards])
+        base = base or r
+        print(f"{name:26s} {r:>10,.0f} positions/s  {1e6 / r:6.1f} us  x{r / base:.2f}")
+    old = sum(len(_is_attacked_by_hanging(b, c)) for b in boards for c in chess.COLORS)
+    reports = [tactics.analyse(b) for b in boards]
+    new = sum(len(r.hanging[c]) for r in reports for c in chess.COLORS)
+    print(f"hanging pieces found: original {old}, SEE {new} (+{new - old} under-defended); "
+          f"forks {sum(len(r.forks) for r in reports)}, pins {sum(len(r.pins) for r in reports)}")
+
+
+# ---------------- suite ----------------
+# A fixed workload over the project's hot paths. Every result is a rate (higher is better) so a
+# baseline comparison is one ratio per case; the JSON keeps the unit for humans.
+SUITE_PGN = """[Event "Paris Opera"] [White "Morphy"] [Black "Duke Karl / Count Isouard"] [Result "1-0"]
+1. e4 e5 2. Nf3 d6 3. d4 Bg4 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7 8. Nc3 c6 9. Bg5 b5
+10. Nxb5 cxb5 11. Bxb5+ Nbd7 12. O-O-O Rd8 13. Rxd7 Rxd7 14. Rd1 Qe6 15. Bxd7+ Nxd7 16. Qb8+ Nxb8
+17. Rd8# 1-0"""
+
+
+def suite_positions(n: int, seed: int) -> List[chess.Board]:
+    """The search FENs, every position of the PGN game, then seeded random-game positions."""
+    boards = [chess.Board(fen) for fen in SEARCH_FENS]
+    game = chess.pgn.read_game(io.StringIO(SUITE_PGN))
+    board = game.board()
+    for move in game.mainline_moves():
+        board.push(move)
+        boards.append(board.copy(stack=False))
+    return (boards + [b for b, _ in sample_positions(n, seed)])[:n]
+
+
+def _synthetic_table(cls, entries: int, rng: random.Random, moves: List[chess.Move], per_state: int = 4):
+    """A table of `entries` values: random states (right key type for the backend), 4 moves each."""
+    wide = cls is QTable
+    states = [str(rng.getrandbits(64)) if wide else rng.getrandbits(64) for _ in range(entries // per_state)]
+    table = cls()
+    for s in states:
+        for m in rng.sample(moves, per_state):
+            table.set(s, m, rng.random())
+    return table, states
+
+
+def calibration() -> float:
+    """Loops/s of a fixed pure-Python workload: the machine's speed right now. Comparisons
+    divide it out, so a busy or throttled host doesn't read as a regression everywhere."""
+    def work() -> int:
+        d = {}
+        for i in range(200_000):
+            d[i & 1023] = d.get(i & 1023, 0) + i
+        return len(d)
+    return 200_000 / best_time(work, repeat=5)
+
+
+def run_suite(args, speeds: List[float], samples: Dict[str, Tuple[str, List[float]]]) -> None:
+    """One round of every case: appends a rate per case to samples[name] = (unit, rates)."""
+    from train_pybot import play_rollout_game, play_training_game
+    import coach
+
+    rng = random.Random(args.seed)
+    boards = suite_positions(args.positions, args.seed)
+    min_time = 0.05 if args.quick else 0.5  # per case and round
+
+    def record(name: str, value: float, unit: str) -> None:
+        samples.setdefault(name, (unit, []))[1].append(value)
+
+    def per_s(name: str, ops: int, fn: Callable[[], object], unit: str = "ops/s") -> None:
+        # fastest run in min_time (at least one run): the least disturbed one.
+        # Collector off while timing, as timeit does: a full collection over whatever heap the
+        # earlier cases left behind would otherwise land in a random sample
+        gc.collect()
+        gc.disable()
+        try:
+            best, until = best_time(fn, repeat=1), time.perf_counter() + min_time
+            while time.perf_counter() < until:
+                best = min(best, best_time(fn, repeat=1))
+        finally:
+            gc.enable()
+        record(name, ops / best, unit)
+
+    speeds.append(calibration())
+    # state keys and evaluation
+    for qtable in ("dict", "compact"):
+        bot = ChessAI(qtable=qtable)
+        per_s(f"ChessAI.state[{qtable}]", len(boards), lambda: [bot.state(b) for b in boards], "positions/s")
+    per_s("simple_material_eval", len(boards), lambda: [evaluator.simple_material_eval(b) for b in boards], "positions/s")
+
+    speeds.append(calibration())
+    # Q-table operations at each size
+    moves = list(chess.Board().legal_moves) + list(suite_positions(40, args.seed)[-1].legal_moves)
+    probes = 20000
+    for entries in args.sizes:
+        for qname, cls in (("dict", QTable), ("compact", CompactQTable)):
+            if cls is QTable and entries > args.dict_max:
+                print(f"QTable[{qname},n={entries}] skipped (--dict-max {args.dict_max})")
+                continue
+            tag = f"[{qname},n={entries}]"
+            t0 = time.perf_counter()
+            q, states = _synthetic_table(cls, entries, rng, moves)
+            record(f"QTable.set fill{tag}", len(q) / (time.perf_counter() - t0), "entries/s")
+            picks = [states[rng.randrange(len(states))] for _ in range(probes)]
+            probe_moves = [moves[rng.randrange(len(moves))] for _ in range(probes)]
+            per_s(f"QTable.get{tag}", probes, lambda: [q.get(s, m) for s, m in zip(picks, probe_moves)])
+            per_s(f"QTable.set{tag}", probes, lambda: [q.set(s, m, 0.5) for s, m in zip(picks, probe_moves)])
+            per_s(f"QTable.best_move{tag}", probes // 10, lambda: [q.best_move(s, moves) for s in picks[:probes // 10]])
+            per_s(f"QTable.max_q{tag}", probes, lambda: [q.max_q(s) for s in picks])
+            if entries <= args.save_max:
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, "q")
+                    per_s(f"QTable.save{tag}", len(q), lambda: q.save(path), "entries/s")
+                    per_s(f"QTable.load{tag}", len(q), lambda: cls().load(path), "entries/s")
+            q = states = None  # free this size's table before the next one is built
+
+    speeds.append(calibration())
+    # training games (seeded: the same games every run)
+    for fn in (play_training_game, play_rollout_game):
+        for qtable in ("dict", "compact"):
+            def games() -> None:
+                random.seed(args.seed)
+                bot = ChessAI(qtable=qtable)
+                for _ in range(args.games):
+                    fn(bot)
+            per_s(f"{fn.__name__}[{qtable}]", args.games, games, "games/s")
+
+    speeds.append(calibration())
+    # coaching: more positions than the per-position state cache holds, so every call computes
+    tactics_boards = (boards * (1 + (2 * coach.STATE_CACHE_SIZE) // len(boards)))[:max(len(boards), 2 * coach.STATE_CACHE_SIZE)]
+    per_s("find_hanging_pieces", len(tactics_boards),
+          lambda: [coach.find_hanging_pieces(b, b.turn) for b in tactics_boards], "positions/s")
+
+    speeds.append(calibration())
+    # UI, headless
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import play_pygame_pro as ui
+    import text_layout
+    pygame.init()
+    screen = pygame.display.set_mode((ui.MARGIN_X * 2 + ui.BOARD_SIZE + ui.GAP + ui.SIDEBAR_W,
+                                      ui.MARGIN_TOP * 2 + ui.BOARD_SIZE))
+    panel_font = pygame.font.SysFont("arial", 18, bold=True)
+    small_font = pygame.font.SysFont("arial", 16)
+    pieces = ui.load_pieces("pieces-png", size=ui.SQ - 8, cache_dir=None)
+    words = SUITE_PGN.split()
+    text = [" ".join(rng.choice(words) for _ in range(rng.randint(4, 30))) for _ in range(40)]
+    per_s("wrap_lines_by_width[cold]", len(text),
+          lambda: (text_layout._LAYOUTS.clear(), text_layout.wrap_lines_by_width(text, small_font, ui.SIDEBAR_W - 24)),
+          "lines/s")
+    per_s("wrap_lines_by_width[memoised]", len(text),
+          lambda: text_layout.wrap_lines_by_width(text, small_font, ui.SIDEBAR_W - 24), "lines/s")
+    score = {"W": 0, "D": 0, "L": 0}
+    toggles = {"H": True, "O": False, "T": True}
+    last = chess.Move.from_uci("e2e4")
+    frames = boards[:60]
+
+    def frame(board: chess.Board) -> None:
+        screen.fill(ui.BG)
+        ui.draw_board(screen, board, last, chess.E2, [chess.E3, chess.E4], pieces)
+        ui.draw_sidebar(screen, panel_font, small_font, text[:6], score, 300, "Human vs Bot", "White to move",
+                        toggles, "Yes")
+        pygame.display.flip()
+    per_s("frame draw_board+draw_sidebar", len(frames), lambda: [frame(b) for b in frames], "frames/s")
+    pygame.quit()
+    speeds.append(calibration())
+
+
+def median_spread(values: List[float]) -> Tuple[float, float]:
+    """Median of the samples and their spread: the median absolute deviation relative to the
+    median, scaled to a standard deviation (0 for a single sample)."""
+    med = statistics.median(values)
+    if len(values) < 2 or not med:
+        return med, 0.0
+    return med, 1.4826 * statistics.median(abs(x - med) for x in values) / med
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float, speed: float = 1.0) -> int:
+    """Print new/baseline per case (divided by the hosts' relative `speed`); returns how many
+    cases got slower than their threshold (3 combined spreads of the two runs, at least tolerance)
+    with every new sample below every baseline sample: for 5 against 5 samples of one
+    unchanged case, a 1 in 252 chance."""
+    regressions = 0
+    for name, res in current.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            print(f"{name:34s} {'new':>8s}")
+            continue
+        ratio = res["value"] / base["value"] / speed
+        threshold = max(tolerance, 3 * (res.get("spread", 0.0) ** 2 + base.get("spread", 0.0) ** 2) ** 0.5)
+        new, old = [v / speed for v in res.get("samples", [res["value"]])], base.get("samples", [base["value"]])
+        if ratio < 1 - threshold and max(new) < min(old):
+            flag = "REGRESSION"
+        elif ratio > 1 + threshold and min(new) > max(old):
+            flag = "faster"
+        else:
+            flag = ""
+        regressions += flag == "REGRESSION"
+        print(f"{name:34s} x{ratio:6.2f}  ±{threshold:4.0%}  {flag}")
+    for name in baseline.keys() - current.keys():
+        print(f"{name:34s} {'missing':>8s}")
+    return regressions
+
+
+def bench_suite(args) -> None:
+    t0 = time.perf_counter()
+    speeds: List[float] = []
+    samples: Dict[str, Tuple[str, List[float]]] = {}
+    # whole rounds rather than back-to-back repeats: a case's samples are minutes apart, so the
+    # spread includes the host's drift, not just the jitter of one moment
+    for r in range(args.repeats):
+        print(f"[PyBot] Round {r + 1}/{args.repeats}", flush=True)
+        run_suite(args, speeds, samples)
+    results = {}
+    for name, (unit, values) in samples.items():
+        value, spread = median_spread(values)
+        results[name] = {"value": value, "unit": unit, "spread": spread, "samples": values}
+        print(f"{name:34s} {value:>14,.1f} {unit:12s} ±{spread:.1%}")
+    speed = max(speeds)  # sampled between sections; the fastest reading is the least disturbed one
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "chess": chess.__version__, "seed": args.seed, "quick": args.quick,
+                       "repeats": args.repeats,
+                       "sizes": args.sizes, "calibration": speed, "seconds": round(time.perf_counter() - t0, 1)},
+              "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"[PyBot] Wrote {len(results)} results → {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("quick"):
+            sys.exit(f"[PyBot] {args.compare} was written with --quick: too noisy to compare against")
+        relative = speed / baseline["meta"].get("calibration", speed) if args.normalise else 1.0
+        print(f"\nvs {args.compare} (threshold: 3 spreads, at least {args.tolerance:.0%}; "
+              f"this host x{relative:.2f} the baseline's speed)")
+        regressions = compare_results(results, baseline["results"], args.tolerance, relative)
+        print(f"[PyBot] {regressions} regression(s)")
+        if regressions:
+            sys.exit(1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="PyBot micro-benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    q = sub.add_parser("qtable", help="QTable vs CompactQTable: memory per entry and lookup rates")
+    q.add_argument("--entries", type=int, default=100000)
+    q.set_defaults(fn=bench_qtable)
+    sp = sub.add_parser("selfplay", help="train_pybot games/s: serial loop vs --workers process pool")
+    sp.add_argument("--games", type=int, default=40)
+    sp.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    sp.add_argument("--qtable", type=str, default="compact", choices=["dict", "compact"])
+    sp.add_argument("--rollout", type=str, default="fast", choices=["fast", "full"])
+    sp.set_defaults(fn=bench_selfplay)
+    ro = sub.add_parser("rollout", help="training games/s: original python-chess loop vs the Rollout (one movegen per ply)")
+    ro.add_argument("--games", type=int, default=100)
+    ro.add_argument("--seed", type=int, default=5)
+    ro.set_defaults(fn=bench_rollout)
+    li = sub.add_parser("linear", help="tabular Q-tables vs the linear Q-function: size, training speed, strength, scoring cost")
+    li.add_argument("--games", type=int, default=300, help="training games per configuration")
+    li.add_argument("--eval", type=int, default=100, help="greedy games vs random per colour after training")
+    li.add_argument("--positions", type=int, default=2000)
+    li.add_argument("--seed", type=int, default=5)
+    li.set_defaults(fn=bench_linear)
+    sy = sub.add_parser("symmetry", help="Q-table size, state reuse and strength with and without mirrored (canonical) states")
+    sy.add_argument("--games", type=int, default=300, help="training games per configuration")
+    sy.add_argument("--eval", type=int, default=100, help="greedy games vs random per colour after training")
+    sy.add_argument("--seed", type=int, default=5)
+    sy.set_defaults(fn=bench_symmetry)
+    ev = sub.add_parser("eval", help="static evaluators: positions/s vs the original SquareSet material eval")
+    ev.add_argument("--positions", type=int, default=20000)
+    ev.set_defaults(fn=bench_eval)
+    se = sub.add_parser("search", help="built-in alpha-beta search: depth reached and nodes/s per position")
+    se.add_argument("--time", type=float, default=1.0, help="seconds per position")
+    se.set_defaults(fn=bench_search)
+    rp = sub.add_parser("replay", help="Q-learning updates: one ChessAI.update per move vs batched replay")
+    rp.add_argument("--transitions", type=int, default=200000)
+    rp.set_defaults(fn=bench_replay)
+    rn = sub.add_parser("render", help="frame time: original full redraw vs cached layers + dirty rects (headless)")
+    rn.add_argument("--frames", type=int, default=300)
+    rn.set_defaults(fn=bench_render)
+    tx = sub.add_parser("text", help="sidebar text: original wrap/render per frame vs memoised layout + LRU surfaces")
+    tx.add_argument("--frames", type=int, default=200)
+    tx.set_defaults(fn=bench_text)
+    tc = sub.add_parser("tactics", help="hanging-piece detection: original is_attacked_by scan vs SEE tactics engine")
+    tc.add_argument("--positions", type=int, default=20000)
+    tc.set_defaults(fn=bench_tactics)
+    su = sub.add_parser("suite", help="fixed-seed run over every hot path; JSON output and baseline comparison")
+    su.add_argument("--out", type=str, default="", help="write results as JSON")
+    su.add_argument("--compare", type=str, default="", help="baseline JSON from an earlier --out; exit 1 on regressions")
+    su.add_argument("--tolerance", type=float, default=0.15,
+                    help="smallest slowdown that counts as a regression (0.15 = 15%%); noisier cases need 3 spreads")
+    su.add_argument("--repeats", type=int, default=5, help="rounds over every case; each case reports its median")
+    su.add_argument("--no-normalise", dest="normalise", action="store_false",
+                    help="compare raw rates (default: divide out the calibration loop's speed difference)")
+    su.add_argument("--quick", action="store_true",
+                    help="smaller sizes and shorter timings (a smoke test; too noisy for --compare)")
+    su.add_argument("--sizes", type=lambda v: [int(float(x)) for x in v.split(",")], default=None,
+                    help="Q-table entry counts (default 1e4,1e5,1e6,1e7; --quick 1e4,1e5)")
+    su.add_argument("--dict-max", type=int, default=1_000_000, help="largest dict QTable built (it needs ~300 B/entry)")
+    su.add_argument("--save-max", type=int, default=1_000_000, help="largest table timed for save/load")
+    su.add_argument("--positions", type=int, default=2000)
+    su.add_argument("--games", type=int, default=20)
+    su.add_argument("--seed", type=int, default=7)
+    su.set_defaults(fn=bench_suite)
+    args = ap.parse_args()
+    if args.cmd == "suite":
+        if args.quick and args.compare:
+            ap.error("--quick timings are too noisy to compare against a baseline; drop --quick")
+        if args.repeats < 1:
+            ap.error("--repeats must be at least 1")
+        args.sizes = args.sizes or ([10_000, 100_000] if args.quick else [10_000, 100_000, 1_000_000, 10_000_000])
+        if args.quick:
+            args.games = min(args.games, 5)
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# book.py
+# Opening book: positions looked up by Zobrist hash in a dict loaded at startup, so book
+# moves, hint arrows and opening commentary cost one hash + one dict probe instead of an
+# engine search. Two sources can be merged:
+#   - Polyglot .bin books (read through chess.polyglot; moves only, weighted)
+#   - PyBot's own JSON table (move, eval and PV), built offline from engine analysis:
+#       python3 book.py build --engine /usr/bin/stockfish --plies 10 --out pybot_book.json
+
+import argparse
+import json
+import random
+from collections import deque
+from typing import Dict, List, Optional
+
+import chess
+import chess.polyglot
+
+
+class BookEntry:
+    """Book answer for one position. cp (White's view) and pv are only known for entries
+    from PyBot's own table; Polyglot entries carry a weight instead."""
+
+    __slots__ = ("moves", "weights", "cp", "pv", "source")
+
+    def __init__(self, moves: List[chess.Move], weights: List[int], cp: Optional[int] = None,
+                 pv: Optional[List[chess.Move]] = None, source: str = "book"):
+        self.moves = moves
+        self.weights = weights
+        self.cp = cp
+        self.pv = pv or []
+        self.source = source
+
+    @property
+    def move(self) -> chess.Move:
+        """Main line move (highest weight)."""
+        return self.moves[max(range(len(self.moves)), key=self.weights.__getitem__)]
+
+    def choose(self, rng=random) -> chess.Move:
+        """Weighted random pick, for variety between games."""
+        return rng.choices(self.moves, weights=self.weights)[0] if len(self.moves) > 1 else self.moves[0]
+
+
+class OpeningBook:
+    """
+    Zobrist-keyed opening book built from any number of Polyglot .bin / PyBot .json files.
+    - entries from PyBot tables win over Polyglot entries for the same position.
+    - lookup() checks the move is legal, so a hash collision can't produce a bad move.
+    """
+
+    def __init__(self, paths: Optional[List[str]] = None):
+        self.entries: Dict[int, BookEntry] = {}
+        self.hits = 0
+        for path in paths or []:
+            self.load(path)
+
+    def load(self, path: str) -> int:
+        with open(path, "rb") as f:
+            head = f.read(1)
+        return self.load_table(path) if head == b"{" else self.load_polyglot(path)
+
+    def load_polyglot(self, path: str) -> int:
+        n = 0
+        with chess.polyglot.open_reader(path) as reader:
+            for e in reader:
+                entry = self.entries.get(e.key)
+                if entry is None:
+                    entry = self.entries[e.key] = BookEntry([], [], source="polyglot")
+                elif entry.source != "polyglot":
+                    continue
+                entry.moves.append(e.move)  # castling still in Polyglot's king-takes-rook form
+                entry.weights.append(max(1, e.weight))
+                n += 1
+        return n
+
+    def load_table(self, path: str) -> int:
+        with open(path) as f:
+            table = json.load(f)
+        for key, e in table.items():
+            self.entries[int(key)] = BookEntry([chess.Move.from_uci(e["move"])], [1], cp=e.get("cp"),
+                                               pv=[chess.Move.from_uci(u) for u in e.get("pv", [])], source="pybot")
+        return len(table)
+
+    def lookup(self, board: chess.Board) -> Optional[BookEntry]:
+        if not self.entries:
+            return None
+        entry = self.entries.get(chess.polyglot.zobrist_hash(board))
+        if entry is None:
+            return None
+        if entry.source == "polyglot":
+            legal = []
+            weights = []
+            for m, w in zip(entry.moves, entry.weights):
+                m = board._from_chess960(board.chess960, m.from_square, m.to_square, m.promotion, m.drop)
+                if board.is_legal(m):
+                    legal.append(m); weights.append(w)
+            if not legal:
+                return None
+            entry = BookEntry(legal, weights, source="polyglot")
+        elif not board.is_legal(entry.moves[0]):
+            return None
+        self.hits += 1
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# ---------------- offline builder ----------------
+def build(engine_path: str, plies: int = 10, width: int = 2, think: float = 0.3,
+          max_positions: int = 2000) -> Dict[str, dict]:
+    """Breadth-first from the start position: analyse with multipv=width, record the best move,
+    eval and PV, then expand the `width` best replies. Transpositions are analysed once."""
+    import chess.engine
+    limit = chess.engine.Limit(time=think)
+    table: Dict[str, dict] = {}
+    queue = deque([(chess.Board(), 0)])
+    with chess.engine.SimpleEngine.popen_uci(engine_path) as engine:
+        while queue and len(table) < max_positions:
+            board, depth = queue.popleft()
+            key = str(chess.polyglot.zobrist_hash(board))
+            if key in table or board.is_game_over():
+                continue
+            infos = engine.analyse(board, limit, multipv=width)
+            if not infos or not infos[0].get("pv"):
+                continue
+            best = infos[0]
+            table[key] = {"move": best["pv"][0].uci(),
+                          "cp": best["score"].white().score(mate_score=10000) if "score" in best else None,
+                          "pv": [m.uci() for m in best["pv"][:8]]}
+            if depth + 1 < plies:
+                for info in infos:
+                    if info.get("pv"):
+                        child = board.copy(stack=False)
+                        child.push(info["pv"][0])
+                        queue.append((child, depth + 1))
+            if len(table) % 50 == 0:
+                print(f"[PyBot] Book: {len(table)} positions (ply {depth})")
+    return table
+
+
+def main():
+    ap = argparse.ArgumentParser(description="PyBot opening book tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="analyse the opening tree with a UCI engine and write a JSON book")
+    b.add_argument("--engine", type=str, required=True)
+    b.add_argument("--plies", type=int, default=10, help="book depth in plies")
+    b.add_argument("--width", type=int, default=2, help="best moves followed per position")
+    b.add_argument("--time", type=float, default=0.3, help="engine seconds per position")
+    b.add_argument("--max-positions", type=int, default=2000)
+    b.add_argument("--out", type=str, default="pybot_book.json")
+    p = sub.add_parser("probe", help="print the book answer for a FEN")
+    p.add_argument("book", nargs="+")
+    p.add_argument("--fen", type=str, default=chess.STARTING_FEN)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        table = build(args.engine, plies=args.plies, width=args.width, think=args.time,
+                      max_positions=args.max_positions)
+        with open(args.out, "w") as f:
+            json.dump(table, f)
+        print(f"[PyBot] Wrote {len(table)} book positions to {args.out}")
+    else:
+        book = OpeningBook(args.book)
+        board = chess.Board(args.fen)
+        entry = book.lookup(board)
+        if entry is None:
+            print("[PyBot] Not in book.")
+        else:
+            print(f"[PyBot] {entry.source}: " + ", ".join(f"{board.san(m)} ({w})" for m, w in zip(entry.moves, entry.weights))
+                  + (f" | cp {entry.cp} | PV {board.variation_san(entry.pv)}" if entry.pv else ""))
+
+if __name__ == "__main__":
+    main()
@@ -2,35 +2,36 @@
 import os
 import json
 import random
-from typing import Dict, Optional
+import sqlite3
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import chess
+import chess.polyglot
+
+import qstore
+from replay import ReplayBuffer
+from evaluator import evaluate_batch, static_eval
+from evaluator import PIECE_VALUES, simple_material_eval  # re-exported: they lived here before evaluator.py
+from search import Searcher
+from book import OpeningBook
+from engine_pool import engine_identity
 
 try:
     import chess.engine  # optional: only needed if you pass an engine path
 except Exception:  # pragma: no cover
     chess = chess  # keep import name available
 
+try:
+    import numpy as np  # optional: vectorises update_batch arithmetic
+except Exception:  # pragma: no cover
+    np = None
 
-PIECE_VALUES = {
-    chess.PAWN: 100,
-    chess.KNIGHT: 320,
-    chess.BISHOP: 330,
-    chess.ROOK: 500,
-    chess.QUEEN: 900,
-    chess.KING: 0,
-}
-
-
-def simple_material_eval(board: chess.Board) -> int:
-    """Fallback static evaluation (centipawns) if no UCI engine is provided."""
-    score = 0
-    for piece_type, value in PIECE_VALUES.items():
-        score += len(board.pieces(piece_type, chess.WHITE)) * value
-        score -= len(board.pieces(piece_type, chess.BLACK)) * value
-    # positive = advantage white; negative = advantage black
-    # Convert to "side to move" perspective:
-    return score if board.turn == chess.WHITE else -score
+__all__ = ["QTable", "CompactQTable", "StoredQTable", "QTABLE_BACKENDS", "open_qtable", "EvalMemo", "ChessAI",
+           "encode_move", "decode_move", "canonical_state", "transform_move", "PIECE_VALUES", "simple_material_eval"]
 
 
 class QTable:
@@ -39,10 +40,19 @@ class QTable:
     def __init__(self):
         self.table: Dict[str, Dict[str, float]] = {}
 
-    def get(self, state: str, move: str) -> float:
+    @staticmethod
+    def state_key(board: chess.Board) -> str:
+        # Use 'fen without clocks' for a more compact (but still unique-ish) state id
+        return board.board_fen() + " " + ("w" if board.turn else "b") + " " + board.castling_xfen() + " " + (board.ep_square.__str__() if board.ep_square is not None else "-")
+
+    def get(self, state: str, move: Union[str, chess.Move]) -> float:
+        if isinstance(move, chess.Move):
+            move = move.uci()
         return self.table.get(state, {}).get(move, 0.0)
 
-    def set(self, state: str, move: str, value: float) -> None:
+    def set(self, state: str, move: Union[str, chess.Move], value: float) -> None:
+        if isinstance(move, chess.Move):
+            move = move.uci()
         self.table.setdefault(state, {})[move] = value
 
     def best_move(self, state: str, legal_moves) -> Optional[chess.Move]:
@@ -62,6 +72,14 @@ class QTable:
             return 0.0
         return max(self.table[state].values())
 
+    def apply_many(self, states: Sequence[str], codes: Sequence[int],
+                   update: Callable[[List[float]], List[float]]) -> None:
+        """Batch read-modify-write: new values = update(old values), one dict walk per entry."""
+        rows = [self.table.setdefault(s, {}) for s in states]
+        ucis = [_uci_of(c) for c in codes]
+        for row, u, v in zip(rows, ucis, update([row.get(u, 0.0) for row, u in zip(rows, ucis)])):
+            row[u] = v
+
     def save(self, path: str) -> None:
         with open(path, "w") as f:
             json.dump(self.table, f)
@@ -70,24 +88,536 @@ class QTable:
         with open(path) as f:
             self.table = json.load(f)
 
+    def __len__(self) -> int:
+        return sum(len(moves) for moves in self.table.values())
+
+
+def encode_move(move: Union[str, chess.Move, int]) -> int:
+    """16-bit move code: from | to << 6 | promotion << 12 (promotion piece type or 0)."""
+    if isinstance(move, int):
+        return move
+    if not isinstance(move, chess.Move):
+        move = chess.Move.from_uci(move)
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int) -> chess.Move:
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+
+_UCI: Dict[int, str] = {}
+
+def _uci_of(code: int) -> str:
+    uci = _UCI.get(code)
+    if uci is None:
+        uci = _UCI[code] = decode_move(code).uci()
+    return uci
+
+
+# Symmetries: the colour-flipped mirror of a position (colours swapped, ranks reversed) is the
+# same problem for the side to move, and so is the left-right mirror once neither side can
+# castle. With ChessAI(symmetry=True) every state is stored in one canonical frame.
+FLIP_COLOURS, FLIP_FILES = 1, 2
+
+def _layout(board: chess.Board) -> Tuple[int, ...]:
+    return (board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.pawns, board.knights,
+            board.bishops, board.rooks, board.queens, board.kings, -1 if board.ep_square is None else board.ep_square)
+
+
+def canonical_state(board: chess.Board, key_fn: Callable[[chess.Board], object]) -> Tuple[object, int]:
+    """(key, sym): key_fn of the position seen with White to move, file-mirrored when castling
+    is gone and the mirror's bitboards compare smaller (one key, whichever way it faces).
+    sym holds the flips applied (FLIP_* bits)."""
+    sym = 0
+    if board.turn == chess.BLACK:
+        board, sym = board.mirror(), FLIP_COLOURS
+    if not board.castling_rights:
+        layout = _layout(board)
+        flipped = tuple(chess.flip_horizontal(bb) for bb in layout[:8]) + ((layout[8] ^ 7) if layout[8] >= 0 else -1,)
+        if flipped < layout:
+            board, sym = board.transform(chess.flip_horizontal), sym | FLIP_FILES
+    return key_fn(board), sym
+
+
+def transform_move(move: chess.Move, sym: int) -> chess.Move:
+    """move under the flips in sym; each flip is its own inverse, so this maps both ways."""
+    if not sym:
+        return move
+    flip = (56 if sym & FLIP_COLOURS else 0) | (7 if sym & FLIP_FILES else 0)
+    return chess.Move(move.from_square ^ flip, move.to_square ^ flip, move.promotion)
+
+
+_EMPTY = -1
+_MIX = 0x9E3779B97F4A7C15  # golden-ratio multiplier to spread move codes across the index
+
+
+class CompactQTable:
+    """
+    Q-table keyed by 64-bit Zobrist hash with 16-bit move codes, stored in flat arrays
+    instead of a str-keyed dict per state.
+    - entries live in parallel arrays: state hash, move code, float32 value, next-in-state link.
+    - `_slots` is an open-addressed (linear probing) index from (state, move) to entry.
+    - `_head_*` is an open-addressed index from state to its newest entry, so best_move/max_q
+      can walk just that state's moves through the `_next` links.
+    Same get/set/best_move/max_q/save/load API as QTable; states come from state_key().
+    """
+
+    MAGIC = b"PBQC1\0\0\0"
+    LOAD = 0.7  # max fill of either index before it doubles
+
+    def __init__(self, capacity: int = 1 << 12):
+        self._keys = array("Q")    # state hash per entry
+        self._moves = array("H")   # move code per entry
+        self._vals = array("f")    # q-value per entry
+        self._next = array("i")    # next entry of the same state, or _EMPTY
+        self._states = 0
+        self._rebuild_slots(max(16, 1 << (capacity - 1).bit_length()))
+        self._rebuild_heads(max(16, self._mask + 1 >> 2))
+
+    @staticmethod
+    def state_key(board: chess.Board) -> int:
+        return chess.polyglot.zobrist_hash(board)
+
+    # -------- index helpers --------
+    def _rebuild_slots(self, cap: int) -> None:
+        self._mask = cap - 1
+        self._slots = array("i", [_EMPTY]) * cap
+        slots = self._slots
+        for e in range(len(self._keys)):
+            slots[self._pair_slot(self._keys[e], self._moves[e])] = e
+
+    def _rebuild_heads(self, cap: int) -> None:
+        self._hmask = cap - 1
+        self._head_keys = array("Q", [0]) * cap
+        self._head_idx = array("i", [_EMPTY]) * cap
+        for e in range(len(self._keys)):
+            self._set_head(self._keys[e], e)  # newest entry of a state ends up as its head
+
+    def _pair_slot(self, state: int, code: int) -> int:
+        """Slot holding (state, code), or the empty slot where it would go."""
+        mask, slots, keys, moves = self._mask, self._slots, self._keys, self._moves
+        i = (state ^ (code * _MIX)) & mask
+        while True:
+            e = slots[i]
+            if e == _EMPTY or (keys[e] == state and moves[e] == code):
+                return i
+            i = (i + 1) & mask
+
+    def _head_slot(self, state: int) -> int:
+        mask, hk, hi = self._hmask, self._head_keys, self._head_idx
+        i = (state >> 20) & mask
+        while hi[i] != _EMPTY and hk[i] != state:
+            i = (i + 1) & mask
+        return i
+
+    def _head(self, state: int) -> int:
+        return self._head_idx[self._head_slot(state)]
+
+    def _set_head(self, state: int, e: int) -> None:
+        i = self._head_slot(state)
+        self._head_keys[i] = state
+        self._head_idx[i] = e
+
+    # -------- QTable API --------
+    def get(self, state: int, move: Union[str, chess.Move]) -> float:
+        e = self._slots[self._pair_slot(state, encode_move(move))]
+        return 0.0 if e == _EMPTY else self._vals[e]
+
+    def lookup(self, state: int, code: int) -> Optional[float]:
+        """Value for an encoded move, or None if (state, code) was never set."""
+        e = self._slots[self._pair_slot(state, code)]
+        return None if e == _EMPTY else self._vals[e]
+
+    def moves(self, state: int) -> Iterator[Tuple[int, float]]:
+        """(move code, value) for every stored move of `state`."""
+        e = self._head(state)
+        while e != _EMPTY:
+            yield self._moves[e], self._vals[e]
+            e = self._next[e]
+
+    def items(self) -> Iterator[Tuple[int, int, float]]:
+        """(state, move code, value) for every entry, in insertion order."""
+        return zip(self._keys, self._moves, self._vals)
+
+    def set(self, state: int, move: Union[str, chess.Move], value: float) -> None:
+        code = encode_move(move)
+        slot = self._pair_slot(state, code)
+        e = self._slots[slot]
+        if e != _EMPTY:
+            self._vals[e] = value
+            return
+        e = len(self._keys)
+        hslot = self._head_slot(state)
+        prev = self._head_idx[hslot]
+        self._keys.append(state)
+        self._moves.append(code)
+        self._vals.append(value)
+        self._next.append(prev)
+        self._slots[slot] = e
+        self._head_keys[hslot] = state
+        self._head_idx[hslot] = e
+        if prev == _EMPTY:
+            self._states += 1
+            if self._states > self.LOAD * (self._hmask + 1):
+                self._rebuild_heads(2 * (self._hmask + 1))
+        if e + 1 > self.LOAD * (self._mask + 1):
+            self._rebuild_slots(2 * (self._mask + 1))
+
+    def best_move(self, state: int, legal_moves) -> Optional[chess.Move]:
+        if self._head(state) == _EMPTY:
+            return None
+        best = None
+        best_q = float("-inf")
+        slots, vals, pair_slot = self._slots, self._vals, self._pair_slot
+        for m in legal_moves:
+            e = slots[pair_slot(state, m.from_square | (m.to_square << 6) | ((m.promotion or 0) << 12))]
+            q = vals[e] if e != _EMPTY else float("-inf")
+            if q > best_q:
+                best_q, best = q, m
+        return best
+
+    def max_q(self, state: int) -> float:
+        e = self._head(state)
+        if e == _EMPTY:
+            return 0.0
+        best = float("-inf")
+        vals, nxt = self._vals, self._next
+        while e != _EMPTY:
+            if vals[e] > best:
+                best = vals[e]
+            e = nxt[e]
+        return best
+
+    def max_q_many(self, states: Sequence[int]) -> Dict[int, float]:
+        """{state: max_q(state)} for the distinct states given."""
+        out: Dict[int, float] = {}
+        hmask, hk, hi, vals, nxt = self._hmask, self._head_keys, self._head_idx, self._vals, self._next
+        for s in states:
+            if s in out:
+                continue
+            i = (s >> 20) & hmask
+            while hi[i] != _EMPTY and hk[i] != s:
+                i = (i + 1) & hmask
+            e = hi[i]
+            best = 0.0 if e == _EMPTY else vals[e]
+            while e != _EMPTY:
+                if vals[e] > best:
+                    best = vals[e]
+                e = nxt[e]
+            out[s] = best
+        return out
+
+    def apply_many(self, states: Sequence[int], codes: Sequence[int],
+                   update: Callable[[List[float]], List[float]]) -> None:
+        """Batch read-modify-write: new values = update(old values), one probe per entry."""
+        entries = []
+        keys, moves = self._keys, self._moves
+        for s, c in zip(states, codes):
+            # inlined _pair_slot (the index may be rebuilt by set(), so re-read it each time)
+            slots, mask = self._slots, self._mask
+            i = (s ^ (c * _MIX)) & mask
+            e = slots[i]
+            while e != _EMPTY and not (keys[e] == s and moves[e] == c):
+                i = (i + 1) & mask
+                e = slots[i]
+            if e == _EMPTY:
+                self.set(s, c, 0.0)
+                e = len(keys) - 1
+            entries.append(e)
+        vals = self._vals
+        for e, v in zip(entries, update([vals[e] for e in entries])):
+            vals[e] = v
+
+    # -------- persistence --------
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.MAGIC + struct.pack("<Q", len(self._keys)))
+            for arr in (self._keys, self._moves, self._vals, self._next):
+                arr.tofile(f)
+
+    def load(self, path: str) -> None:
+        with open(path, "rb") as f:
+            header = f.read(len(self.MAGIC) + 8)
+            if header[:len(self.MAGIC)] != self.MAGIC:
+                raise ValueError(f"{path} is not a compact Q-table file")
+            (n,) = struct.unpack("<Q", header[len(self.MAGIC):])
+            self._keys, self._moves, self._vals, self._next = array("Q"), array("H"), array("f"), array("i")
+            for arr in (self._keys, self._moves, self._vals, self._next):
+                arr.fromfile(f, n)
+        self._states = sum(1 for link in self._next if link == _EMPTY)  # oldest entry of each state
+        self._rebuild_slots(max(16, 1 << int(n / self.LOAD).bit_length()))
+        self._rebuild_heads(max(16, 1 << int(self._states / self.LOAD).bit_length()))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class StoredQTable:
+    """
+    Q-table persisted as a binary qstore file set: an mmap'd, sorted base file (zero-copy
+    lookups, O(1) load) plus an in-memory CompactQTable overlay holding this run's changes.
+    - save(path) to the file it was loaded from appends a delta segment with only the entries
+      changed since the last save; otherwise it writes a full base.
+    - once `compact_every` segments pile up they are folded into the base on a background
+      thread; call wait() (or close()) before exiting. The new base is swapped in by the
+      training thread (next save() or wait()), which then drops the overlay entries it holds.
+    """
+
+    def __init__(self, compact_every: int = 8):
+        self.base: Optional[qstore.MappedTable] = None
+        self.overlay = CompactQTable()
+        self.path: Optional[str] = None
+        self.compact_every = compact_every
+        self._dirty: set = set()
+        self._compactor: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # guards _compacted, the compactor's hand-off
+        self._compacted: Optional[qstore.MappedTable] = None
+
+    state_key = staticmethod(CompactQTable.state_key)
+
+    def _lookup(self, state: int, code: int) -> Optional[float]:
+        v = self.overlay.lookup(state, code)
+        if v is None and self.base is not None:
+            v = self.base.lookup(state, code)
+        return v
+
+    def get(self, state: int, move: Union[str, chess.Move]) -> float:
+        v = self._lookup(state, encode_move(move))
+        return 0.0 if v is None else v
+
+    def set(self, state: int, move: Union[str, chess.Move], value: float) -> None:
+        code = encode_move(move)
+        self.overlay.set(state, code, value)
+        self._dirty.add((state, code))
+
+    def best_move(self, state: int, legal_moves) -> Optional[chess.Move]:
+        best = None
+        best_q = float("-inf")
+        for m in legal_moves:
+            q = self._lookup(state, encode_move(m))
+            if q is not None and (best is None or q > best_q):
+                best_q, best = q, m
+        return best
+
+    def max_q(self, state: int) -> float:
+        values = dict(self.base.moves_of(state)) if self.base is not None else {}
+        values.update(self.overlay.moves(state))
+        return max(values.values()) if values else 0.0
+
+    # -------- persistence --------
+    def save(self, path: str) -> None:
+        self._install()
+        if path != self.path or self.base is None:
+            self.wait()
+            entries = self.base.items() if self.base is not None else iter(())
+            qstore.write_sorted(path, qstore.merge_sorted(entries, {(s, c): v for s, c, v in self.overlay.items()}))
+            for seg in qstore.segment_paths(path):
+                os.remove(seg)
+            self.base, self.path = qstore.MappedTable(path), path
+            self.overlay = CompactQTable()  # everything is in the base now
+        elif self._dirty:
+            qstore.write_table(qstore.next_segment_path(path),
+                               ((s, c, self.overlay.lookup(s, c)) for s, c in self._dirty))
+            if len(qstore.segment_paths(path)) >= self.compact_every and not self.compacting:
+                self._compactor = threading.Thread(target=self._compact, args=(path,), daemon=True)
+                self._compactor.start()
+        self._dirty.clear()
+
+    def _compact(self, path: str) -> None:
+        qstore.compact(path)
+        table = qstore.MappedTable(path)
+        with self._lock:
+            self._compacted = table  # installed by the training thread, which owns base and overlay
+
+    def _install(self) -> None:
+        """Swap in a finished compaction's base and keep only the overlay entries it lacks:
+        values changed since (unsaved, or in segments written while it ran)."""
+        with self._lock:
+            table, self._compacted = self._compacted, None
+            if table is None:
+                return
+            overlay = CompactQTable()
+            for s, c, v in self.overlay.items():
+                if (s, c) in self._dirty or table.lookup(s, c) != v:
+                    overlay.set(s, c, v)
+            self.base, self.overlay = table, overlay
+
+    @property
+    def compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def wait(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+        self._install()
+
+    def load(self, path: str) -> None:
+        self.wait()
+        self.base = qstore.MappedTable(path)
+        self.overlay = CompactQTable()
+        for seg in qstore.segment_paths(path):
+            for s, c, v in qstore.MappedTable(seg).items():
+                self.overlay.set(s, c, v)
+        self.path = path
+        self._dirty.clear()
+
+    def __len__(self) -> int:
+        base = len(self.base) if self.base is not None else 0
+        return base + sum(1 for s, c, _ in self.overlay.items() if self.base is None or self.base.lookup(s, c) is None)
+
+
+QTABLE_BACKENDS = {"dict": QTable, "compact": CompactQTable, "stored": StoredQTable}
+
+
+def open_qtable(path: str):
+    """Load a saved Q-table, picking the backend from the file contents."""
+    with open(path, "rb") as f:
+        head = f.read(len(CompactQTable.MAGIC))
+    if head.startswith(b'{"linear'):
+        from linear_q import LinearQ  # deferred: linear_q uses the coach's constants, and coach imports us
+        q = LinearQ()
+    elif head.startswith(qstore.MAGIC):
+        q = StoredQTable()
+    elif head == CompactQTable.MAGIC:
+        q = CompactQTable()
+    else:
+        q = QTable()
+    q.load(path)
+    return q
+
+
+class EvalMemo:
+    """
+    Evaluation memo keyed by (Zobrist hash, how the value was computed), e.g.
+    "engine Stockfish 16 by the Stockfish developers [Hash=16,Threads=1] time=0.1",
+    so a position reached again — in the same game, another game, or a later run — is not re-searched.
+    - in-memory tier: LRU of at most `size` entries.
+    - optional on-disk tier: a sqlite file shared across training runs; new values are written in
+      batches of `flush_every` (call flush()/close() at the end).
+    - hits / misses count lookups; a disk hit counts as a hit.
+    """
+
+    def __init__(self, size: int = 100_000, path: Optional[str] = None, flush_every: int = 500):
+        self.size = size
+        self.entries: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.flush_every = flush_every
+        self._pending: List[Tuple[int, str, float]] = []
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("CREATE TABLE IF NOT EXISTS evals (zobrist INTEGER, label TEXT, value REAL, "
+                            "PRIMARY KEY (zobrist, label)) WITHOUT ROWID")
+
+    @staticmethod
+    def _signed(z: int) -> int:
+        return z - (1 << 64) if z >= (1 << 63) else z  # sqlite INTEGER is signed 64-bit
+
+    def get(self, board: chess.Board, label: str) -> Optional[float]:
+        key = (chess.polyglot.zobrist_hash(board), label)
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.db is not None:
+            row = self.db.execute("SELECT value FROM evals WHERE zobrist = ? AND label = ?",
+                                  (self._signed(key[0]), label)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                self.hits += 1
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, board: chess.Board, label: str, value: float) -> None:
+        key = (chess.polyglot.zobrist_hash(board), label)
+        self._remember(key, value)
+        if self.db is not None:
+            self._pending.append((self._signed(key[0]), label, value))
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def _remember(self, key: Tuple[int, str], value: float) -> None:
+        if self.size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def flush(self) -> None:
+        if self.db is not None and self._pending:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO evals VALUES (?, ?, ?)", self._pending)
+            self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        return f"memo {self.hits}/{total} hits ({100.0 * self.hits / total if total else 0.0:.0f}%)"
+
 
 class ChessAI:
     """
     Tiny, educational Q-learning chess bot (ε-greedy).
     - If ENGINE_PATH env or __init__ arg is provided, uses a UCI engine for reward shaping.
-    - Otherwise falls back to a simple material evaluation.
+    - `engine` may instead be a shared engine or EnginePool (the caller keeps ownership).
+    - `memo` (EvalMemo) skips engine searches for positions already evaluated.
+    - Otherwise falls back to a static evaluation: material, plus piece-square tables if `positional`.
+    - policy="search" picks moves with the built-in alpha-beta Searcher (search_time seconds per
+      move) instead of the Q-table; without an engine it also scores positions by quiescence search.
+    - policy="linear" replaces the table with a linear Q-function over move features (LinearQ):
+      constant memory, and it generalises to positions it has never seen.
+    - `book` (OpeningBook): book positions are answered by a dict lookup before any policy runs.
+    - `replay` (ReplayBuffer) defers learning: remember() queues transitions and learn_from_replay()
+      applies replay_ratio sampled transitions per new one, in batches of `replay_batch`.
+    - `symmetry` keys states by their canonical form (canonical_state), so a position, its
+      colour-flipped mirror and (without castling rights) its left-right mirror share Q-values.
+      Values are then for the side to move, and the next state's value is the opponent's.
     Note: This is intentionally simple and not strong. It's a learning scaffold.
     """
 
-    def __init__(self, engine_path: Optional[str] = None, alpha=0.1, gamma=0.9, epsilon=0.2):
+    EVAL_LIMIT = 0.1  # engine seconds per evaluate()
+
+    def __init__(self, engine_path: Optional[str] = None, alpha=0.1, gamma=0.9, epsilon=0.2,
+                 qtable: str = "dict", engine=None, memo: Optional[EvalMemo] = None, positional: bool = False,
+                 policy: str = "q", search_time: float = 0.5,
+                 replay: Optional[ReplayBuffer] = None, replay_batch: int = 256, replay_ratio: float = 1.0,
+                 book: Optional[OpeningBook] = None, symmetry: bool = False):
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
-        self.q = QTable()
+        if policy == "linear":
+            from linear_q import LinearQ  # deferred: linear_q uses the coach's constants, and coach imports us
+            self.q = LinearQ()
+        else:
+            self.q = QTABLE_BACKENDS[qtable]()
+        self.memo = memo
+        self.positional = positional
+        self.policy = policy
+        self.search_time = search_time
+        self.searcher: Optional[Searcher] = None
+        self.replay = replay
+        self.replay_batch = replay_batch
+        self.replay_ratio = replay_ratio
+        self.book = book
+        self.symmetry = symmetry
+        if policy == "search":
+            self.searcher = engine if isinstance(engine, Searcher) else Searcher()
 
-        self.engine = None
+        self.engine = engine
+        self._owns_engine = engine is None
+        self._eval_label: Optional[str] = None
         engine_path = engine_path or os.getenv("PYBOT_ENGINE", "").strip()
-        if engine_path:
+        if engine is None and engine_path:
             try:
                 self.engine = chess.engine.SimpleEngine.popen_uci(engine_path)  # type: ignore[attr-defined]
             except Exception as e:
@@ -95,48 +625,168 @@ class ChessAI:
                 self.engine = None
 
     # -------- state helpers --------
-    @staticmethod
-    def state(board: chess.Board) -> str:
-        # Use 'fen without clocks' for a more compact (but still unique-ish) state id
-        return board.board_fen() + " " + ("w" if board.turn else "b") + " " + board.castling_xfen() + " " + (board.ep_square.__str__() if board.ep_square is not None else "-")
+    def state(self, board: chess.Board):
+        # Key format depends on the Q-table backend (FEN-ish string or Zobrist hash)
+        if self.symmetry:
+            return canonical_state(board, self.q.state_key)[0]
+        return self.q.state_key(board)
+
+    def frame(self, board: chess.Board) -> Tuple[object, int]:
+        """(state, sym): the state key and the flips taking the board's moves into its frame.
+        Learners store transform_move(move, sym); sym is 0 unless `symmetry` is on."""
+        if self.symmetry:
+            return canonical_state(board, self.q.state_key)
+        return self.q.state_key(board), 0
+
+    @property
+    def eval_label(self) -> str:
+        """How engine evaluations are produced: the engine's identity and options and the time
+        limit. Part of the EvalMemo key, so a disk tier is never served by another engine."""
+        if self._eval_label is None:
+            self._eval_label = f"engine {engine_identity(self.engine)} time={self.EVAL_LIMIT}"
+        return self._eval_label
 
     def evaluate(self, board: chess.Board) -> float:
         if self.engine is not None:
+            # Only engine results are memoised: material eval is cheaper than hashing the board
+            if self.memo is not None:
+                cached = self.memo.get(board, self.eval_label)
+                if cached is not None:
+                    return cached
             try:
-                info = self.engine.analyse(board, chess.engine.Limit(time=0.1))  # type: ignore[attr-defined]
+                info = self.engine.analyse(board, chess.engine.Limit(time=self.EVAL_LIMIT))  # type: ignore[attr-defined]
                 cp = info["score"].relative.score(mate_score=10000)
-                if cp is None:
-                    return 0.0
-                return float(cp)
+                value = 0.0 if cp is None else float(cp)
+                if self.memo is not None:
+                    self.memo.put(board, self.eval_label, value)
+                return value
             except Exception:
                 pass
-        return float(simple_material_eval(board))
+        if self.searcher is not None:
+            return float(self.searcher.quiescence(board))
+        return float(static_eval(board, self.positional))
+
+    @property
+    def batched_engine(self) -> bool:
+        """True if evaluate_many() really runs positions concurrently (an EnginePool of 2+)."""
+        return getattr(self.engine, "size", 1) > 1
+
+    @property
+    def batched_eval(self) -> bool:
+        """True if scoring positions through evaluate_many() beats one evaluate() at a time."""
+        return self.batched_engine or (self.engine is None and self.searcher is None and self.positional)
+
+    def evaluate_many(self, boards: Sequence[chess.Board]) -> List[float]:
+        """evaluate() for a batch; spread over the engine pool when there is one."""
+        if self.batched_engine:
+            values: List[Optional[float]] = [None] * len(boards)
+            if self.memo is not None:
+                values = [self.memo.get(b, self.eval_label) for b in boards]
+            todo = [i for i, v in enumerate(values) if v is None]
+            try:
+                cps = self.engine.evaluate_many([boards[i] for i in todo], chess.engine.Limit(time=self.EVAL_LIMIT))  # type: ignore[union-attr]
+                for i, cp in zip(todo, cps):
+                    values[i] = 0.0 if cp is None else float(cp)
+                    if self.memo is not None:
+                        self.memo.put(boards[i], self.eval_label, values[i])
+                return values  # type: ignore[return-value]
+            except Exception:
+                pass
+        if self.engine is None and self.searcher is None:
+            return [float(v) for v in evaluate_batch(boards, self.positional)]
+        return [self.evaluate(b) for b in boards]
 
     # -------- policy --------
-    def choose_move(self, board: chess.Board) -> chess.Move:
-        s = self.state(board)
-        legal = list(board.legal_moves)
+    def choose_move(self, board: chess.Board, state=None, legal: Optional[List[chess.Move]] = None,
+                    sym: Optional[int] = None) -> chess.Move:
+        """ε-greedy move. Callers that already have the state key (and, with `symmetry`, its sym
+        from frame()) or the legal move list (e.g. training rollouts) can pass them."""
+        if self.book is not None:
+            entry = self.book.lookup(board)
+            if entry is not None:
+                return entry.choose()
+        if state is None or (sym is None and self.symmetry):
+            state, sym = self.frame(board)
+        s = state
+        if legal is None:
+            legal = list(board.legal_moves)
 
         # Explore
         if random.random() < self.epsilon:
             return random.choice(legal)
 
         # Exploit
+        if self.searcher is not None:
+            return self.searcher.best_move(board, time_limit=self.search_time) or random.choice(legal)
+        if sym:  # rank the moves in the state's frame, play the winner on the real board
+            best = self.q.best_move(s, [transform_move(m, sym) for m in legal])
+            return random.choice(legal) if best is None else transform_move(best, sym)
         best = self.q.best_move(s, legal)
         if best is None:
             return random.choice(legal)
         return best
 
     # -------- learning --------
-    def update(self, s: str, a: chess.Move, reward: float, s_next: str):
-        old_q = self.q.get(s, a.uci())
-        target = reward + self.gamma * self.q.max_q(s_next)
+    @property
+    def discount(self) -> float:
+        """Weight of the next state's best value: negated under `symmetry` or a side-to-move
+        model (LinearQ), where that value is the opponent's."""
+        return -self.gamma if self.symmetry or getattr(self.q, "relative", False) else self.gamma
+
+    def update(self, s, a: chess.Move, reward: float, s_next):
+        """TD update; `a` is in s's frame (transform_move(move, sym) with sym from frame())."""
+        old_q = self.q.get(s, a)
+        target = reward + self.discount * self.q.max_q(s_next)
         new_q = old_q + self.alpha * (target - old_q)
-        self.q.set(s, a.uci(), new_q)
+        self.q.set(s, a, new_q)
+
+    def remember(self, s, a: chess.Move, reward: float, s_next):
+        """update() right away, or queue the transition when learning from a replay buffer."""
+        if self.replay is None:
+            self.update(s, a, reward, s_next)
+        else:
+            self.replay.push(s, encode_move(a), reward, s_next)
+
+    def update_batch(self, states: Sequence, codes: Sequence[int], rewards: Sequence[float], next_states: Sequence):
+        """TD update for a batch of transitions (moves as encode_move codes). Every target uses
+        the Q-values from before the batch, and max_q runs once per distinct next state."""
+        q = self.q
+        if hasattr(q, "max_q_many"):
+            max_q = q.max_q_many(next_states)
+        else:
+            max_q = {}
+            for s2 in next_states:
+                if s2 not in max_q:
+                    max_q[s2] = q.max_q(s2)
+        nxt = [max_q[s2] for s2 in next_states]
+        alpha, gamma = self.alpha, self.discount
+
+        def td(old: List[float]) -> List[float]:
+            if np is not None and len(old) >= 256:
+                o = np.asarray(old)
+                return (o + alpha * (np.asarray(rewards) + gamma * np.asarray(nxt) - o)).tolist()
+            return [o + alpha * (r + gamma * m - o) for o, r, m in zip(old, rewards, nxt)]
+
+        if hasattr(q, "apply_many"):
+            q.apply_many(states, codes, td)
+        else:
+            for s, c, v in zip(states, codes, td([q.get(s, c) for s, c in zip(states, codes)])):
+                q.set(s, c, v)
+
+    def learn_from_replay(self, new: int) -> int:
+        """After `new` transitions were remembered, apply replay_ratio * new sampled ones."""
+        n, done = round(self.replay_ratio * new), 0
+        while self.replay is not None and len(self.replay) and done < n:
+            k = min(self.replay_batch, n - done)
+            self.update_batch(*self.replay.batch(self.replay.sample(k)))
+            done += k
+        return done
 
     def close(self):
+        if self.memo is not None:
+            self.memo.close()
         try:
-            if self.engine is not None:
+            if self.engine is not None and self._owns_engine:
                 self.engine.quit()  # type: ignore[attr-defined]
         except Exception:
             pass
@@ -0,0 +1,416 @@
+# coach.py
+# PyBot's coaching logic without any UI: natural-language move descriptions, engine
+# eval/PV helpers (cached, book-aware), rationale, move feedback and hanging-piece checks.
+# Used by the pygame coach (play_pygame_pro.py) and the headless annotator (annotate.py).
+
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import chess
+
+from chess_ai import ChessAI
+from evaluator import simple_material_eval
+from book import OpeningBook
+from analysis import AnalysisCache
+from perf import timed
+from tactics import TacticsReport, hanging_pieces
+from tactics import analyse as analyse_tactics
+
+# ---------------- NL helpers ----------------
+PIECE_WORD = {
+    chess.KING: "King", chess.QUEEN: "Queen", chess.ROOK: "Rook",
+    chess.BISHOP: "Bishop", chess.KNIGHT: "Knight", chess.PAWN: "Pawn"
+}
+CENTER_SQS = {chess.D4, chess.E4, chess.D5, chess.E5}
+DEV_START = {
+    chess.WHITE: [chess.B1, chess.G1, chess.C1, chess.F1],  # knights, bishops
+    chess.BLACK: [chess.B8, chess.G8, chess.C8, chess.F8],
+}
+
+def side_word(color: bool) -> str:
+    return "White" if color == chess.WHITE else "Black"
+
+def cp_to_words(cp: Optional[int]) -> str:
+    if cp is None: return "Position unclear."
+    if cp >= 200: return "White has a strong advantage."
+    if cp >= 70:  return "White is better."
+    if cp >= 20:  return "White is slightly better."
+    if cp > -20:  return "Roughly equal."
+    if cp > -70:  return "Black is slightly better."
+    if cp > -200: return "Black is better."
+    return "Black has a strong advantage."
+
+def human_square(sq: int) -> str:
+    return chess.square_name(sq)
+
+def move_tags(b: chess.Board, m: chess.Move) -> List[str]:
+    # PV and scratch boards are described too: reuse a cached state, but never add one for them
+    state = _cached_state(b)
+    return list(state.tags(m)) if state is not None else _move_tags(b, m)
+
+def _move_tags(b: chess.Board, m: chess.Move) -> List[str]:
+    tags: List[str] = []
+    if b.is_castling(m): tags.append("castling")
+    if b.is_capture(m):  tags.append("capture")
+    if b.gives_check(m): tags.append("check")
+    if m.to_square in CENTER_SQS: tags.append("controls center")
+    # simple development heuristic
+    pc = b.piece_at(m.from_square)
+    if pc and pc.piece_type in (chess.KNIGHT, chess.BISHOP):
+        start_rank = 1 if pc.color == chess.WHITE else 6
+        if chess.square_rank(m.from_square) == start_rank:
+            tags.append("develops")
+    return tags
+
+def describe_move(b: chess.Board, m: chess.Move) -> str:
+    pc = b.piece_at(m.from_square)
+    if not pc:  # fallback
+        return b.san(m)
+    piece = PIECE_WORD[pc.piece_type]
+    frm, to = human_square(m.from_square), human_square(m.to_square)
+    tags = move_tags(b, m)
+    # victim before push
+    if b.is_capture(m):
+        victim = b.piece_at(m.to_square)
+        if victim:
+            tags.insert(0, f"takes {side_word(victim.color)} {PIECE_WORD[victim.piece_type]}")
+    extra = " — " + "; ".join(tags) if tags else ""
+    return f"{piece} {frm}→{to}{extra}"
+
+# ---------------- Position state ----------------
+class PositionState:
+    """
+    What the coach derives from one position, computed at most once and only when asked:
+    legal moves grouped by from-square, the tactics report (attacks, hanging pieces, forks,
+    pins), capture / check / centre move lists and move tags. Get one with state_for(board); a changed board
+    (push, pop, reset) has a different key, so stale state is never reused.
+    """
+
+    def __init__(self, board: chess.Board):
+        self.board = board.copy(stack=False)
+        self._legal: Optional[List[chess.Move]] = None
+        self._moves_from: Optional[Dict[int, List[chess.Move]]] = None
+        self._tactics: Optional[TacticsReport] = None
+        self._hanging: Dict[bool, List[int]] = {}
+        self._tags: Dict[chess.Move, Tuple[str, ...]] = {}
+        self._lists: Dict[str, List[chess.Move]] = {}
+
+    @property
+    def legal(self) -> List[chess.Move]:
+        if self._legal is None:
+            self._legal = list(self.board.legal_moves)
+        return self._legal
+
+    @property
+    def moves_from(self) -> Dict[int, List[chess.Move]]:
+        if self._moves_from is None:
+            grouped: Dict[int, List[chess.Move]] = {}
+            for m in self.legal:
+                grouped.setdefault(m.from_square, []).append(m)
+            self._moves_from = grouped
+        return self._moves_from
+
+    def targets(self, from_sq: Optional[int]) -> List[int]:
+        return [m.to_square for m in self.moves_from.get(from_sq, ())] if from_sq is not None else []
+
+    def find_move(self, from_sq: int, to_sq: int) -> Optional[chess.Move]:
+        """The legal move from_sq→to_sq (queen promotion preferred), or None."""
+        found = None
+        for m in self.moves_from.get(from_sq, ()):
+            if m.to_square == to_sq:
+                if m.promotion in (None, chess.QUEEN):
+                    return m
+                found = found or m
+        return found
+
+    @property
+    def tactics(self) -> TacticsReport:
+        """Attack maps, hanging pieces (SEE), forks and pins for both sides."""
+        if self._tactics is None:
+            self._tactics = analyse_tactics(self.board)
+        return self._tactics
+
+    def hanging(self, color: bool) -> List[int]:
+        """color's pieces the opponent wins material by capturing (highest square first)."""
+        hangs = self._hanging.get(color)
+        if hangs is None:
+            if self._tactics is not None:
+                hangs = self._tactics.hanging[color]
+            else:
+                hangs = [sq for sq, _ in hanging_pieces(self.board, color)]
+            self._hanging[color] = hangs
+        return hangs
+
+    def tags(self, m: chess.Move) -> Tuple[str, ...]:
+        t = self._tags.get(m)
+        if t is None:
+            t = self._tags[m] = tuple(_move_tags(self.board, m))
+        return t
+
+    def _moves_where(self, name: str, pred) -> List[chess.Move]:
+        moves = self._lists.get(name)
+        if moves is None:
+            moves = self._lists[name] = [m for m in self.legal if pred(m)]
+        return moves
+
+    @property
+    def captures(self) -> List[chess.Move]:
+        return self._moves_where("captures", self.board.is_capture)
+
+    @property
+    def checks(self) -> List[chess.Move]:
+        return self._moves_where("checks", self.board.gives_check)
+
+    @property
+    def center_moves(self) -> List[chess.Move]:
+        return self._moves_where("center", lambda m: m.to_square in CENTER_SQS)
+
+
+_STATES: "OrderedDict[tuple, PositionState]" = OrderedDict()
+_STATES_LOCK = threading.Lock()  # the UI thread and the analysis worker both ask
+STATE_CACHE_SIZE = 256
+
+def state_for(board: chess.Board) -> PositionState:
+    """The PositionState of board's current position (LRU: going back a move is a hit)."""
+    key = board._transposition_key()
+    with _STATES_LOCK:
+        state = _STATES.get(key)
+        if state is not None:
+            _STATES.move_to_end(key)
+            return state
+    state = PositionState(board)
+    with _STATES_LOCK:
+        _STATES[key] = state
+        if len(_STATES) > STATE_CACHE_SIZE:
+            _STATES.popitem(last=False)
+    return state
+
+def _cached_state(board: chess.Board) -> Optional[PositionState]:
+    """board's PositionState if it is already cached; never creates or promotes one."""
+    with _STATES_LOCK:
+        return _STATES.get(board._transposition_key())
+
+# ---------------- Engine helpers ----------------
+def autodetect_engine(explicit: str) -> str:
+    if explicit: return explicit
+    env = os.getenv("PYBOT_ENGINE", "").strip()
+    if env: return env
+    on_path = shutil.which("stockfish")
+    if on_path: return on_path
+    for c in ["/opt/homebrew/bin/stockfish", "/usr/local/bin/stockfish", "/usr/bin/stockfish", "/usr/games/stockfish"]:
+        if os.path.exists(c): return c
+    return ""
+
+# One cache shared by the hint arrow, engine_rationale and coaching_feedback, so a position
+# is analysed at most once per time budget (resized from --analysis-cache in main()).
+ANALYSIS_CACHE = AnalysisCache(maxsize=512)
+COACH_TIME = 0.25   # budget for engine_rationale / coaching_feedback (and ponder-ahead)
+HINT_TIME = 0.2     # budget for the hint arrow and the position after a move
+
+Analysis = Tuple[Optional[int], List[chess.Move]]   # (cp from White's view, principal variation)
+
+# Opening book (--book): book positions are answered by a dict probe instead of the engine
+BOOK: Optional[OpeningBook] = None
+
+def book_line(board: chess.Board) -> Optional[Analysis]:
+    """(cp, pv) for a book position (cp is None for Polyglot-only entries), else None."""
+    entry = BOOK.lookup(board) if BOOK is not None else None
+    if entry is None: return None
+    return entry.cp, entry.pv or [entry.move]
+
+def info_eval_and_pv(info: dict) -> Analysis:
+    cp = None; pv: List[chess.Move] = []
+    if "score" in info:
+        cp = info["score"].white().score(mate_score=10000)
+    if "pv" in info and info["pv"]:
+        pv = list(info["pv"])
+    return cp, pv
+
+def engine_eval_and_pv(bot: ChessAI, board: chess.Board, time_limit=0.2) -> Analysis:
+    cp = None; pv: List[chess.Move] = []
+    booked = book_line(board)
+    if booked is not None and booked[0] is not None: return booked
+    if bot.engine is None: return cp, pv
+    try:
+        info = ANALYSIS_CACHE.analyse(bot.engine, board, chess.engine.Limit(time=time_limit))  # type: ignore[attr-defined]
+        cp, pv = info_eval_and_pv(info)
+    except Exception:
+        pass
+    return cp, pv
+
+def engine_eval_and_pv_many(bot: ChessAI, boards: List[chess.Board], time_limits: List[float]) -> List[Analysis]:
+    """engine_eval_and_pv for several positions at once (concurrent when bot.engine is a pool)."""
+    if bot.engine is None: return [(None, []) for _ in boards]
+    booked = [book_line(b) for b in boards]
+    todo = [i for i, bk in enumerate(booked) if bk is None or bk[0] is None]
+    try:
+        limits = [chess.engine.Limit(time=time_limits[i]) for i in todo]  # type: ignore[attr-defined]
+        infos = ANALYSIS_CACHE.analyse_many(bot.engine, [boards[i] for i in todo], limits)
+        for i, info in zip(todo, infos):
+            booked[i] = info_eval_and_pv(info)
+        return booked  # type: ignore[return-value]
+    except Exception:
+        return [engine_eval_and_pv(bot, b, t) for b, t in zip(boards, time_limits)]
+
+# ---------------- Teaching builders ----------------
+GOOD_LOSS = 40      # centipawns given up vs the best move that still count as a good move
+BLUNDER_LOSS = 120  # ... and from here on it is a blunder
+
+def cp_loss(best_cp: int, after_cp: int, mover: bool) -> int:
+    """Centipawns `mover` gave up compared with the engine's best line (evals from White's view)."""
+    diff = best_cp - after_cp if mover == chess.WHITE else after_cp - best_cp
+    return max(0, diff)
+
+def classify_loss(loss: int) -> str:
+    if loss < GOOD_LOSS: return "good"
+    if loss < BLUNDER_LOSS: return "inaccuracy"
+    return "blunder"
+
+@timed("engine_rationale")
+def engine_rationale(bot: ChessAI, board: chess.Board, analysis: Optional[Analysis] = None) -> List[str]:
+    """Natural-language explanation using engine if available, else heuristics.
+    Pass `analysis` (e.g. from a stream) to skip the engine call; book positions never reach it."""
+    lines: List[str] = []
+    booked = book_line(board)
+    if booked is not None:
+        lines.append(f"Book move: {board.san(booked[1][0])}")
+        if analysis is None: analysis = booked
+    cp, pv = analysis if analysis is not None else engine_eval_and_pv(bot, board, time_limit=COACH_TIME)
+    if cp is not None:
+        lines.append(cp_to_words(cp))
+        lines.append(f"Eval (cp): {cp}")
+        if pv:
+            b2 = board.copy()
+            lines.append("Plan:")
+            for mv in pv[:4]:
+                lines.append(f"  • {describe_move(b2, mv)}")
+                b2.push(mv)
+            # SAN PV for quick reference
+            b3 = board.copy()
+            san = []
+            for mv in pv[:8]:
+                san.append(b3.san(mv)); b3.push(mv)
+            lines.append("PV (SAN): " + " ".join(san))
+        return lines
+
+    # Heuristic fallback
+    mat = simple_material_eval(board)
+    lines.append(cp_to_words(mat))
+    lines.append(f"Material (side to move): {mat} cp")
+    state = state_for(board)
+    caps, checks, center = state.captures, state.checks, state.center_moves
+    if caps:
+        lines.append(f"{len(caps)} capture{'s' if len(caps)!=1 else ''} available. Examples:")
+        b2 = board.copy()
+        for m in caps[:2]:
+            lines.append(f"  • {describe_move(b2, m)}")
+    if checks: lines.append(f"{len(checks)} checking move{'s' if len(checks)!=1 else ''} available.")
+    if center: lines.append(f"{len(center)} move{'s' if len(center)!=1 else ''} increase center control.")
+    return lines
+
+@timed("coaching_feedback")
+def coaching_feedback(bot: ChessAI, before: chess.Board, move: chess.Move, after: chess.Board,
+                      before_analysis: Optional[Analysis] = None,
+                      after_analysis: Optional[Analysis] = None) -> Tuple[List[str], bool]:
+    """Explain player's move vs engine best; return (lines, is_blunder) for red outline."""
+    lines: List[str] = []
+    is_blunder = False
+    if before_analysis is None and after_analysis is None:
+        # both searches at once: they run side by side on an engine pool
+        before_analysis, after_analysis = engine_eval_and_pv_many(bot, [before, after], [COACH_TIME, HINT_TIME])
+    best_cp, best_pv = before_analysis if before_analysis is not None else engine_eval_and_pv(bot, before, time_limit=COACH_TIME)
+    after_cp, _ = after_analysis if after_analysis is not None else engine_eval_and_pv(bot, after, time_limit=HINT_TIME)
+
+    lines.append(f"You played: {describe_move(before, move)}")
+
+    if best_cp is None or after_cp is None:
+        lines.append("Coach: Position unclear.")
+        return lines, is_blunder
+
+    verdict = classify_loss(cp_loss(best_cp, after_cp, before.turn))
+    if verdict == "good":
+        lines.append("✅ Good! Keeps the position about equal.")
+    elif verdict == "inaccuracy":
+        lines.append("⚠️ Not the best. There was a stronger idea:")
+    else:
+        lines.append("⛔ Blunder: this loses too much compared with the best move.")
+        is_blunder = True
+
+    if best_pv:
+        btmp = before.copy()
+        suggestion = describe_move(btmp, best_pv[0])
+        btmp.push(best_pv[0])
+        lines.append(f"Coach suggests: {suggestion}")
+        tags = move_tags(before, best_pv[0])
+        if "develops" in tags:
+            lines.append("Because it develops a piece toward the center.")
+        elif "controls center" in tags:
+            lines.append("Because it fights for the center (d4/e4/d5/e5).")
+        elif "capture" in tags:
+            lines.append("Because it wins material or removes a key defender.")
+        elif "castling" in tags:
+            lines.append("Because it makes your king safer (castling).")
+    lines.append("Tips: open with center pawns, develop knights/bishops, castle early, avoid hanging pieces.")
+    return lines, is_blunder
+
+def find_hanging_pieces(board: chess.Board, color: bool) -> List[int]:
+    """Squares of color's pieces the opponent wins material by capturing: undefended, or
+    defended by too few or too valuable pieces (static exchange evaluation)."""
+    return list(state_for(board).hanging(color))
+
+def tactic_lines(board: chess.Board, limit: int = 2) -> List[str]:
+    """Forks and pins on the board, in words (at most `limit` of each)."""
+    rep = state_for(board).tactics
+    lines: List[str] = []
+    for f in rep.forks[:limit]:
+        pc = board.piece_at(f.square)
+        hit = ", ".join(f"{PIECE_WORD[board.piece_type_at(t)]} {human_square(t)}" for t in f.targets)
+        lines.append(f"Fork: {side_word(f.color)} {PIECE_WORD[pc.piece_type]} {human_square(f.square)} hits {hit}")
+    for p in rep.pins[:limit]:
+        pc, by = board.piece_at(p.square), board.piece_at(p.pinner)
+        lines.append(f"Pin: {side_word(pc.color)} {PIECE_WORD[pc.piece_type]} {human_square(p.square)} "
+                     f"is pinned to the king by the {PIECE_WORD[by.piece_type]} on {human_square(p.pinner)}")
+    return lines
+
+def move_commentary(bot: ChessAI, before: chess.Board, move: chess.Move, after: chess.Board,
+                    coach: bool, hints: bool, tactics: bool,
+                    before_analysis: Optional[Analysis] = None,
+                    after_analysis: Optional[Analysis] = None) -> Tuple[List[str], bool]:
+    """Sidebar lines after `move` (rationale, plus feedback/hanging warnings when coaching a human).
+    Runs on the AnalysisWorker thread (boards must be private copies), or on the UI thread
+    when both analyses are supplied by a stream, in which case the engine is not touched."""
+    lines = engine_rationale(bot, after, after_analysis)
+    is_blunder = False
+    if not coach:
+        return lines, is_blunder
+    # feedback for your move (hints ON)
+    if hints:
+        fb, is_blunder = coaching_feedback(bot, before, move, after, before_analysis, after_analysis)
+        lines = fb + ["—"] + lines
+    # tactics: highlight hanging pieces for side to move
+    if tactics:
+        hangs = find_hanging_pieces(after, after.turn)
+        if hangs:
+            lines = [f"⚠️ Hanging piece(s): {', '.join(human_square(s) for s in hangs)}"] + tactic_lines(after) + lines
+        else:
+            lines = tactic_lines(after) + lines
+    return lines, is_blunder
+
+def opening_advice(board: chess.Board) -> List[str]:
+    """Child-friendly opening guidance (not currently injected; kept for future use)."""
+    lines: List[str] = []
+    turn = board.turn
+    lines.append("Opening coach:")
+    if turn == chess.WHITE:
+        lines.append("• Try to play e4 or d4 to claim the center.")
+    else:
+        lines.append("• Try to answer the center (…e5/…d5) and develop.")
+    dev_squares = [s for s in DEV_START[turn] if board.piece_at(s)]
+    if dev_squares:
+        pretty = ", ".join(human_square(s) for s in dev_squares)
+        lines.append(f"• Develop from: {pretty}. Knights and bishops first.")
+    lines.append("• Don’t move the same piece many times in the opening. Castle when safe.")
+    return lines
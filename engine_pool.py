@@ -0,0 +1,172 @@
+# engine_pool.py
+# A pool of long-lived UCI engine processes shared by every bot and coaching helper.
+# It quacks like a single chess.engine.SimpleEngine (analyse / analysis / quit), so existing
+# callers just hold a pool instead of an engine, and adds analyse_many() for batches.
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+import chess
+import chess.engine
+
+
+class EnginePool:
+    """
+    N UCI processes started once and reused; each call borrows a free engine.
+    - threads / hash_mb are applied through the UCI "Threads" / "Hash" options when supported.
+    - analyse_many() spreads a batch over all engines at once and returns results in order.
+    - lazy=True starts no process up front: an engine is spawned the first time a call finds
+      none free (up to size). If the first one fails to start, the error is kept in `failed`
+      and calls go to `fallback` (e.g. the built-in Searcher) when given, else raise it.
+    """
+
+    def __init__(self, path: str, size: int = 1, threads: int = 1, hash_mb: int = 16,
+                 lazy: bool = False, fallback=None):
+        self.path = path
+        self.size = max(1, size)
+        self.threads, self.hash_mb = threads, hash_mb
+        self.fallback = fallback
+        self.failed: Optional[Exception] = None
+        self.started_in = 0.0  # seconds spent spawning engines so far
+        self.engines: List[chess.engine.SimpleEngine] = []
+        self._free: "queue.Queue[chess.engine.SimpleEngine]" = queue.Queue()
+        self._spawn_lock = threading.Lock()
+        if not lazy:
+            try:
+                for _ in range(self.size):
+                    self._free.put(self._spawn())
+            except Exception:
+                self.quit()
+                raise
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="pybot-engine")
+
+    def _spawn(self) -> chess.engine.SimpleEngine:
+        t0 = time.perf_counter()
+        engine = chess.engine.SimpleEngine.popen_uci(self.path)
+        options = {}
+        if "Threads" in engine.options: options["Threads"] = self.threads
+        if "Hash" in engine.options: options["Hash"] = self.hash_mb
+        if options: engine.configure(options)
+        self.engines.append(engine)
+        self.started_in += time.perf_counter() - t0
+        return engine
+
+    def _borrow(self) -> Optional[chess.engine.SimpleEngine]:
+        """A free engine, spawning one if none is free and the pool isn't full; None when the
+        pool could not start any engine and has a fallback (callers then use it)."""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._spawn_lock:
+            if self.failed is None and len(self.engines) < self.size:
+                try:
+                    return self._spawn()
+                except Exception as e:
+                    self.size = max(1, len(self.engines))  # don't retry a failing spawn on every call
+                    if not self.engines:
+                        self.failed = e
+            if not self.engines:
+                if self.fallback is None:
+                    raise RuntimeError(f"engine {self.path!r} unavailable: {self.failed}") from self.failed
+                return None
+        return self._free.get()
+
+    # -------- SimpleEngine-compatible surface --------
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, **kwargs):
+        engine = self._borrow()
+        if engine is None:
+            return self.fallback.analyse(board, limit, **kwargs)
+        try:
+            return engine.analyse(board, limit, **kwargs)
+        finally:
+            self._free.put(engine)
+
+    def analysis(self, board: chess.Board, limit: Optional[chess.engine.Limit] = None, **kwargs) -> "_PooledAnalysis":
+        """Open-ended analysis; the borrowed engine is returned when the result is exited."""
+        engine = self._borrow()
+        if engine is None:
+            raise RuntimeError(f"engine {self.path!r} unavailable: {self.failed}") from self.failed
+        try:
+            return _PooledAnalysis(self, engine, engine.analysis(board, limit, **kwargs))
+        except Exception:
+            self._free.put(engine)
+            raise
+
+    def identity(self) -> str:
+        """engine_identity() of the pool's engines (all started alike), spawning one if lazy;
+        the fallback's when none can start."""
+        engine = self._borrow()
+        if engine is None:
+            return engine_identity(self.fallback)
+        try:
+            return engine_identity(engine)
+        finally:
+            self._free.put(engine)
+
+    def quit(self) -> None:
+        executor = getattr(self, "_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        with self._spawn_lock:
+            self.failed = self.failed or RuntimeError("engine pool closed")  # no spawning after quit
+        for engine in self.engines:
+            try:
+                engine.quit()
+            except Exception:
+                pass
+        self.engines = []
+
+    # -------- batches --------
+    def analyse_many(self, boards: Sequence[chess.Board],
+                     limit: Union[chess.engine.Limit, Sequence[chess.engine.Limit]]) -> List[dict]:
+        """analyse() for every board (one limit, or one per board), run across the pool."""
+        limits = list(limit) if isinstance(limit, (list, tuple)) else [limit] * len(boards)
+        return list(self._executor.map(self.analyse, boards, limits))
+
+    def evaluate_many(self, boards: Sequence[chess.Board], limit: chess.engine.Limit) -> List[Optional[int]]:
+        """Centipawns from the side to move's point of view (None if the engine gave no score)."""
+        return [info["score"].relative.score(mate_score=10000) if "score" in info else None
+                for info in self.analyse_many(boards, limit)]
+
+
+def engine_identity(engine) -> str:
+    """Who produces an engine's evaluations: the UCI id (name, author) and every option it was
+    configured with, or the class name of a non-UCI stand-in such as the built-in Searcher."""
+    if isinstance(engine, EnginePool):
+        return engine.identity()
+    protocol = getattr(engine, "protocol", None)
+    if protocol is None:
+        return type(engine).__name__
+    ident = engine.id
+    options = ",".join(f"{name}={value}" for name, value in sorted(protocol.config.items()))
+    return f"{ident.get('name', '?')} by {ident.get('author', '?')} [{options}]"
+
+
+class _PooledAnalysis:
+    """SimpleAnalysisResult wrapper that hands its engine back to the pool on exit."""
+
+    def __init__(self, pool: EnginePool, engine, inner):
+        self._pool, self._engine, self._inner = pool, engine, inner
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def __iter__(self):
+        return iter(self._inner)
+
+    def __enter__(self) -> "_PooledAnalysis":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._inner.stop()
+        try:
+            self._inner.wait()  # engine must be idle before someone else borrows it
+        except Exception:
+            pass
+        if self._engine is not None:
+            self._pool._free.put(self._engine)
+            self._engine = None
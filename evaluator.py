@@ -0,0 +1,154 @@
+# evaluator.py
+# Static evaluation shared by the trainer, the bot and the coach. Works straight off the
+# board's piece bitboards with popcounts (no SquareSet / len per piece type), optionally
+# adds piece-square tables, and has a NumPy batch path that scores thousands of boards
+# in one call. All scores are centipawns from the side to move's point of view.
+
+from typing import List, Sequence
+
+import chess
+
+try:
+    import numpy as np  # optional: only needed for evaluate_batch on large batches
+except Exception:  # pragma: no cover
+    np = None
+
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0,
+}
+
+# Piece-square tables from White's point of view, written rank 8 first (as on a diagram),
+# so White's bonus for square sq is TABLE[sq ^ 56] and Black's is TABLE[sq].
+_PST_DIAGRAM = {
+    chess.PAWN: (
+          0,   0,   0,   0,   0,   0,   0,   0,
+         50,  50,  50,  50,  50,  50,  50,  50,
+         10,  10,  20,  30,  30,  20,  10,  10,
+          5,   5,  10,  25,  25,  10,   5,   5,
+          0,   0,   0,  20,  20,   0,   0,   0,
+          5,  -5, -10,   0,   0, -10,  -5,   5,
+          5,  10,  10, -20, -20,  10,  10,   5,
+          0,   0,   0,   0,   0,   0,   0,   0),
+    chess.KNIGHT: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20,   0,   0,   0,   0, -20, -40,
+        -30,   0,  10,  15,  15,  10,   0, -30,
+        -30,   5,  15,  20,  20,  15,   5, -30,
+        -30,   0,  15,  20,  20,  15,   0, -30,
+        -30,   5,  10,  15,  15,  10,   5, -30,
+        -40, -20,   0,   5,   5,   0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50),
+    chess.BISHOP: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,  10,  10,   5,   0, -10,
+        -10,   5,   5,  10,  10,   5,   5, -10,
+        -10,   0,  10,  10,  10,  10,   0, -10,
+        -10,  10,  10,  10,  10,  10,  10, -10,
+        -10,   5,   0,   0,   0,   0,   5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20),
+    chess.ROOK: (
+          0,   0,   0,   0,   0,   0,   0,   0,
+          5,  10,  10,  10,  10,  10,  10,   5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+         -5,   0,   0,   0,   0,   0,   0,  -5,
+          0,   0,   0,   5,   5,   0,   0,   0),
+    chess.QUEEN: (
+        -20, -10, -10,  -5,  -5, -10, -10, -20,
+        -10,   0,   0,   0,   0,   0,   0, -10,
+        -10,   0,   5,   5,   5,   5,   0, -10,
+         -5,   0,   5,   5,   5,   5,   0,  -5,
+          0,   0,   5,   5,   5,   5,   0,  -5,
+        -10,   5,   5,   5,   5,   5,   0, -10,
+        -10,   0,   5,   0,   0,   0,   0, -10,
+        -20, -10, -10,  -5,  -5, -10, -10, -20),
+    chess.KING: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+         20,  20,   0,   0,   0,   0,  20,  20,
+         20,  30,  10,   0,   0,  10,  30,  20),
+}
+# PST[color][piece_type][square]: bonus for that side's piece on that square (no sign flip)
+PST = {
+    chess.WHITE: {pt: tuple(t[sq ^ 56] for sq in chess.SQUARES) for pt, t in _PST_DIAGRAM.items()},
+    chess.BLACK: {pt: tuple(t) for pt, t in _PST_DIAGRAM.items()},
+}
+
+
+def piece_masks(board: chess.Board) -> List[int]:
+    """The 12 piece bitboards: White P N B R Q K, then Black P N B R Q K."""
+    w, b = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    types = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+    return [t & w for t in types] + [t & b for t in types]
+
+
+def simple_material_eval(board: chess.Board) -> int:
+    """Material only (centipawns, side to move). Popcounts over the piece bitboards."""
+    w, b = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    score = (100 * ((board.pawns & w).bit_count() - (board.pawns & b).bit_count())
+             + 320 * ((board.knights & w).bit_count() - (board.knights & b).bit_count())
+             + 330 * ((board.bishops & w).bit_count() - (board.bishops & b).bit_count())
+             + 500 * ((board.rooks & w).bit_count() - (board.rooks & b).bit_count())
+             + 900 * ((board.queens & w).bit_count() - (board.queens & b).bit_count()))
+    # positive = advantage white; flip to the side to move
+    return score if board.turn == chess.WHITE else -score
+
+
+def positional_eval(board: chess.Board) -> int:
+    """Material plus piece-square tables (centipawns, side to move)."""
+    score = 0
+    for i, mask in enumerate(piece_masks(board)):
+        color = chess.WHITE if i < 6 else chess.BLACK
+        pt = i % 6 + 1
+        table = PST[color][pt]
+        side = PIECE_VALUES[pt] * mask.bit_count() + sum(table[sq] for sq in chess.scan_forward(mask))
+        score += side if color == chess.WHITE else -side
+    return score if board.turn == chess.WHITE else -score
+
+
+def static_eval(board: chess.Board, positional: bool = False) -> int:
+    return positional_eval(board) if positional else simple_material_eval(board)
+
+
+# ---------------- NumPy batch path ----------------
+BATCH_MIN = 8  # below this the per-board functions are faster than building arrays
+
+_VALUES12 = None
+_PST12 = None
+
+def _tables():
+    global _VALUES12, _PST12
+    if _VALUES12 is None:
+        order = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING]
+        _VALUES12 = np.array([PIECE_VALUES[pt] for pt in order] + [-PIECE_VALUES[pt] for pt in order], dtype=np.int32)
+        _PST12 = np.array([PST[chess.WHITE][pt] for pt in order] + [[-v for v in PST[chess.BLACK][pt]] for pt in order],
+                          dtype=np.int32)
+    return _VALUES12, _PST12
+
+
+def evaluate_batch(boards: Sequence[chess.Board], positional: bool = False) -> List[int]:
+    """static_eval() for many boards at once; results are identical to the per-board functions.
+    Piece-square scoring goes through NumPy when it is installed. Plain material stays on
+    int.bit_count(): five popcounts per board beat building the arrays."""
+    if np is None or not positional or len(boards) < BATCH_MIN:
+        return [static_eval(b, positional) for b in boards]
+    values, pst = _tables()
+    masks = np.array([piece_masks(b) for b in boards], dtype="<u8")
+    sign = np.array([1 if b.turn == chess.WHITE else -1 for b in boards], dtype=np.int32)
+    # (N, 12, 8) bytes -> (N, 12, 64) bits, bit i of each mask = square i
+    bits = np.unpackbits(masks.view(np.uint8).reshape(len(boards), 12, 8), axis=2, bitorder="little")
+    score = bits.sum(axis=2, dtype=np.int32) @ values + np.einsum("nps,ps->n", bits, pst, dtype=np.int32)
+    return (score * sign).tolist()
@@ -0,0 +1,223 @@
+# linear_q.py
+# Linear Q-function: Q(s, a) = w · φ(board, move) over a few hand-made features, as an
+# alternative to the tabular Q-tables, which almost never see a position twice past the
+# opening (so best_move mostly falls back to a random move while the table keeps growing).
+# Every legal move of a position gets a feature row; one matrix-vector product scores them
+# all. Memory is the weight vector, however long training runs.
+# LinearQ has the Q-table surface ChessAI already drives, so ChessAI.update is a semi-gradient
+# TD(0) step and update_batch (with --replay) a batched one:
+#   set(s, a, v)          moves w along φ(s, a) until Q(s, a) = v (normalised LMS step)
+#   apply_many(...)       the same for a batch: one product for the old values, one for the step
+# Features are from the mover's side, so values are for the side to move (like symmetry mode,
+# the next state's value is the opponent's and ChessAI subtracts it).
+
+import json
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import chess
+from chess import (BB_DIAG_ATTACKS, BB_DIAG_MASKS, BB_FILE_ATTACKS, BB_FILE_MASKS, BB_KING_ATTACKS,
+                   BB_KNIGHT_ATTACKS, BB_PAWN_ATTACKS, BB_RANK_ATTACKS, BB_RANK_MASKS, BB_SQUARES)
+
+from chess_ai import encode_move
+from coach import CENTER_SQS, DEV_START
+from evaluator import PIECE_VALUES
+from tactics import hanging_pieces
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None
+
+FEATURES = (
+    "bias",      # 1
+    "balance",   # material balance before the move (pawns / 39)
+    "material",  # material won by the move: capture + promotion (pawns / 9)
+    "mobility",  # squares the moved piece attacks, after − before (/ 8)
+    "center",    # centre squares it attacks or occupies, after − before (/ 4)
+    "develop",   # knight/bishop leaves its home square: +1; king walks with castling rights: −1
+    "castle",    # castling move
+    "exposed",   # lands where it can be taken for profit: −value (pawns / 9)
+    "rescue",    # moves one of our hanging pieces away: its SEE loss (pawns / 9)
+    "hanging",   # our hanging pieces before the move: −total SEE loss (pawns / 9)
+)
+BB_CENTER = sum(BB_SQUARES[sq] for sq in CENTER_SQS)
+BB_DEV = {color: sum(BB_SQUARES[sq] for sq in squares) for color, squares in DEV_START.items()}
+PAWNS = {pt: v / 100.0 for pt, v in PIECE_VALUES.items()}
+PAWNS[chess.KING] = 0.0
+
+
+def _attacks(pt: int, color: bool, sq: int, occ: int) -> int:
+    """board.attacks_mask(sq) for a piece of type pt standing on sq with occupancy occ."""
+    if pt == chess.PAWN:
+        return BB_PAWN_ATTACKS[color][sq]
+    if pt == chess.KNIGHT:
+        return BB_KNIGHT_ATTACKS[sq]
+    if pt == chess.KING:
+        return BB_KING_ATTACKS[sq]
+    a = 0
+    if pt != chess.ROOK:
+        a = BB_DIAG_ATTACKS[sq][BB_DIAG_MASKS[sq] & occ]
+    if pt != chess.BISHOP:
+        a |= BB_RANK_ATTACKS[sq][BB_RANK_MASKS[sq] & occ] | BB_FILE_ATTACKS[sq][BB_FILE_MASKS[sq] & occ]
+    return a
+
+
+def _attack_maps(board: chess.Board, color: bool) -> Tuple[int, int, int]:
+    """Squares color attacks: with any piece, with pawns, with pawns or minor pieces."""
+    every = pawn = minor = 0
+    pawns, minors = board.pawns, board.knights | board.bishops
+    for sq in chess.scan_forward(board.occupied_co[color]):
+        a = board.attacks_mask(sq)
+        every |= a
+        if pawns & BB_SQUARES[sq]:
+            pawn |= a
+        elif minors & BB_SQUARES[sq]:
+            minor |= a
+    return every, pawn, pawn | minor
+
+
+def move_features(board: chess.Board, moves: Sequence[chess.Move]) -> List[List[float]]:
+    """One row of FEATURES per move, from the side to move's point of view. Attack maps and
+    hanging pieces are computed once per position; "exposed" ignores x-rays and pins."""
+    us, them = board.turn, not board.turn
+    occ, own = board.occupied, board.occupied_co[us]
+    ours, _, _ = _attack_maps(board, us)
+    theirs, their_pawns, their_minors = _attack_maps(board, them)
+    hanging = dict(hanging_pieces(board, us))
+    balance = sum(PAWNS[pt] * (len(board.pieces(pt, us)) - len(board.pieces(pt, them))) for pt in PAWNS) / 39.0
+    hanging_total = -sum(hanging.values()) / 900.0
+    castle_rights = board.has_castling_rights(us)
+    rows = []
+    for m in moves:
+        frm, to = m.from_square, m.to_square
+        pt = board.piece_type_at(frm)
+        new_pt = m.promotion or pt
+        gain = PAWNS[new_pt] - PAWNS[pt]
+        if board.is_en_passant(m):
+            gain += 1.0
+        elif board.occupied_co[them] & BB_SQUARES[to]:
+            gain += PAWNS[board.piece_type_at(to)]
+        castle = pt == chess.KING and abs(frm - to) == 2
+        occ2 = (occ & ~BB_SQUARES[frm]) | BB_SQUARES[to]
+        own2 = (own & ~BB_SQUARES[frm]) | BB_SQUARES[to]
+        before, after = board.attacks_mask(frm), _attacks(new_pt, us, to, occ2)
+        mobility = (chess.popcount(after & ~own2) - chess.popcount(before & ~own)) / 8.0
+        center = (chess.popcount(after & BB_CENTER) - chess.popcount(before & BB_CENTER)
+                  + bool(BB_CENTER & BB_SQUARES[to]) - bool(BB_CENTER & BB_SQUARES[frm])) / 4.0
+        develop = 0.0
+        if pt in (chess.KNIGHT, chess.BISHOP) and BB_DEV[us] & BB_SQUARES[frm]:
+            develop = 1.0
+        elif pt == chess.KING and castle_rights and not castle:
+            develop = -1.0
+        exposed = 0.0
+        bit = BB_SQUARES[to]
+        if theirs & bit and (not ours & bit or (new_pt != chess.PAWN and their_pawns & bit)
+                             or (new_pt in (chess.ROOK, chess.QUEEN) and their_minors & bit)):
+            exposed = -PAWNS[new_pt] / 9.0
+        rows.append([1.0, balance, gain / 9.0, mobility, center, develop, float(castle), exposed,
+                     hanging.get(frm, 0) / 900.0, hanging_total])
+    return rows
+
+
+class LinearState:
+    """A position as the linear Q-function sees it: its legal moves and their feature rows."""
+
+    __slots__ = ("moves", "phi", "_rows")
+
+    def __init__(self, moves: List[chess.Move], phi):
+        self.moves = moves
+        self.phi = phi
+        self._rows: Optional[Dict[int, int]] = None
+
+    def row(self, move) -> Optional[int]:
+        if self._rows is None:
+            self._rows = {encode_move(m): i for i, m in enumerate(self.moves)}
+        return self._rows.get(encode_move(move))
+
+    def __getstate__(self):
+        return self.moves, self.phi
+
+    def __setstate__(self, state):
+        self.moves, self.phi = state
+        self._rows = None
+
+
+class LinearQ:
+    """
+    Q(s, a) = w · φ(s, a), with the get/set/best_move/max_q/apply_many/save/load surface of
+    the Q-table backends; states come from state_key(). Needs NumPy.
+    - len() is the number of weights: the model doesn't grow with training.
+    - save() writes JSON with the feature names; load() refuses weights for other features.
+    """
+
+    relative = True  # values are for the side to move (ChessAI.discount subtracts the next state's)
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("the linear policy needs NumPy (pip install numpy)")
+        self.w = np.zeros(len(FEATURES))
+
+    def state_key(self, board: chess.Board) -> LinearState:
+        moves = list(board.generate_legal_moves())
+        return LinearState(moves, np.array(move_features(board, moves), dtype=np.float32).reshape(len(moves), len(FEATURES)))
+
+    def scores(self, s: LinearState):
+        return s.phi @ self.w
+
+    def get(self, s: LinearState, move) -> float:
+        i = s.row(move)
+        return 0.0 if i is None else float(s.phi[i] @ self.w)
+
+    def set(self, s: LinearState, move, value: float) -> None:
+        i = s.row(move)
+        if i is not None:
+            phi = s.phi[i]
+            self.w += (value - float(phi @ self.w)) / float(phi @ phi) * phi
+
+    def best_move(self, s: LinearState, legal_moves) -> Optional[chess.Move]:
+        """Highest-scoring legal move; ties (an untrained model) are broken at random."""
+        if not s.moves:
+            return None
+        q = self.scores(s)
+        if len(legal_moves) != len(s.moves):  # a subset of the position's moves
+            rows = [i for i in map(s.row, legal_moves) if i is not None]
+            if not rows:
+                return None
+            best = np.asarray(rows)[np.flatnonzero(q[rows] == q[rows].max())]
+        else:
+            best = np.flatnonzero(q == q.max())
+        return s.moves[int(best[0] if len(best) == 1 else random.choice(best))]
+
+    def max_q(self, s: LinearState) -> float:
+        return float(self.scores(s).max()) if s.moves else 0.0
+
+    def apply_many(self, states: Sequence[LinearState], codes: Sequence[int],
+                   update: Callable[[List[float]], List[float]]) -> None:
+        """Batched semi-gradient step: every target from the weights before the batch, the
+        per-transition steps averaged."""
+        rows = []
+        for s, c in zip(states, codes):
+            i = s.row(c)
+            if i is not None:
+                rows.append(s.phi[i])
+        if not rows:
+            return
+        phi = np.stack(rows)
+        old = phi @ self.w
+        new = np.asarray(update(old.tolist()))
+        self.w += ((new - old) / np.einsum("ij,ij->i", phi, phi)) @ phi / len(rows)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"linear_q": list(FEATURES), "w": self.w.tolist()}, f)
+
+    def load(self, path: str) -> None:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("linear_q") != list(FEATURES):
+            raise ValueError(f"{path} holds weights for different features: {data.get('linear_q')}")
+        self.w = np.asarray(data["w"], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.w)
@@ -0,0 +1,188 @@
+# perf.py
+# Lightweight timing spans for PyBot's hot paths. Off by default: a disabled span is one
+# attribute check, and per-move training calls are only wrapped when profiling is on.
+# Each span name keeps a rolling window of durations (p50/p95/p99) plus call counts, and can
+# stream every span to a trace file: Chrome trace events (open in https://ui.perfetto.dev,
+# chrome://tracing or speedscope) or, for a .jsonl path, one JSON object per line.
+#
+#   with SPANS.span("draw_sidebar"): ...
+#   lap = laps(); ...; lap("events"); ...; lap("render"); lap.end("frame")
+#   @timed("engine_rationale")
+#   instrument(bot, ("evaluate", "update"), prefix="ChessAI.")
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("spans", "name", "t0")
+
+    def __init__(self, spans: "Spans", name: str):
+        self.spans, self.name = spans, name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.spans.add(self.name, self.t0, time.perf_counter() - self.t0)
+        return False
+
+
+class Spans:
+    """
+    Named timing spans from any thread.
+    - span(name) is a context manager; add(name, start, seconds) records one directly.
+    - stats() gives (calls, p50, p95, p99) per name over the last `window` spans, in ms.
+    - open_trace(path) streams every span to a trace file until close_trace().
+    """
+
+    def __init__(self, window: int = 512):
+        self.enabled = False
+        self.window = window
+        self.samples: Dict[str, Deque[float]] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._trace = None
+        self._jsonl = False
+        self._first = True
+        self._t0 = time.perf_counter()
+
+    def span(self, name: str):
+        return _Span(self, name) if self.enabled else _NO_SPAN
+
+    def add(self, name: str, start: float, seconds: float) -> None:
+        with self._lock:
+            q = self.samples.get(name)
+            if q is None:
+                q = self.samples[name] = deque(maxlen=self.window)
+                self.calls[name] = 0
+            q.append(seconds)
+            self.calls[name] += 1
+            if self._trace is not None:
+                event = {"name": name, "ph": "X", "ts": round((start - self._t0) * 1e6, 1),
+                         "dur": round(seconds * 1e6, 1), "pid": os.getpid(), "tid": threading.get_ident()}
+                if self._jsonl:
+                    self._trace.write(json.dumps(event) + "\n")
+                else:
+                    self._trace.write(("[\n" if self._first else ",\n") + json.dumps(event))
+                self._first = False
+
+    def stats(self) -> Dict[str, Tuple[int, float, float, float]]:
+        with self._lock:
+            snapshot = {name: (self.calls[name], sorted(q)) for name, q in self.samples.items()}
+        pct = lambda xs, p: xs[min(len(xs) - 1, int(p * len(xs)))] * 1000
+        return {name: (calls, pct(xs, 0.50), pct(xs, 0.95), pct(xs, 0.99))
+                for name, (calls, xs) in snapshot.items() if xs}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples.clear()
+            self.calls.clear()
+
+    def lines(self, names: Optional[Sequence[str]] = None) -> List[str]:
+        """One "name  p50/p95/p99 ms  ×calls" line per span, slowest p95 first."""
+        stats = self.stats()
+        rows = sorted(((n, stats[n]) for n in (names or stats) if n in stats), key=lambda r: -r[1][2])
+        return [f"{name}: {p50:.1f}/{p95:.1f}/{p99:.1f} ms ×{calls}" for name, (calls, p50, p95, p99) in rows]
+
+    def report(self) -> str:
+        rows = sorted(self.stats().items(), key=lambda r: -r[1][2])
+        out = [f"{'span':28s} {'calls':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}"]
+        out += [f"{name:28s} {calls:>8d} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f}" for name, (calls, p50, p95, p99) in rows]
+        return "\n".join(out)
+
+    # -------- trace export --------
+    def open_trace(self, path: str) -> None:
+        self.close_trace()
+        with self._lock:
+            self._trace = open(path, "w", buffering=1 << 16)
+            self._jsonl = path.endswith(".jsonl")
+            self._first = True
+
+    def close_trace(self) -> None:
+        with self._lock:
+            if self._trace is not None:
+                if not self._jsonl:
+                    self._trace.write("[\n]\n" if self._first else "\n]\n")
+                self._trace.close()
+                self._trace = None
+
+
+class _Laps:
+    """Consecutive phases of one loop iteration: each call records the time since the last."""
+    __slots__ = ("spans", "t0", "last")
+
+    def __init__(self, spans: Spans):
+        self.spans = spans
+        self.t0 = self.last = time.perf_counter()
+
+    def __call__(self, name: str) -> None:
+        now = time.perf_counter()
+        self.spans.add(name, self.last, now - self.last)
+        self.last = now
+
+    def end(self, name: str) -> None:
+        """Record the whole iteration as `name`."""
+        self.spans.add(name, self.t0, time.perf_counter() - self.t0)
+
+
+def _no_laps(name: str) -> None:
+    pass
+
+
+_no_laps.end = _no_laps  # type: ignore[attr-defined]
+
+
+SPANS = Spans()  # process-wide; enabled by --perf / the HUD key
+
+
+def laps():
+    """A lap timer for one iteration of a loop (a no-op function while SPANS is disabled)."""
+    return _Laps(SPANS) if SPANS.enabled else _no_laps
+
+
+def timed(name: str) -> Callable:
+    """Decorator: time every call of the function as span `name` while SPANS is enabled."""
+    def wrap(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not SPANS.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                SPANS.add(name, t0, time.perf_counter() - t0)
+        return wrapper
+    return wrap
+
+
+def instrument(obj, methods: Sequence[str], prefix: str = "") -> None:
+    """Time obj's methods as spans `prefix + method` (wrappers set on the instance, so other
+    objects of the class are untouched). Methods the object lacks are skipped; idempotent."""
+    done = obj.__dict__.setdefault("_perf_wrapped", set()) if hasattr(obj, "__dict__") else set()
+    for m in methods:
+        fn = getattr(obj, m, None)
+        if fn is None or m in done:
+            continue
+        setattr(obj, m, timed(prefix + m)(fn))
+        done.add(m)
@@ -2,15 +2,28 @@
 # PyBot Chess — Coach (H/O/T), right sidebar with word-wrapping, Stockfish auto-detect,
 # alias-aware PNG sprites, natural-language rationale, reselect piece UX.
 
+import time
+_LAUNCH = time.perf_counter()  # --profile-startup counts from here, before the heavy imports
+
 import argparse
+import hashlib
 import os
-import shutil
+import threading
 from typing import Optional, Tuple, List, Dict
 
 import pygame
 import chess
 
-from chess_ai import ChessAI
+import coach
+from chess_ai import ChessAI, open_qtable
+from engine_pool import EnginePool
+from search import Searcher
+from book import OpeningBook
+from analysis import AnalysisStream, AnalysisWorker, Ponderer
+from perf import SPANS, instrument, laps
+from text_layout import render_text, wrap_lines_by_width
+from coach import (ANALYSIS_CACHE, CENTER_SQS, COACH_TIME, DEV_START, HINT_TIME, autodetect_engine, book_line,
+                   engine_eval_and_pv, engine_rationale, info_eval_and_pv, move_commentary, state_for)
 
 # ---------------- Layout / colors ----------------
 BOARD_SIZE = 640              # 8x8 board in px
@@ -33,62 +46,6 @@ GREEN = (60, 200, 120)
 RED = (220, 80, 80)
 ACCENT = (120, 170, 255)
 
-# ---------------- NL helpers ----------------
-PIECE_WORD = {
-    chess.KING: "King", chess.QUEEN: "Queen", chess.ROOK: "Rook",
-    chess.BISHOP: "Bishop", chess.KNIGHT: "Knight", chess.PAWN: "Pawn"
-}
-CENTER_SQS = {chess.D4, chess.E4, chess.D5, chess.E5}
-DEV_START = {
-    chess.WHITE: [chess.B1, chess.G1, chess.C1, chess.F1],  # knights, bishops
-    chess.BLACK: [chess.B8, chess.G8, chess.C8, chess.F8],
-}
-
-def side_word(color: bool) -> str:
-    return "White" if color == chess.WHITE else "Black"
-
-def cp_to_words(cp: Optional[int]) -> str:
-    if cp is None: return "Position unclear."
-    if cp >= 200: return "White has a strong advantage."
-    if cp >= 70:  return "White is better."
-    if cp >= 20:  return "White is slightly better."
-    if cp > -20:  return "Roughly equal."
-    if cp > -70:  return "Black is slightly better."
-    if cp > -200: return "Black is better."
-    return "Black has a strong advantage."
-
-def human_square(sq: int) -> str:
-    return chess.square_name(sq)
-
-def move_tags(b: chess.Board, m: chess.Move) -> List[str]:
-    tags: List[str] = []
-    if b.is_castling(m): tags.append("castling")
-    if b.is_capture(m):  tags.append("capture")
-    if b.gives_check(m): tags.append("check")
-    if m.to_square in CENTER_SQS: tags.append("controls center")
-    # simple development heuristic
-    pc = b.piece_at(m.from_square)
-    if pc and pc.piece_type in (chess.KNIGHT, chess.BISHOP):
-        start_rank = 1 if pc.color == chess.WHITE else 6
-        if chess.square_rank(m.from_square) == start_rank:
-            tags.append("develops")
-    return tags
-
-def describe_move(b: chess.Board, m: chess.Move) -> str:
-    pc = b.piece_at(m.from_square)
-    if not pc:  # fallback
-        return b.san(m)
-    piece = PIECE_WORD[pc.piece_type]
-    frm, to = human_square(m.from_square), human_square(m.to_square)
-    tags = move_tags(b, m)
-    # victim before push
-    if b.is_capture(m):
-        victim = b.piece_at(m.to_square)
-        if victim:
-            tags.insert(0, f"takes {side_word(victim.color)} {PIECE_WORD[victim.piece_type]}")
-    extra = " — " + "; ".join(tags) if tags else ""
-    return f"{piece} {frm}→{to}{extra}"
-
 # ---------------- Geometry helpers ----------------
 def board_rect():
     return pygame.Rect(MARGIN_X, MARGIN_TOP, BOARD_SIZE, BOARD_SIZE)
@@ -110,28 +67,13 @@ def xy_to_square(px: int, py: int) -> Optional[int]:
     rank = 7 - r_disp
     return chess.square(file_, rank)
 
-# ---------------- Text wrapping helper (pixel width) ----------------
-def wrap_lines_by_width(lines: List[str], font: pygame.font.Font, max_px: int) -> List[str]:
-    """Word-wrap lines so each rendered line fits within max_px pixels."""
-    wrapped: List[str] = []
-    for line in lines:
-        words = line.split()
-        if not words:
-            wrapped.append("")
-            continue
-        cur = words[0]
-        for w in words[1:]:
-            test = cur + " " + w
-            if font.size(test)[0] <= max_px:
-                cur = test
-            else:
-                wrapped.append(cur)
-                cur = w
-        wrapped.append(cur)
-    return wrapped
-
 # ---------------- PNG loader (alias-aware) ----------------
-def load_pieces(folder="pieces-png", size=SQ - 8):
+# Sprites are packed into one pre-scaled atlas (6 piece types x 2 colours) cached on disk per
+# square size, so launch is one PNG load instead of twelve loads and smoothscales.
+ATLAS_DIR = os.getenv("PYBOT_CACHE", "").strip() or os.path.join(os.path.expanduser("~"), ".cache", "pybot")
+ATLAS_ORDER = [(ptype, color) for color in (True, False) for ptype in chess.PIECE_TYPES]
+
+def find_piece_files(folder="pieces-png") -> Dict[Tuple[int, bool], str]:
     if not os.path.isdir(folder):
         raise FileNotFoundError(f"Piece folder not found: {folder}")
     aliases: Dict[int, List[str]] = {
@@ -142,7 +84,7 @@ def load_pieces(folder="pieces-png", size=SQ - 8):
         chess.KNIGHT: ["knight", "rknight", "nightrd"],
         chess.PAWN:   ["pawn", "bpawn", "bpawn2"],
     }
-    pieces: Dict[Tuple[int, bool], pygame.Surface] = {}
+    files: Dict[Tuple[int, bool], str] = {}
     for ptype, names in aliases.items():
         for color_bool, color_name in ((True, "white"), (False, "black")):
             chosen = None
@@ -153,179 +95,94 @@ def load_pieces(folder="pieces-png", size=SQ - 8):
             if not chosen:
                 tried = ", ".join([f"{color_name}-{n}.png" for n in names])
                 raise FileNotFoundError(f"Missing sprite for {color_name} {chess.piece_symbol(ptype).upper()} — tried: {tried}")
-            img = pygame.image.load(chosen).convert_alpha()
-            img = pygame.transform.smoothscale(img, (size, size))
-            pieces[(ptype, color_bool)] = img
-    return pieces
-
-# ---------------- Heuristic eval (fallback) ----------------
-PIECE_VALUES = {
-    chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330,
-    chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0,
-}
-def simple_material_eval(board: chess.Board) -> int:
-    score = 0
-    for pt, val in PIECE_VALUES.items():
-        score += len(board.pieces(pt, chess.WHITE)) * val
-        score -= len(board.pieces(pt, chess.BLACK)) * val
-    return score if board.turn == chess.WHITE else -score
-
-# ---------------- Engine helpers ----------------
-def autodetect_engine(explicit: str) -> str:
-    if explicit: return explicit
-    env = os.getenv("PYBOT_ENGINE", "").strip()
-    if env: return env
-    on_path = shutil.which("stockfish")
-    if on_path: return on_path
-    for c in ["/opt/homebrew/bin/stockfish", "/usr/local/bin/stockfish", "/usr/bin/stockfish", "/usr/games/stockfish"]:
-        if os.path.exists(c): return c
-    return ""
-
-def engine_eval_and_pv(bot: ChessAI, board: chess.Board, time_limit=0.2) -> Tuple[Optional[int], List[chess.Move]]:
-    cp = None; pv: List[chess.Move] = []
-    if bot.engine is None: return cp, pv
-    try:
-        info = bot.engine.analyse(board, chess.engine.Limit(time=time_limit))  # type: ignore[attr-defined]
-        cp = info["score"].white().score(mate_score=10000)
-        if "pv" in info and info["pv"]:
-            pv = list(info["pv"])
-    except Exception:
-        pass
-    return cp, pv
-
-# ---------------- Teaching builders ----------------
-def engine_rationale(bot: ChessAI, board: chess.Board) -> List[str]:
-    """Natural-language explanation using engine if available, else heuristics."""
-    lines: List[str] = []
-    cp, pv = engine_eval_and_pv(bot, board, time_limit=0.25)
-    if cp is not None:
-        lines.append(cp_to_words(cp))
-        lines.append(f"Eval (cp): {cp}")
-        if pv:
-            b2 = board.copy()
-            lines.append("Plan:")
-            for mv in pv[:4]:
-                lines.append(f"  • {describe_move(b2, mv)}")
-                b2.push(mv)
-            # SAN PV for quick reference
-            b3 = board.copy()
-            san = []
-            for mv in pv[:8]:
-                san.append(b3.san(mv)); b3.push(mv)
-            lines.append("PV (SAN): " + " ".join(san))
-        return lines
-
-    # Heuristic fallback
-    mat = simple_material_eval(board)
-    lines.append(cp_to_words(mat))
-    lines.append(f"Material (side to move): {mat} cp")
-    caps = [m for m in board.legal_moves if board.is_capture(m)]
-    checks = [m for m in board.legal_moves if board.gives_check(m)]
-    center = [m for m in board.legal_moves if m.to_square in CENTER_SQS]
-    if caps:
-        lines.append(f"{len(caps)} capture{'s' if len(caps)!=1 else ''} available. Examples:")
-        b2 = board.copy()
-        for m in caps[:2]:
-            lines.append(f"  • {describe_move(b2, m)}")
-    if checks: lines.append(f"{len(checks)} checking move{'s' if len(checks)!=1 else ''} available.")
-    if center: lines.append(f"{len(center)} move{'s' if len(center)!=1 else ''} increase center control.")
-    return lines
-
-def coaching_feedback(bot: ChessAI, before: chess.Board, move: chess.Move, after: chess.Board) -> Tuple[List[str], bool]:
-    """Explain player's move vs engine best; return (lines, is_blunder) for red outline."""
-    lines: List[str] = []
-    is_blunder = False
-    if bot.engine is None:
-        lines.append("Coach: (no engine) Try to control the center, develop pieces, castle early.")
-        return lines, is_blunder
-
-    best_cp, best_pv = engine_eval_and_pv(bot, before, time_limit=0.25)
-    after_cp, _ = engine_eval_and_pv(bot, after, time_limit=0.2)
-
-    lines.append(f"You played: {describe_move(before, move)}")
-
-    if best_cp is None or after_cp is None:
-        lines.append("Coach: Position unclear.")
-        return lines, is_blunder
-
-    diff = (best_cp - after_cp)  # positive → worse than best for White
-    if abs(diff) < 40:
-        lines.append("✅ Good! Keeps the position about equal.")
-    elif diff < 120:
-        lines.append("⚠️ Not the best. There was a stronger idea:")
-    else:
-        lines.append("⛔ Blunder: this loses too much compared with the best move.")
-        is_blunder = True
-
-    if best_pv:
-        btmp = before.copy()
-        suggestion = describe_move(btmp, best_pv[0])
-        btmp.push(best_pv[0])
-        lines.append(f"Coach suggests: {suggestion}")
-        tags = move_tags(before, best_pv[0])
-        if "develops" in tags:
-            lines.append("Because it develops a piece toward the center.")
-        elif "controls center" in tags:
-            lines.append("Because it fights for the center (d4/e4/d5/e5).")
-        elif "capture" in tags:
-            lines.append("Because it wins material or removes a key defender.")
-        elif "castling" in tags:
-            lines.append("Because it makes your king safer (castling).")
-    lines.append("Tips: open with center pawns, develop knights/bishops, castle early, avoid hanging pieces.")
-    return lines, is_blunder
-
-def find_hanging_pieces(board: chess.Board, color: bool) -> List[int]:
-    """Squares of color's pieces that are attacked by the opponent and not defended by own side."""
-    hangs: List[int] = []
-    opp = not color
-    for sq, pc in board.piece_map().items():
-        if pc.color != color: continue
-        if board.is_attacked_by(opp, sq) and not board.is_attacked_by(color, sq):
-            hangs.append(sq)
-    return hangs
-
-def opening_advice(board: chess.Board) -> List[str]:
-    """Child-friendly opening guidance (not currently injected; kept for future use)."""
-    lines: List[str] = []
-    turn = board.turn
-    lines.append("Opening coach:")
-    if turn == chess.WHITE:
-        lines.append("• Try to play e4 or d4 to claim the center.")
-    else:
-        lines.append("• Try to answer the center (…e5/…d5) and develop.")
-    dev_squares = [s for s in DEV_START[turn] if board.piece_at(s)]
-    if dev_squares:
-        pretty = ", ".join(human_square(s) for s in dev_squares)
-        lines.append(f"• Develop from: {pretty}. Knights and bishops first.")
-    lines.append("• Don’t move the same piece many times in the opening. Castle when safe.")
-    return lines
+            files[(ptype, color_bool)] = chosen
+    return files
+
+def load_pieces(folder="pieces-png", size=SQ - 8, cache_dir: Optional[str] = ATLAS_DIR):
+    files = find_piece_files(folder)
+    # the atlas name covers the size and the source files, so new sprites make a new atlas
+    stamp = repr([(files[k], os.path.getmtime(files[k])) for k in ATLAS_ORDER]).encode()
+    atlas_path = os.path.join(cache_dir, f"pieces-{size}-{hashlib.sha1(stamp).hexdigest()[:12]}.png") if cache_dir else ""
+    tile = lambda i: pygame.Rect((i % 6) * size, (i // 6) * size, size, size)
+    atlas = None
+    if atlas_path and os.path.exists(atlas_path):
+        try:
+            atlas = pygame.image.load(atlas_path).convert_alpha()
+        except pygame.error:
+            atlas = None  # unreadable cache: rebuild it
+    if atlas is None:
+        atlas = pygame.Surface((size * 6, size * 2), pygame.SRCALPHA).convert_alpha()
+        for i, key in enumerate(ATLAS_ORDER):
+            img = pygame.image.load(files[key]).convert_alpha()
+            pygame.transform.smoothscale(img, (size, size), atlas.subsurface(tile(i)))
+        if atlas_path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp = f"{atlas_path}.{os.getpid()}.png"
+                pygame.image.save(atlas, tmp)
+                os.replace(tmp, atlas_path)
+            except (OSError, pygame.error):
+                pass  # read-only home: the in-memory atlas still works
+    return {key: atlas.subsurface(tile(i)) for i, key in enumerate(ATLAS_ORDER)}
+
+# ---------------- Cached layers ----------------
+# Built once after the display exists: the empty board and the translucent square overlays
+# (no per-frame Surface allocation). Text layout and rendered lines are cached in text_layout.
+_LAYERS: Dict[str, pygame.Surface] = {}
+
+def _layers() -> Dict[str, pygame.Surface]:
+    if not _LAYERS:
+        bg = pygame.Surface((BOARD_SIZE, BOARD_SIZE))
+        for r in range(8):
+            for f in range(8):
+                pygame.draw.rect(bg, LIGHT if (r+f)%2==0 else DARK, (f * SQ, r * SQ, SQ, SQ))
+        _LAYERS["board"] = bg.convert() if pygame.display.get_surface() else bg
+        for name, rgba, size in (("last", (*LASTMOVE, 90), SQ), ("selected", (*HIGHLIGHT, 110), SQ),
+                                 ("center", (*ACCENT, 70), SQ), ("illegal", (*ILLEGAL, 60), BOARD_SIZE)):
+            layer = pygame.Surface((size, size), pygame.SRCALPHA)
+            layer.fill(rgba)
+            _LAYERS[name] = layer
+    return _LAYERS
+
+# ---------------- Startup profile ----------------
+class StartupProfile:
+    """Wall-clock phases from module import to the first frame on screen (--profile-startup)."""
+
+    def __init__(self, enabled: bool, t0: float = _LAUNCH):
+        self.enabled = enabled
+        self.t0 = self.last = t0
+        self.phases: List[Tuple[str, float]] = []
+        self.done = False
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def first_frame(self) -> None:
+        if self.done:
+            return
+        self.mark("first frame")
+        self.done = True
+        if self.enabled:
+            steps = " | ".join(f"{name} {dt * 1000:.0f} ms" for name, dt in self.phases)
+            print(f"[PyBot] Startup: {steps} → first frame at {(self.last - self.t0) * 1000:.0f} ms")
 
 # ---------------- Draw routines ----------------
 def draw_board(surface, board: chess.Board, last_move: Optional[chess.Move],
                selected: Optional[int], legal_targets: List[int],
                piece_images: Dict[Tuple[int, bool], pygame.Surface]):
-    surface.fill(BG)
-    # squares
-    for r in range(8):
-        for f in range(8):
-            x = MARGIN_X + f * SQ
-            y = MARGIN_TOP + r * SQ
-            pygame.draw.rect(surface, LIGHT if (r+f)%2==0 else DARK, (x, y, SQ, SQ))
+    layers = _layers()
+    surface.blit(layers["board"], (MARGIN_X, MARGIN_TOP))
 
     # last move highlight
     if last_move:
         for sq in (last_move.from_square, last_move.to_square):
-            x, y = square_to_xy(sq)
-            s = pygame.Surface((SQ, SQ), pygame.SRCALPHA)
-            s.fill((*LASTMOVE, 90))
-            surface.blit(s, (x, y))
+            surface.blit(layers["last"], square_to_xy(sq))
 
     # selected + legal dots
     if selected is not None:
-        x, y = square_to_xy(selected)
-        s = pygame.Surface((SQ, SQ), pygame.SRCALPHA)
-        s.fill((*HIGHLIGHT, 110))
-        surface.blit(s, (x, y))
+        surface.blit(layers["selected"], square_to_xy(selected))
         for sq in legal_targets:
             tx, ty = square_to_xy(sq)
             pygame.draw.circle(surface, (20,20,20), (tx + SQ//2, ty + SQ//2), 8)
@@ -348,15 +205,14 @@ def draw_square_outline(surface, sq: int, color, thickness=4):
 
 def draw_center_highlights(surface):
     for sq in CENTER_SQS:
-        x, y = square_to_xy(sq)
-        s = pygame.Surface((SQ, SQ), pygame.SRCALPHA)
-        s.fill((ACCENT[0], ACCENT[1], ACCENT[2], 70))
-        surface.blit(s, (x, y))
+        surface.blit(_layers()["center"], square_to_xy(sq))
 
 def draw_sidebar(surface, panel_font, small_font, info_lines: List[str],
                  score: Dict[str,int], ms_per_move: int, mode_label: str,
-                 turn_label: str, toggles: Dict[str,bool], engine_active: bool):
+                 turn_label: str, toggles: Dict[str,bool], engine_label: str,
+                 thinking: bool = False, hud_lines: Tuple[str, ...] = ()):
     pr = sidebar_rect()
+    surface.fill(BG, pr)  # rounded corners sit on the window background
     pygame.draw.rect(surface, PANEL_BG, pr, border_radius=10)
     x = pr.left + 12
     y = pr.top + 12
@@ -364,48 +220,191 @@ def draw_sidebar(surface, panel_font, small_font, info_lines: List[str],
 
     # Header
     header = f"{mode_label} | {turn_label}"
-    surface.blit(panel_font.render(header, True, TEXT), (x, y)); y += 26
+    surface.blit(render_text(panel_font, header, TEXT), (x, y)); y += 26
 
     # Meta
     meta = f"W:{score['W']}  D:{score['D']}  L:{score['L']}   |   Speed: {ms_per_move} ms"
     for line in wrap_lines_by_width([meta], small_font, max_w):
-        surface.blit(small_font.render(line, True, SUBTEXT), (x, y)); y += 20
+        surface.blit(render_text(small_font, line, SUBTEXT), (x, y)); y += 20
 
     # Toggles
     togg = (f"Hints(H): {'ON' if toggles['H'] else 'OFF'}   "
             f"Openings(O): {'ON' if toggles['O'] else 'OFF'}   "
             f"Tactics(T): {'ON' if toggles['T'] else 'OFF'}   "
-            f"Engine: {'Yes' if engine_active else 'No'}")
+            f"Engine: {engine_label}"
+            + ("   Perf(P): ON" if toggles.get("P") else ""))
     for line in wrap_lines_by_width([togg], small_font, max_w):
-        surface.blit(small_font.render(line, True, SUBTEXT), (x, y)); y += 20
+        surface.blit(render_text(small_font, line, SUBTEXT), (x, y)); y += 20
     y += 4
 
-    # Info lines
-    wrapped = []
-    for ln in info_lines[:40]:
-        wrapped.extend(wrap_lines_by_width([ln], small_font, max_w) or [""])
-    for ln in wrapped:
-        surface.blit(small_font.render(ln, True, TEXT), (x, y)); y += 20
+    if thinking:
+        surface.blit(render_text(small_font, "thinking…", ACCENT), (x, y)); y += 20
+
+    # Perf HUD, pinned to the bottom of the panel
+    bottom = pr.bottom
+    if hud_lines:
+        hud = wrap_lines_by_width(list(hud_lines), small_font, max_w)
+        bottom -= 8 + 18 * len(hud)
+        for i, ln in enumerate(hud):
+            surface.blit(render_text(small_font, ln, ACCENT), (x, bottom + 4 + 18 * i))
+
+    # Info lines (stop at the panel edge or the HUD: nothing below it is on screen)
+    for ln in wrap_lines_by_width(info_lines[:40], small_font, max_w):
+        if y + 20 > bottom:
+            break
+        surface.blit(render_text(small_font, ln, TEXT), (x, y)); y += 20
+
+# ---------------- Dirty-rect renderer ----------------
+Outline = Tuple[int, Tuple[int, int, int], int]  # (square, color, thickness)
+
+class Renderer:
+    """
+    Draws the board and sidebar only when what they show has changed, and returns the
+    screen rects to push with pygame.display.update(). An idle frame draws and pushes nothing.
+    - board: only squares whose contents changed (plus the old / new hint arrow) are
+      repainted from the cached layers, under a clip, and returned as dirty.
+    - sidebar: repainted (from cached text) when its text, score or flags change.
+    """
+
+    def __init__(self, pieces: Dict[Tuple[int, bool], pygame.Surface], panel_font, small_font):
+        self.pieces = pieces
+        self.panel_font = panel_font
+        self.small_font = small_font
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Repaint and push the whole window next frame (first frame, window exposed)."""
+        self.full = True
+        self.board_scene = None
+        self.squares: Optional[List[tuple]] = None
+        self.arrow_rect: Optional[pygame.Rect] = None
+        self.sidebar_scene = None
+
+    def draw(self, screen, board: chess.Board, last_move: Optional[chess.Move], selected: Optional[int],
+             legal_targets: List[int], openings: bool, arrow: Optional[chess.Move], outlines: List[Outline],
+             flash: bool, sidebar: tuple) -> List[pygame.Rect]:
+        """`sidebar` is draw_sidebar's arguments after small_font, as a tuple."""
+        dirty: List[pygame.Rect] = []
+        if self.full:
+            screen.fill(BG)
+        board_scene = (board.board_fen(), last_move, selected, tuple(legal_targets), openings, arrow,
+                       tuple(outlines), flash)
+        if board_scene != self.board_scene:
+            squares = self._square_states(board, last_move, selected, legal_targets, openings, outlines)
+            arrow_rect = self._arrow_rect(arrow)
+            if self.squares is None or flash != self.board_scene[-1]:
+                changed = [board_rect()]
+            else:
+                changed = [pygame.Rect(*square_to_xy(sq), SQ, SQ) for sq in chess.SQUARES if squares[sq] != self.squares[sq]]
+                if arrow_rect != self.arrow_rect:
+                    changed += [r for r in (self.arrow_rect, arrow_rect) if r is not None]
+            if changed:
+                # repaint only inside the changed area; blits outside the clip are nearly free
+                screen.set_clip(changed[0].unionall(changed[1:]))
+                draw_board(screen, board, last_move, selected, legal_targets, self.pieces)
+                if openings:
+                    draw_center_highlights(screen)
+                if arrow is not None:
+                    draw_arrow(screen, arrow, color=GREEN, thickness=5)
+                for sq, color, thickness in outlines:
+                    draw_square_outline(screen, sq, color, thickness=thickness)
+                if flash:
+                    screen.blit(_layers()["illegal"], (MARGIN_X, MARGIN_TOP))
+                screen.set_clip(None)
+                dirty += changed
+            self.board_scene, self.squares, self.arrow_rect = board_scene, squares, arrow_rect
+
+        info_lines, score, ms_per_move, mode_label, turn_label, toggles, engine_label, thinking, *hud = sidebar
+        sidebar_scene = (tuple(info_lines), tuple(score.values()), ms_per_move, mode_label, turn_label,
+                         tuple(toggles.values()), engine_label, thinking, tuple(hud[0]) if hud else ())
+        if sidebar_scene != self.sidebar_scene:
+            with SPANS.span("draw_sidebar"):
+                draw_sidebar(screen, self.panel_font, self.small_font, *sidebar)
+            dirty.append(sidebar_rect())
+            self.sidebar_scene = sidebar_scene
+
+        if self.full:
+            self.full = False
+            return [screen.get_rect()]
+        return dirty
+
+    @staticmethod
+    def _arrow_rect(arrow: Optional[chess.Move]) -> Optional[pygame.Rect]:
+        """Bounding box of draw_arrow()'s line (padded for the line thickness)."""
+        if arrow is None:
+            return None
+        (x1, y1), (x2, y2) = square_to_xy(arrow.from_square), square_to_xy(arrow.to_square)
+        r = pygame.Rect(min(x1, x2) + SQ//2, min(y1, y2) + SQ//2, abs(x1 - x2), abs(y1 - y2))
+        return r.inflate(8, 8)
+
+    @staticmethod
+    def _square_states(board: chess.Board, last_move: Optional[chess.Move], selected: Optional[int],
+                       legal_targets: List[int], openings: bool, outlines: List[Outline]) -> List[tuple]:
+        """What each square shows (the arrow aside); equal states look the same on screen."""
+        moved = (last_move.from_square, last_move.to_square) if last_move else ()
+        targets = set(legal_targets) if selected is not None else set()
+        marks: Dict[int, list] = {}
+        for sq, color, thickness in outlines:
+            marks.setdefault(sq, []).append((color, thickness))
+        pieces = board.piece_map()
+        return [(pieces.get(sq), sq in moved, sq == selected, sq in targets, openings and sq in CENTER_SQS,
+                 tuple(marks.get(sq, ()))) for sq in chess.SQUARES]
 
 # ---------------- Main loop ----------------
-def collect_legal_targets(board: chess.Board, selected: Optional[int]) -> List[int]:
-    if selected is None: return []
-    return [m.to_square for m in board.legal_moves if m.from_square == selected]
+IDLE_WAIT_MS = 1000  # longest the event-driven loop sleeps without an event
+HUD_REFRESH_MS = 500  # perf HUD numbers update twice a second (each refresh redraws the sidebar)
+HUD_ROWS = 8          # slowest spans (by p95) shown
+HUD_SPANS = ("frame", "events", "bot_move", "coach", "overlays", "render", "draw_sidebar", "display.update",
+             "bot.choose_move", "engine_rationale", "coaching_feedback", "engine.analyse")
 
-def play_loop(mode: str, side: str, engine_path: str, ms_per_move: int):
+def collect_legal_targets(board: chess.Board, selected: Optional[int]) -> List[int]:
+    return state_for(board).targets(selected)
+
+def play_loop(mode: str, side: str, engine_path: str, ms_per_move: int,
+              ponder: int = 3, ponder_budget: float = 1.0, stream: bool = False,
+              qtable_path: str = "", engines: int = 1, engine_threads: int = 1, engine_hash: int = 16,
+              policy: str = "q", search_time: float = 0.5, loop: str = "event", profile_startup: bool = False,
+              perf: bool = False, trace: str = "", symmetry: bool = False):
+    profile = StartupProfile(profile_startup)
+    profile.mark("imports")
     pygame.init()
     width = MARGIN_X*2 + BOARD_SIZE + GAP + SIDEBAR_W
     height = MARGIN_TOP*2 + BOARD_SIZE
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption("PyBot Chess — Coach (H/O/T)")
+    profile.mark("display")
 
     panel_font = pygame.font.SysFont("arial", 18, bold=True)
     small_font = pygame.font.SysFont("arial", 16)
+    profile.mark("fonts")
 
     pieces = load_pieces("pieces-png", size=SQ-8)
+    profile.mark("sprites")
 
-    botA = ChessAI(engine_path=engine_path or None)
-    botB = ChessAI(engine_path=engine_path or None, epsilon=max(0.05, botA.epsilon * 1.2))
+    # One pool of engine processes shared by both bots and all coaching helpers. It is lazy:
+    # nothing is spawned until the first analysis (which runs on a background thread after the
+    # first frame), and a pool whose engine won't start hands its calls to the built-in search.
+    if engine_path:
+        pool = EnginePool(engine_path, size=engines, threads=engine_threads, hash_mb=engine_hash,
+                          lazy=True, fallback=Searcher())
+    else:
+        pool = Searcher()  # offline: the pure-Python alpha-beta search stands in for the engine
+    botA = ChessAI(engine=pool, policy=policy, search_time=search_time, book=coach.BOOK, symmetry=symmetry)
+    botB = botA  # only duels have a second bot
+    if mode == "duel":
+        botB = ChessAI(engine=pool, epsilon=max(0.05, botA.epsilon * 1.2), policy=policy, search_time=search_time,
+                       book=coach.BOOK, symmetry=symmetry)
+        botB.searcher = botA.searcher  # one search (and transposition table) for both sides
+    # timing spans (cheap no-ops until enabled by --perf or the P key): bot moves and engine calls
+    SPANS.enabled = perf or bool(trace)
+    if trace:
+        SPANS.open_trace(trace)
+    instrument(botA, ("choose_move",), prefix="bot.")
+    instrument(botB, ("choose_move",), prefix="bot.")
+    instrument(pool, ("analyse", "analysis"), prefix="engine.")
+    if qtable_path:
+        # trained knowledge, shared by both bots (binary tables are mmap'd, not parsed)
+        botA.q = botB.q = open_qtable(qtable_path)
 
     board = chess.Board()
     selected: Optional[int] = None
@@ -414,8 +413,60 @@ def play_loop(mode: str, side: str, engine_path: str, ms_per_move: int):
     score = {"W":0,"D":0,"L":0}
     illegal_flash_until = 0
 
+    # Event-driven loop: background threads post WAKE when a result is ready, so the loop can
+    # sleep in pygame.event.wait instead of polling. One WAKE in the queue at a time.
+    event_loop = (loop == "event")
+    WAKE = pygame.event.custom_type()
+    wake_pending = threading.Event()
+    def wake() -> None:
+        if event_loop and not wake_pending.is_set():
+            wake_pending.set()
+            pygame.event.post(pygame.event.Event(WAKE))
+    if event_loop:
+        pygame.event.set_blocked(pygame.MOUSEMOTION)  # unused; would wake the loop for nothing
+
+    # Background analysis: the loop only submits jobs and polls futures, never blocks on the engine.
+    worker = AnalysisWorker(on_done=wake)
+    position_gen = 0            # bumped on every board change; stale job results are dropped
+    coach_job = None            # Future[(info_lines, is_blunder)] for the last move
+    move_job = None             # Future[chess.Move] for the bot to play
+    move_job_gen = 0
+    bot_due_at = None           # ticks when the next bot move may be requested (replaces delay)
+    hint_job = None             # Future[(cp, pv)] for the hint arrow
+    hint_gen = -1
+    hint_pv: List[chess.Move] = []
+    # Ponder-ahead: while the human thinks, pre-analyse their likely moves into ANALYSIS_CACHE
+    ponderer = Ponderer(worker, ANALYSIS_CACHE, top_n=ponder, budget=ponder_budget)
+    ponder_gen = -1
+    # Streaming mode: one infinite search per position feeds the sidebar and hint arrow as it
+    # deepens. The stream owns botA's engine, so hint/ponder/commentary jobs are not used.
+    streamer = AnalysisStream(botA.engine, on_update=wake) if (stream and isinstance(botA.engine, EnginePool)) else None
+    stream_seen = -1
+    stream_move = None          # (before, move, coached, before_analysis) for the streamed position
+    if streamer is not None: streamer.request(board)
+
+    def on_board_changed(before: Optional[chess.Board], mv: Optional[chess.Move], coached: bool):
+        nonlocal position_gen, coach_job, bot_due_at, info_lines, stream_move
+        position_gen += 1
+        bot_due_at = None
+        ponderer.cancel()
+        if coach_job is not None: coach_job.cancel()
+        coach_job = None
+        if streamer is not None:
+            _, prev = streamer.snapshot()
+            stream_move = (before, mv, coached, info_eval_and_pv(prev)) if mv is not None else None
+            info_lines = []
+            streamer.request(board)
+            return
+        if mv is not None:
+            info_lines = []
+            coach_job = worker.submit(move_commentary, botA, before, mv, board.copy(),
+                                      coached, toggles["H"], toggles["T"])
+
     # Toggles
-    toggles = {"H": False, "O": False, "T": False}  # H: hints, O: openings, T: tactics
+    toggles = {"H": False, "O": False, "T": False, "P": perf}  # H: hints, O: openings, T: tactics, P: perf HUD
+    hud_lines: Tuple[str, ...] = ()
+    hud_due = 0                 # ticks when the HUD numbers are refreshed next
     last_player_move_blunder = False  # for red outline
 
     playing_human = (mode == "human")
@@ -423,21 +474,51 @@ def play_loop(mode: str, side: str, engine_path: str, ms_per_move: int):
     human_white = (side == "white")
 
     clock = pygame.time.Clock()
+    engine_reported = False
+    engine_error = ""           # set once the lazy pool's engine has failed to start
+    engine_label = "Yes" if isinstance(pool, EnginePool) else "built-in search"
+    engine_calls = lambda: sum(SPANS.calls.get(n, 0) for n in ("engine.analyse", "engine.analysis"))
     running = True
+    over_gen, over = -1, False  # board.is_game_over() for position_gen
+    scored_gen = -1             # position_gen of the last game counted on the scoreboard
+
+    def next_wait_ms() -> int:
+        """How long the event loop may sleep: until the bot's move is due, the illegal flash
+        ends, or IDLE_WAIT_MS (a safety net); results arriving earlier post WAKE."""
+        now = pygame.time.get_ticks()
+        due = [t for t in (bot_due_at if move_job is None else None,
+                           illegal_flash_until if illegal_flash_until > now else None,
+                           hud_due if toggles["P"] else None) if t is not None]
+        return max(0, min([IDLE_WAIT_MS] + [t - now for t in due]))
+    renderer = Renderer(pieces, panel_font, small_font)
 
     while running:
         # -------- events --------
-        for event in pygame.event.get():
+        if event_loop:
+            wait = next_wait_ms()
+            first = pygame.event.wait(wait) if wait > 0 else pygame.event.Event(pygame.NOEVENT)
+            wake_pending.clear()
+            events = ([first] if first.type != pygame.NOEVENT else []) + pygame.event.get()
+        else:
+            events = pygame.event.get()
+        lap = laps()  # phase timings; the wait above is idle time, not work
+        for event in events:
             if event.type == pygame.QUIT: running = False
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE): renderer.invalidate()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE: running = False
                 elif event.key == pygame.K_r:
                     board.reset(); last_move=None; selected=None; info_lines=[]; last_player_move_blunder=False
+                    worker.cancel_pending(); on_board_changed(None, None, False)
                 elif event.key == pygame.K_LEFTBRACKET: ms_per_move = min(3000, ms_per_move + 100)
                 elif event.key == pygame.K_RIGHTBRACKET: ms_per_move = max(0, ms_per_move - 100)
                 elif event.key == pygame.K_h: toggles["H"] = not toggles["H"]
                 elif event.key == pygame.K_o: toggles["O"] = not toggles["O"]
                 elif event.key == pygame.K_t: toggles["T"] = not toggles["T"]
+                elif event.key == pygame.K_p:
+                    toggles["P"] = not toggles["P"]
+                    SPANS.enabled = toggles["P"] or perf or bool(trace)
+                    hud_lines, hud_due = (), 0
 
             if playing_human:
                 human_turn = (board.turn == chess.WHITE and human_white) or (board.turn == chess.BLACK and not human_white)
@@ -455,100 +536,159 @@ def play_loop(mode: str, side: str, engine_path: str, ms_per_move: int):
                         else:
                             # analyze BEFORE move if hints/tactics
                             before = board.copy()
-                            mv = chess.Move(selected, sq, promotion=chess.QUEEN)
-                            pushed = False
-                            if mv in board.legal_moves:
-                                board.push(mv); last_move=mv; selected=None; pushed=True
-                            else:
-                                for m in list(board.legal_moves):
-                                    if m.from_square == selected and m.to_square == sq:
-                                        board.push(m); last_move=m; selected=None; pushed=True; break
+                            mv = state_for(board).find_move(selected, sq)  # promotions default to a queen
+                            pushed = mv is not None
+                            if pushed:
+                                board.push(mv); last_move=mv; selected=None
 
                             if pushed:
-                                # base rationale
-                                info_lines = engine_rationale(botA, board)
-                                # feedback for your move (hints ON)
-                                if toggles["H"]:
-                                    fb, is_blunder = coaching_feedback(botA, before, last_move, board)
-                                    last_player_move_blunder = is_blunder
-                                    info_lines = fb + ["—"] + info_lines
-                                else:
-                                    last_player_move_blunder = False
-                                # tactics: highlight hanging pieces for side to move
-                                if toggles["T"]:
-                                    hangs = find_hanging_pieces(board, board.turn)
-                                    if hangs:
-                                        info_lines = [f"⚠️ Hanging piece(s): {', '.join(human_square(s) for s in hangs)}"] + info_lines
+                                # rationale + feedback + hanging warnings arrive via coach_job
+                                last_player_move_blunder = False
+                                on_board_changed(before, last_move, True)
                             else:
                                 illegal_flash_until = pygame.time.get_ticks() + 350
 
+        lap("events")
+
         # -------- engine / self-play moves --------
-        if not board.is_game_over():
+        if over_gen != position_gen:
+            over_gen, over = position_gen, board.is_game_over()
+        now = pygame.time.get_ticks()
+        if not over and move_job is None:
             if playing_human:
                 bot_turn = (board.turn == chess.WHITE and not human_white) or (board.turn == chess.BLACK and human_white)
-                if bot_turn:
-                    if ms_per_move > 0: pygame.time.delay(ms_per_move)
-                    mv = botA.choose_move(board)
-                    board.push(mv); last_move=mv
-                    info_lines = engine_rationale(botA, board)
             else:
-                if ms_per_move > 0: pygame.time.delay(ms_per_move)
-                mover = botA if (not duel or board.turn == chess.WHITE) else botB
-                mv = mover.choose_move(board)
+                bot_turn = True
+            if bot_turn:
+                if bot_due_at is None:
+                    bot_due_at = now + ms_per_move
+                elif now >= bot_due_at:
+                    mover = botA if (playing_human or not duel or board.turn == chess.WHITE) else botB
+                    move_job = worker.submit(mover.choose_move, board.copy(), priority=AnalysisWorker.URGENT)
+                    move_job_gen = position_gen
+
+        if move_job is not None and move_job.done():
+            job, move_job = move_job, None
+            if not job.cancelled() and move_job_gen == position_gen:
+                before = board.copy()
+                mv = job.result()
                 board.push(mv); last_move=mv
-                info_lines = engine_rationale(botA, board)
-
-        # -------- scoreboard --------
-        if board.is_game_over():
+                on_board_changed(before, mv, False)
+                over_gen, over = position_gen, board.is_game_over()
+
+        lap("bot_move")
+
+        if streamer is not None and streamer.error is not None:
+            # the stream's engine failed: go back to per-move hint/ponder/commentary jobs,
+            # which fall back to the built-in search
+            print(f"[PyBot] Analysis stream stopped: {streamer.error}")
+            streamer.close(); streamer = None
+            hint_gen, hint_pv, stream_move = -1, [], None
+        if streamer is not None:
+            version, info = streamer.snapshot()
+            if version != stream_seen:
+                stream_seen = version
+                now_analysis = info_eval_and_pv(info)
+                hint_pv = now_analysis[1]
+                if stream_move is not None:
+                    before, mv, coached, before_analysis = stream_move
+                    info_lines, last_player_move_blunder = move_commentary(
+                        botA, before, mv, board, coached, toggles["H"], toggles["T"],
+                        before_analysis, now_analysis)
+                else:
+                    info_lines = engine_rationale(botA, board, now_analysis)
+        elif playing_human and ponder_gen != position_gen and not over:
+            human_turn = (board.turn == chess.WHITE) == human_white
+            if human_turn and botA.engine is not None:
+                ponderer.start(botA.engine, board, chess.engine.Limit(time=COACH_TIME))  # type: ignore[attr-defined]
+            ponder_gen = position_gen
+
+        if coach_job is not None and coach_job.done():
+            job, coach_job = coach_job, None
+            if not job.cancelled():
+                info_lines, last_player_move_blunder = job.result()
+
+        lap("coach")
+
+        # -------- scoreboard (once per finished game, not once per frame) --------
+        if over and scored_gen != position_gen:
+            scored_gen = position_gen
             res = board.result()
             if res == '1-0': score["W" if (playing_human and human_white) or not playing_human else "L"] += 1
             elif res == '0-1': score["L" if (playing_human and human_white) or not playing_human else "W"] += 1
             else: score["D"] += 1
 
-        # -------- render --------
-        legal_targets = collect_legal_targets(board, selected)
-        draw_board(screen, board, last_move, selected, legal_targets, pieces)
-
-        # Openings overlay
+        # -------- render (only what changed) --------
+        position = state_for(board)  # legal moves, attacks, hanging pieces: once per position
+        legal_targets = position.targets(selected)
+
+        # Hints: best move arrow (analysed in the background, drawn once ready)
+        if toggles["H"] and botA.engine is not None and not over:
+            if streamer is None and hint_gen != position_gen:
+                if hint_job is not None: hint_job.cancel()
+                hint_gen, hint_pv = position_gen, []
+                booked = book_line(board)
+                if booked is not None:
+                    hint_pv = booked[1]
+                else:
+                    hint_job = worker.submit(engine_eval_and_pv, botA, board.copy(), HINT_TIME)
+            if hint_job is not None and hint_job.done():
+                if not hint_job.cancelled():
+                    _, hint_pv = hint_job.result()
+                hint_job = None
+        arrow = hint_pv[0] if (toggles["H"] and botA.engine is not None and not over and hint_pv) else None
+
+        outlines: List[Outline] = []
+        # Openings overlay: encourage development squares for side to move
         if toggles["O"]:
-            draw_center_highlights(screen)
-            # encourage development squares for side to move
-            for s in DEV_START[board.turn]:
-                if board.piece_at(s):  # still at home
-                    draw_square_outline(screen, s, ACCENT, thickness=3)
-
-        # Hints: best move arrow
-        if toggles["H"] and botA.engine is not None and not board.is_game_over():
-            _, pv_now = engine_eval_and_pv(botA, board, time_limit=0.2)
-            if pv_now:
-                draw_arrow(screen, pv_now[0], color=GREEN, thickness=5)
-
+            outlines += [(s, ACCENT, 3) for s in DEV_START[board.turn] if board.piece_at(s)]  # still at home
         # Tactics overlay: highlight hanging pieces for side to move
-        if toggles["T"] and not board.is_game_over():
-            for sq in find_hanging_pieces(board, board.turn):
-                draw_square_outline(screen, sq, RED, thickness=4)
-
+        if toggles["T"] and not over:
+            outlines += [(sq, RED, 4) for sq in position.hanging(board.turn)]
         # If your last move was a blunder, outline the to-square briefly
         if toggles["H"] and last_player_move_blunder and last_move:
-            draw_square_outline(screen, last_move.to_square, RED, thickness=5)
+            outlines.append((last_move.to_square, RED, 5))
 
-        # illegal overlay flash
-        if pygame.time.get_ticks() < illegal_flash_until:
-            s = pygame.Surface((BOARD_SIZE, BOARD_SIZE), pygame.SRCALPHA)
-            s.fill((*ILLEGAL, 60))
-            screen.blit(s, (MARGIN_X, MARGIN_TOP))
+        lap("overlays")
 
+        if toggles["P"] and pygame.time.get_ticks() >= hud_due:
+            hud_due = pygame.time.get_ticks() + HUD_REFRESH_MS
+            hud_lines = ("Perf p50/p95/p99 (ms) ×calls",
+                         *SPANS.lines(HUD_SPANS)[:HUD_ROWS], f"engine calls: {engine_calls()}")
         mode_label = "Human vs Bot" if playing_human else ("Bot Duel" if duel else "Self-Play")
-        turn_label = ("White" if board.turn == chess.WHITE else "Black") + " to move" if not board.is_game_over() else f"Game Over: {board.result()}"
-        draw_sidebar(
-            screen, panel_font, small_font, info_lines, score, ms_per_move,
-            mode_label, turn_label, toggles, engine_active=(botA.engine is not None)
-        )
-
-        pygame.display.flip()
-        clock.tick(60)
-
-    botA.close(); botB.close()
+        turn_label = ("White" if board.turn == chess.WHITE else "Black") + " to move" if not over else f"Game Over: {board.result()}"
+        dirty = renderer.draw(
+            screen, board, last_move, selected, legal_targets, toggles["O"], arrow, outlines,
+            flash=pygame.time.get_ticks() < illegal_flash_until,
+            sidebar=([engine_error, *info_lines] if engine_error else info_lines, score, ms_per_move, mode_label,
+                     turn_label, toggles, engine_label,
+                     coach_job is not None or move_job is not None
+                     or (streamer is not None and not hint_pv and not over),  # a finished game isn't streamed
+                     hud_lines if toggles["P"] else ()))
+        lap("render")
+        if dirty:
+            pygame.display.update(dirty)
+            lap("display.update")
+            if not profile.done:
+                profile.first_frame()
+        lap.end("frame")
+        if isinstance(pool, EnginePool) and pool.failed is not None and not engine_error:
+            engine_error = f"Engine failed to start: {pool.failed}. Using the built-in search."
+            engine_label = "No (built-in search)"
+            print(f"[PyBot] {engine_error}")
+        if profile_startup and isinstance(pool, EnginePool) and pool.engines and not engine_reported:
+            engine_reported = True
+            print(f"[PyBot] Engine started on first use in {pool.started_in * 1000:.0f} ms")
+        clock.tick(60)  # frame cap; in event mode the wait above does the idling
+
+    ponderer.cancel(); worker.close()
+    if perf or trace:
+        print("[PyBot] Timing spans (last 512 of each):\n" + SPANS.report())
+    SPANS.close_trace()
+    if streamer is not None: streamer.close()
+    botA.close()
+    if botB is not botA: botB.close()
+    if pool is not None: pool.quit()
     pygame.quit()
 
 # ---------------- CLI ----------------
@@ -558,15 +698,46 @@ def main():
     ap.add_argument("--mode", type=str, default="human", choices=["human","self","duel"])
     ap.add_argument("--side", type=str, default="white", choices=["white","black"])
     ap.add_argument("--ms", type=int, default=300, help="delay per bot move (ms); adjust live with [ and ]")
+    ap.add_argument("--analysis-cache", type=int, default=512, help="positions kept in the engine analysis cache (0 disables)")
+    ap.add_argument("--ponder", type=int, default=3, help="human mode: candidate moves pre-analysed on your turn (0 disables)")
+    ap.add_argument("--ponder-budget", type=float, default=1.0, help="engine seconds spent pondering per position")
+    ap.add_argument("--qtable", type=str, default="", help="trained Q-table for the bots (JSON, .bin or qstore .pbq)")
+    ap.add_argument("--symmetry", action="store_true",
+                    help="the Q-table was trained with train_pybot.py --symmetry (mirrored positions share entries)")
+    ap.add_argument("--engines", type=int, default=1, help="engine processes in the shared pool (2 lets feedback searches run side by side)")
+    ap.add_argument("--engine-threads", type=int, default=1, help="UCI Threads option per engine")
+    ap.add_argument("--engine-hash", type=int, default=16, help="UCI Hash (MB) option per engine")
+    ap.add_argument("--stream", action="store_true", help="stream one ever-deepening analysis per position instead of fixed-time searches")
+    ap.add_argument("--book", type=str, action="append", default=[],
+                    help="opening book: Polyglot .bin or a book.py JSON table (repeatable)")
+    ap.add_argument("--policy", type=str, default="q", choices=["q", "search", "linear"],
+                    help="how the bots pick moves: Q-table (ε-greedy), the built-in alpha-beta search, or a linear Q-function")
+    ap.add_argument("--search-time", type=float, default=0.5, help="seconds per move for --policy search")
+    ap.add_argument("--loop", type=str, default="event", choices=["event", "poll"],
+                    help="event: sleep until input or a result arrives (near-zero idle CPU); poll: redraw check at 60 FPS")
+    ap.add_argument("--perf", action="store_true",
+                    help="time the loop phases, coach and engine calls; HUD on (toggle with P) and a p50/p95/p99 table at exit")
+    ap.add_argument("--trace", type=str, default="",
+                    help="write every timing span to a trace file (Chrome trace JSON for Perfetto/speedscope; .jsonl: one span per line)")
+    ap.add_argument("--profile-startup", action="store_true",
+                    help="print time spent in each launch phase up to the first frame, and the engine's start time")
     args = ap.parse_args()
+    ANALYSIS_CACHE.maxsize = args.analysis_cache
+    if args.book:
+        coach.BOOK = OpeningBook(args.book)
+        print(f"[PyBot] Opening book: {len(coach.BOOK)} positions")
 
     engine_path = autodetect_engine(args.engine)
     if engine_path:
         print(f"[PyBot] Using engine: {engine_path}")
     else:
-        print("[PyBot] No engine found — coaching uses heuristics.")
+        print("[PyBot] No engine found — coaching uses the built-in search.")
 
-    play_loop(args.mode, args.side, engine_path, args.ms)
+    play_loop(args.mode, args.side, engine_path, args.ms, ponder=args.ponder, ponder_budget=args.ponder_budget, stream=args.stream,
+              qtable_path=args.qtable, engines=args.engines, engine_threads=args.engine_threads,
+              engine_hash=args.engine_hash, policy=args.policy, search_time=args.search_time,
+              loop=args.loop, profile_startup=args.profile_startup,
+              perf=args.perf, trace=args.trace, symmetry=args.symmetry)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
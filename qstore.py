@@ -0,0 +1,176 @@
+# qstore.py
+# Binary on-disk Q-table format. A table file holds a header plus (state, move)-sorted
+# key/value arrays and is opened with mmap, so play-time lookups are a binary search over
+# the file pages (no parse, no copy). Training appends small delta segments next to the base
+# file; compact() folds them back into a new base.
+#
+#   python3 qstore.py convert pybot_qtable.json pybot_qtable.pbq
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"PBQS"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")  # magic, version, entry count (16 bytes, keeps arrays aligned)
+
+Entry = Tuple[int, int, float]   # (zobrist state, 16-bit move code, value)
+
+
+def write_sorted(path: str, entries: Iterable[Entry]) -> int:
+    """Write entries already sorted by (state, move) and unique; atomic via rename."""
+    keys, vals, moves = array("Q"), array("f"), array("H")
+    for state, code, value in entries:
+        keys.append(state); vals.append(value); moves.append(code)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+        # 8-byte keys first, then 4-byte values, then 2-byte moves: every array stays aligned
+        keys.tofile(f); vals.tofile(f); moves.tofile(f)
+    os.replace(tmp, path)
+    return len(keys)
+
+def write_table(path: str, entries: Iterable[Entry]) -> int:
+    """Write entries in any order (later duplicates win) as a table file."""
+    merged = {}
+    for state, code, value in entries:
+        merged[(state, code)] = value
+    return write_sorted(path, ((k[0], k[1], merged[k]) for k in sorted(merged)))
+
+def merge_sorted(base: Iterable[Entry], overrides: dict) -> Iterator[Entry]:
+    """Stream a sorted base with {(state, move): value} overrides applied, still sorted."""
+    pending = sorted(overrides.items())
+    j = 0
+    for state, code, value in base:
+        while j < len(pending) and pending[j][0] < (state, code):
+            (s, c), v = pending[j]; j += 1
+            yield s, c, v
+        if j < len(pending) and pending[j][0] == (state, code):
+            value = pending[j][1]; j += 1
+        yield state, code, value
+    for (s, c), v in pending[j:]:
+        yield s, c, v
+
+
+class MappedTable:
+    """Read-only, mmap-backed view of a table file written by write_table()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a PyBot Q-table (v{VERSION}) file")
+        self.n = n
+        view = memoryview(self._mm)
+        off = HEADER.size
+        self.keys = view[off:off + 8 * n].cast("Q"); off += 8 * n
+        self.vals = view[off:off + 4 * n].cast("f"); off += 4 * n
+        self.moves = view[off:off + 2 * n].cast("H")
+
+    def _range(self, state: int) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, state)
+        if lo == self.n or self.keys[lo] != state:
+            return lo, lo
+        return lo, bisect_right(self.keys, state, lo)
+
+    def lookup(self, state: int, code: int) -> Optional[float]:
+        lo, hi = self._range(state)
+        if lo == hi:
+            return None
+        i = bisect_left(self.moves, code, lo, hi)
+        if i < hi and self.moves[i] == code:
+            return self.vals[i]
+        return None
+
+    def moves_of(self, state: int) -> Iterator[Tuple[int, float]]:
+        lo, hi = self._range(state)
+        for i in range(lo, hi):
+            yield self.moves[i], self.vals[i]
+
+    def items(self) -> Iterator[Entry]:
+        return zip(self.keys, self.moves, self.vals)
+
+    def __len__(self) -> int:
+        return self.n
+
+
+# ---------------- delta segments ----------------
+def segment_paths(base: str) -> List[str]:
+    """Delta segments for `base`, oldest first (base.00001.delta, base.00002.delta, ...)."""
+    return sorted(glob.glob(glob.escape(base) + ".*.delta"))
+
+def next_segment_path(base: str) -> str:
+    existing = segment_paths(base)
+    last = int(existing[-1].rsplit(".", 2)[-2]) if existing else 0
+    return f"{base}.{last + 1:05d}.delta"
+
+def compact(base: str) -> int:
+    """Fold every current delta segment into a new base file, then drop those segments.
+    Safe to run in a background thread while new segments are being appended."""
+    segments = segment_paths(base)
+    overrides = {}
+    for p in segments:  # segments are small; the base is streamed, never loaded whole
+        for state, code, value in MappedTable(p).items():
+            overrides[(state, code)] = value
+    old = MappedTable(base).items() if os.path.exists(base) else iter(())
+    n = write_sorted(base, merge_sorted(old, overrides))
+    for p in segments:
+        os.remove(p)
+    return n
+
+
+# ---------------- converters ----------------
+def state_from_fen_key(key: str):
+    """chess.Board for a dict-backend state key ('board_fen turn castling ep_square_index')."""
+    import chess
+    placement, turn, castling, ep = key.split(" ")
+    board = chess.Board(f"{placement} {turn} {castling} - 0 1")
+    board.ep_square = None if ep == "-" else int(ep)
+    return board
+
+def convert_json(src: str, dst: str) -> int:
+    import chess.polyglot
+    from chess_ai import encode_move
+    with open(src) as f:
+        table = json.load(f)
+
+    def entries() -> Iterator[Entry]:
+        for key, moves in table.items():
+            state = chess.polyglot.zobrist_hash(state_from_fen_key(key))
+            for uci, value in moves.items():
+                yield state, encode_move(uci), value
+    return write_table(dst, entries())
+
+def convert_compact(src: str, dst: str) -> int:
+    from chess_ai import CompactQTable
+    q = CompactQTable()
+    q.load(src)
+    return write_table(dst, q.items())
+
+def main():
+    ap = argparse.ArgumentParser(description="PyBot binary Q-table tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("convert", help="convert a JSON (dict backend) or .bin (compact backend) table")
+    c.add_argument("src"); c.add_argument("dst")
+    k = sub.add_parser("compact", help="fold delta segments into the base file")
+    k.add_argument("base")
+    args = ap.parse_args()
+
+    if args.cmd == "convert":
+        with open(args.src, "rb") as f:
+            head = f.read(8)
+        n = convert_json(args.src, args.dst) if head.lstrip()[:1] == b"{" else convert_compact(args.src, args.dst)
+        print(f"[PyBot] Wrote {n} entries to {args.dst}")
+    else:
+        print(f"[PyBot] Compacted {args.base}: {compact(args.base)} entries")
+
+if __name__ == "__main__":
+    main()
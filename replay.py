@@ -0,0 +1,59 @@
+# replay.py
+# Experience replay for Q-learning: a fixed-capacity ring buffer of transitions kept in
+# flat arrays (no per-transition tuples), sampled in batches for ChessAI.update_batch().
+
+import random
+from array import array
+from typing import List, Sequence, Tuple
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of (state, move code, reward, next state) transitions.
+    - int_keys=True stores Zobrist states in uint64 arrays (compact / stored backends);
+      False keeps them in lists (the dict backend's FEN-ish string keys).
+    - once full, each push overwrites the oldest transition.
+    """
+
+    def __init__(self, capacity: int = 100_000, int_keys: bool = True):
+        self.capacity = max(1, capacity)
+        if int_keys:
+            self.states = array("Q", [0]) * self.capacity
+            self.nexts = array("Q", [0]) * self.capacity
+        else:
+            self.states = [None] * self.capacity
+            self.nexts = [None] * self.capacity
+        self.moves = array("H", [0]) * self.capacity
+        self.rewards = array("d", [0.0]) * self.capacity
+        self.size = 0
+        self.pos = 0    # next slot to write
+        self.pushed = 0  # transitions ever pushed
+
+    def push(self, state, code: int, reward: float, next_state) -> None:
+        i = self.pos
+        self.states[i] = state
+        self.moves[i] = code
+        self.rewards[i] = reward
+        self.nexts[i] = next_state
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.pushed += 1
+
+    def sample(self, n: int, rng=random) -> List[int]:
+        """n slot indices drawn uniformly (with replacement) from the stored transitions."""
+        size = self.size
+        return [int(rng.random() * size) for _ in range(n)] if size else []
+
+    def recent(self, n: int) -> List[int]:
+        """Slot indices of the last n pushes, oldest first."""
+        n = min(n, self.size)
+        return [(self.pos - n + k) % self.capacity for k in range(n)]
+
+    def batch(self, idx: Sequence[int]) -> Tuple[list, list, list, list]:
+        """(states, move codes, rewards, next states) for the given slots."""
+        states, moves, rewards, nexts = self.states, self.moves, self.rewards, self.nexts
+        return ([states[i] for i in idx], [moves[i] for i in idx],
+                [rewards[i] for i in idx], [nexts[i] for i in idx])
+
+    def __len__(self) -> int:
+        return self.size
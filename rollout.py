@@ -0,0 +1,79 @@
+# rollout.py
+# Fast self-play positions for training. play_training_game asks python-chess for the legal
+# moves up to three times a ply (the learner's list, the opponent's list, is_game_over) and
+# replays the move stack for repetitions. A Rollout generates once per ply and derives the
+# game-over status from that generation:
+#   legal_moves()  the full list, when a policy needs to rank every move (the learner)
+#   random_move()  one uniformly random legal move, testing legality lazily (the opponent)
+#   outcome        set by either of them when the side to move has no legal move, and by push()
+#                  for the automatic draws (insufficient material, 75 moves, fivefold repetition)
+# The move stack is never read: repetitions are counted here, per transposition key, since the
+# last irreversible move. Uses python-chess 1.x internals (_slider_blockers, _is_safe,
+# _transposition_key), the same test generate_legal_moves() applies.
+
+import random
+from typing import Dict, List, Optional
+
+import chess
+
+
+class Rollout:
+    """A game in progress: the board, repetition counts and (once the game ends) its result."""
+
+    __slots__ = ("board", "seen", "result")
+
+    def __init__(self, board: Optional[chess.Board] = None):
+        self.board = board.copy(stack=False) if board is not None else chess.Board()
+        self.seen: Dict[tuple, int] = {self.board._transposition_key(): 1}
+        self.result: Optional[str] = None  # "1-0", "0-1", "1/2-1/2" once the game is over
+
+    @property
+    def over(self) -> bool:
+        return self.result is not None
+
+    def _no_moves(self) -> None:
+        b = self.board
+        self.result = ("0-1" if b.turn == chess.WHITE else "1-0") if b.is_check() else "1/2-1/2"
+
+    def legal_moves(self) -> List[chess.Move]:
+        """Every legal move (one generation); an empty list ends the game."""
+        moves = list(self.board.generate_legal_moves())
+        if not moves:
+            self._no_moves()
+        return moves
+
+    def random_move(self, rng=random) -> Optional[chess.Move]:
+        """A uniformly random legal move, or None (game over). Out of check, pseudo-legal moves
+        are drawn at random and only the drawn ones are tested; an illegal draw is removed and
+        the draw repeated, so every legal move stays equally likely."""
+        b = self.board
+        king = b.king(b.turn)
+        if king is None or b.is_check():
+            moves = self.legal_moves()  # evasions: rare, let python-chess filter them
+            return rng.choice(moves) if moves else None
+        blockers = b._slider_blockers(king)
+        moves = list(b.generate_pseudo_legal_moves())
+        while moves:
+            i = rng.randrange(len(moves))
+            move = moves[i]
+            if b._is_safe(king, blockers, move):
+                return move
+            moves[i] = moves[-1]
+            moves.pop()
+        self._no_moves()
+        return None
+
+    def push(self, move: chess.Move) -> None:
+        b = self.board
+        zeroing = b.is_zeroing(move)
+        material = b.is_capture(move) or move.promotion is not None
+        b.push(move)
+        if zeroing:
+            self.seen.clear()  # positions before a pawn move or capture can't recur
+            b.clear_stack()  # nothing reads the history; keeps the board small
+        key = b._transposition_key()
+        n = self.seen[key] = self.seen.get(key, 0) + 1
+        if (material and b.is_insufficient_material()) or b.halfmove_clock >= 150 or n >= 5:
+            # automatic draws; a checkmate delivered by this very move still wins
+            if not (b.is_check() and not any(b.generate_legal_moves())):
+                self.result = "1/2-1/2"
@@ -0,0 +1,217 @@
+# search.py
+# Built-in pure-Python search so PyBot plays (and coaches) without Stockfish:
+# iterative deepening alpha-beta with a transposition table, MVV-LVA and killer move
+# ordering, and a captures-only quiescence search, all under a time / depth / node budget.
+# Searcher.analyse() returns the same info dict as chess.engine (score, pv, depth, nodes,
+# nps), so it can stand in for an engine wherever the coach expects one.
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import chess
+import chess.engine
+
+from evaluator import PIECE_VALUES, positional_eval, simple_material_eval
+
+MATE = 100_000
+INF = 1_000_000
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# MVV-LVA: most valuable victim first, then least valuable attacker
+_ORDER_VALUE = {**PIECE_VALUES, chess.KING: 2000}
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Searcher:
+    """
+    Alpha-beta searcher with a simple engine-like surface (analyse / quit).
+    - tt_size caps transposition-table entries (the table is cleared when full).
+    - positional=False scores leaves by material only (faster, weaker).
+    - one search at a time: calls from several threads are serialised.
+    """
+
+    DEFAULT_DEPTH = 4  # used when a Limit sets neither time, depth nor nodes
+
+    def __init__(self, tt_size: int = 1 << 18, positional: bool = True):
+        self.tt_size = tt_size
+        self.tt: Dict[tuple, Tuple[int, int, int, Optional[chess.Move]]] = {}  # key -> (depth, flag, score, move)
+        self.eval_fn = positional_eval if positional else simple_material_eval
+        self.killers: List[List[Optional[chess.Move]]] = []
+        self.nodes = 0
+        self.last: dict = {}
+        self._deadline = None
+        self._max_nodes = None
+        self._lock = threading.Lock()
+
+    # -------- engine-compatible surface --------
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, multipv: Optional[int] = None, **_):
+        info = self.search(board, time_limit=limit.time, max_depth=limit.depth, max_nodes=limit.nodes)
+        return [info] if multipv is not None else info
+
+    def quit(self) -> None:
+        self.tt.clear()
+
+    # -------- search --------
+    def search(self, board: chess.Board, time_limit: Optional[float] = None, max_depth: Optional[int] = None,
+               max_nodes: Optional[int] = None) -> dict:
+        """Iterative deepening from `board`. Returns {score, pv, depth, nodes, nps, time}."""
+        if time_limit is None and max_depth is None and max_nodes is None:
+            max_depth = self.DEFAULT_DEPTH
+        with self._lock:
+            board = board.copy()  # keeps the move stack for repetition checks
+            start = time.perf_counter()
+            self._deadline = start + time_limit if time_limit else None
+            self._max_nodes = max_nodes
+            self.nodes = 0
+            self.killers = [[None, None] for _ in range(128)]
+            if len(self.tt) > self.tt_size:
+                self.tt.clear()
+
+            best_score, best_pv, reached = self.eval_fn(board), [], 0
+            if not board.is_game_over():
+                for depth in range(1, (max_depth or 64) + 1):
+                    try:
+                        score = self._negamax(board, depth, -INF, INF, 0)
+                    except _Timeout:
+                        break
+                    best_score, best_pv, reached = score, self._pv(board, depth), depth
+                    if abs(score) >= MATE - 256:
+                        break  # forced mate found; deeper search can't change the verdict
+                    # don't start an iteration we are unlikely to finish
+                    if self._deadline is not None and time.perf_counter() - start > (self._deadline - start) / 2:
+                        break
+            else:
+                best_score = -MATE if board.is_checkmate() else 0  # drawn root: what _negamax gives draws
+
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            self.last = {"score": chess.engine.PovScore(_to_score(best_score), board.turn), "pv": best_pv,
+                         "depth": reached, "nodes": self.nodes, "nps": int(self.nodes / elapsed), "time": elapsed}
+            return self.last
+
+    def best_move(self, board: chess.Board, time_limit: Optional[float] = None,
+                  max_depth: Optional[int] = None) -> Optional[chess.Move]:
+        pv = self.search(board, time_limit=time_limit, max_depth=max_depth)["pv"]
+        return pv[0] if pv else next(iter(board.legal_moves), None)
+
+    def quiescence(self, board: chess.Board) -> int:
+        """Static eval with hanging captures resolved (centipawns, side to move)."""
+        with self._lock:
+            self._deadline = self._max_nodes = None
+            return self._quiesce(board.copy(stack=False), -INF, INF)
+
+    # -------- internals --------
+    def _tick(self) -> None:
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise _Timeout
+            if self._max_nodes is not None and self.nodes >= self._max_nodes:
+                raise _Timeout
+
+    def _negamax(self, board: chess.Board, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self._tick()
+        if ply and (board.halfmove_clock >= 100 or board.is_repetition(2)):
+            return 0
+        key = board._transposition_key()
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            d, flag, s, tt_move = entry
+            if d >= depth and ply:
+                if flag == EXACT:
+                    return s
+                if flag == LOWER and s >= beta:
+                    return s
+                if flag == UPPER and s <= alpha:
+                    return s
+        if depth <= 0:
+            return self._quiesce(board, alpha, beta)
+
+        moves = self._ordered(board, tt_move, ply)
+        if not moves:
+            return -MATE + ply if board.is_check() else 0
+
+        alpha0, best, best_move = alpha, -INF, None
+        for m in moves:
+            quiet = not board.is_capture(m)
+            board.push(m)
+            score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best:
+                best, best_move = score, m
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if quiet and m != self.killers[ply][0]:
+                            self.killers[ply] = [m, self.killers[ply][0]]
+                        break
+        flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        self.tt[key] = (depth, flag, best, best_move)
+        return best
+
+    def _quiesce(self, board: chess.Board, alpha: int, beta: int) -> int:
+        self._tick()
+        stand = self.eval_fn(board)
+        if stand >= beta:
+            return stand
+        if stand > alpha:
+            alpha = stand
+        for _, m in sorted(((self._mvv_lva(board, m), m) for m in board.generate_legal_captures()),
+                           key=lambda t: t[0], reverse=True):
+            board.push(m)
+            score = -self._quiesce(board, -beta, -alpha)
+            board.pop()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    @staticmethod
+    def _mvv_lva(board: chess.Board, m: chess.Move) -> int:
+        victim = chess.PAWN if board.is_en_passant(m) else board.piece_type_at(m.to_square)
+        return 10 * _ORDER_VALUE[victim] - _ORDER_VALUE[board.piece_type_at(m.from_square)]
+
+    def _ordered(self, board: chess.Board, tt_move: Optional[chess.Move], ply: int) -> List[chess.Move]:
+        """TT move, captures by MVV-LVA, promotions, killers, then quiet moves."""
+        k1, k2 = self.killers[ply] if ply < len(self.killers) else (None, None)
+        scored = []
+        for m in board.legal_moves:
+            if m == tt_move:
+                s = 1_000_000
+            elif board.is_capture(m):
+                s = 100_000 + self._mvv_lva(board, m)
+            elif m.promotion:
+                s = 90_000 + _ORDER_VALUE[m.promotion]
+            elif m == k1:
+                s = 80_000
+            elif m == k2:
+                s = 79_000
+            else:
+                s = 0
+            scored.append((s, m))
+        scored.sort(key=lambda t: t[0], reverse=True)
+        return [m for _, m in scored]
+
+    def _pv(self, board: chess.Board, depth: int) -> List[chess.Move]:
+        """Principal variation read back from the transposition table."""
+        pv: List[chess.Move] = []
+        b = board.copy(stack=False)
+        for _ in range(depth):
+            entry = self.tt.get(b._transposition_key())
+            if entry is None or entry[3] is None or not b.is_legal(entry[3]):
+                break
+            pv.append(entry[3])
+            b.push(entry[3])
+        return pv
+
+
+def _to_score(score: int) -> chess.engine.Score:
+    if abs(score) >= MATE - 256:
+        plies = MATE - abs(score)
+        return chess.engine.Mate((plies + 1) // 2 if score > 0 else -((plies + 1) // 2))
+    return chess.engine.Cp(score)
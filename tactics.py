@@ -0,0 +1,222 @@
+# tactics.py
+# Tactical motifs straight from the board's bitboards: one attack mask per piece, a static
+# exchange evaluation (SEE) for every attacked piece, forks and absolute pins. Cheap enough
+# to run on every move of a training game or a PGN archive, not just in the overlay.
+#   hanging: a piece the opponent wins material by capturing (SEE > 0), which includes
+#            pieces that are defended, but by too few or too valuable defenders.
+
+from typing import Dict, List, NamedTuple, Tuple
+
+import chess
+from chess import (BB_ALL, BB_DIAG_ATTACKS, BB_DIAG_MASKS, BB_FILE_A, BB_FILE_ATTACKS, BB_FILE_H, BB_FILE_MASKS,
+                   BB_KING_ATTACKS, BB_KNIGHT_ATTACKS, BB_PAWN_ATTACKS, BB_RANK_ATTACKS, BB_RANK_MASKS, BB_SQUARES)
+
+from evaluator import PIECE_VALUES
+
+# exchange values; the king can't be traded, so it is worth more than everything else together
+SEE_VALUES = {**PIECE_VALUES, chess.KING: 20000}
+
+
+class Fork(NamedTuple):
+    square: int               # the forking piece
+    color: bool
+    targets: Tuple[int, ...]  # enemy pieces it hits that matter (king, bigger, or winnable)
+
+
+class Pin(NamedTuple):
+    square: int  # the pinned piece
+    pinner: int  # the enemy slider behind it
+    king: int
+
+
+class TacticsReport:
+    """
+    Everything analyse() found in one position.
+    - attacks[sq]: attack mask of the piece on sq; attacked[color]: union over color's pieces.
+    - hanging[color]: color's pieces the opponent wins material by taking (highest square
+      first); gains[sq] is that SEE gain in centipawns.
+    - forks / pins for both sides.
+    """
+
+    __slots__ = ("attacks", "attacked", "hanging", "gains", "forks", "pins")
+
+    def __init__(self):
+        self.attacks: Dict[int, int] = {}
+        self.attacked = [0, 0]
+        self.hanging: Dict[bool, List[int]] = {chess.WHITE: [], chess.BLACK: []}
+        self.gains: Dict[int, int] = {}
+        self.forks: List[Fork] = []
+        self.pins: List[Pin] = []
+
+
+# ---------------- static exchange evaluation ----------------
+class _Bitboards:
+    """The board's piece bitboards read once; SEE touches them many times per position."""
+
+    __slots__ = ("pawns", "knights", "bishops", "rooks", "queens", "kings", "occ_co", "qr", "qb", "types")
+
+    def __init__(self, board: chess.Board):
+        self.pawns, self.knights, self.bishops = board.pawns, board.knights, board.bishops
+        self.rooks, self.queens, self.kings = board.rooks, board.queens, board.kings
+        self.occ_co = board.occupied_co
+        self.qr = self.queens | self.rooks
+        self.qb = self.queens | self.bishops
+        # least valuable first
+        self.types = ((chess.PAWN, self.pawns), (chess.KNIGHT, self.knights), (chess.BISHOP, self.bishops),
+                      (chess.ROOK, self.rooks), (chess.QUEEN, self.queens), (chess.KING, self.kings))
+
+    def attackers(self, sq: int, occ: int) -> int:
+        """Pieces of both colours attacking sq through occupancy occ; x-rays appear as occ shrinks."""
+        return ((BB_KING_ATTACKS[sq] & self.kings)
+                | (BB_KNIGHT_ATTACKS[sq] & self.knights)
+                | (BB_RANK_ATTACKS[sq][BB_RANK_MASKS[sq] & occ] & self.qr)
+                | (BB_FILE_ATTACKS[sq][BB_FILE_MASKS[sq] & occ] & self.qr)
+                | (BB_DIAG_ATTACKS[sq][BB_DIAG_MASKS[sq] & occ] & self.qb)
+                | (BB_PAWN_ATTACKS[chess.BLACK][sq] & self.pawns & self.occ_co[chess.WHITE])
+                | (BB_PAWN_ATTACKS[chess.WHITE][sq] & self.pawns & self.occ_co[chess.BLACK])) & occ
+
+    def piece_attacks(self, sq: int, pt: int, color: bool, occ: int) -> int:
+        """Same as board.attacks_mask(sq) when the piece type and colour are already known."""
+        if pt == chess.PAWN:
+            return BB_PAWN_ATTACKS[color][sq]
+        if pt == chess.KNIGHT:
+            return BB_KNIGHT_ATTACKS[sq]
+        if pt == chess.KING:
+            return BB_KING_ATTACKS[sq]
+        a = 0
+        if pt != chess.ROOK:
+            a = BB_DIAG_ATTACKS[sq][BB_DIAG_MASKS[sq] & occ]
+        if pt != chess.BISHOP:
+            a |= BB_RANK_ATTACKS[sq][BB_RANK_MASKS[sq] & occ] | BB_FILE_ATTACKS[sq][BB_FILE_MASKS[sq] & occ]
+        return a
+
+    def attacked_by(self, color: bool, occ: int) -> int:
+        """Every square `color` attacks; pawns set-wise with shifts, other pieces from tables."""
+        own = self.occ_co[color]
+        p = self.pawns & own
+        if color == chess.WHITE:
+            a = ((p << 7) & ~BB_FILE_H | (p << 9) & ~BB_FILE_A) & BB_ALL
+        else:
+            a = (p >> 9) & ~BB_FILE_H | (p >> 7) & ~BB_FILE_A
+        for sq in chess.scan_forward(self.knights & own):
+            a |= BB_KNIGHT_ATTACKS[sq]
+        for sq in chess.scan_forward(self.kings & own):
+            a |= BB_KING_ATTACKS[sq]
+        for sq in chess.scan_forward(self.qb & own):
+            a |= BB_DIAG_ATTACKS[sq][BB_DIAG_MASKS[sq] & occ]
+        for sq in chess.scan_forward(self.qr & own):
+            a |= BB_RANK_ATTACKS[sq][BB_RANK_MASKS[sq] & occ] | BB_FILE_ATTACKS[sq][BB_FILE_MASKS[sq] & occ]
+        return a
+
+    def type_at(self, sq: int) -> int:
+        bit = BB_SQUARES[sq]
+        for pt, bb in self.types:
+            if bb & bit:
+                return pt
+        return 0
+
+    def see(self, square: int, color: bool, occ: int, attackers: int) -> int:
+        target = self.type_at(square)
+        if not target:
+            return 0
+        gain = [SEE_VALUES[target]]
+        side = color
+        mine = attackers & self.occ_co[side]
+        while mine:
+            for pt, bb in self.types:  # least valuable attacker
+                m = mine & bb
+                if m:
+                    break
+            # the other side's net if it takes the capturer (the last entry is dropped if it can't);
+            # no max(-gain[d-1], gain[d]) < 0 cut-off: it keeps SEE's sign but not its value
+            gain.append(SEE_VALUES[pt] - gain[-1])
+            occ ^= m & -m
+            side = not side
+            mine = self.attackers(square, occ) & self.occ_co[side]
+        if len(gain) == 1:
+            return 0  # `color` had no attacker
+        for d in range(len(gain) - 2, 0, -1):
+            gain[d - 1] = -max(-gain[d - 1], gain[d])
+        return gain[0]
+
+
+def see(board: chess.Board, square: int, color: bool) -> int:
+    """Material `color` wins by capturing on `square` with its least valuable attacker, both
+    sides then recapturing only while it pays (swap algorithm; pins and promotions ignored).
+    0 when the square is empty or `color` has no attacker."""
+    bbs = _Bitboards(board)
+    occ = board.occupied
+    return bbs.see(square, color, occ, bbs.attackers(square, occ))
+
+
+# ---------------- motifs ----------------
+def _hanging(bbs: _Bitboards, occ: int, color: bool, attacked_by_opp: int) -> List[Tuple[int, int]]:
+    out = []
+    for sq in chess.scan_reversed(bbs.occ_co[color] & attacked_by_opp & ~bbs.kings):
+        gain = bbs.see(sq, not color, occ, bbs.attackers(sq, occ))
+        if gain > 0:
+            out.append((sq, gain))
+    return out
+
+
+def hanging_pieces(board: chess.Board, color: bool) -> List[Tuple[int, int]]:
+    """(square, SEE gain for the opponent) for color's pieces that lose material to a capture,
+    highest square first."""
+    bbs = _Bitboards(board)
+    occ = board.occupied
+    return _hanging(bbs, occ, color, bbs.attacked_by(not color, occ))
+
+
+def pins(board: chess.Board, color: bool) -> List[Pin]:
+    """color's pieces pinned to their own king by an enemy rook, bishop or queen."""
+    king = board.king(color)
+    if king is None:
+        return []
+    rq = board.rooks | board.queens
+    bq = board.bishops | board.queens
+    snipers = ((BB_RANK_ATTACKS[king][0] & rq) | (BB_FILE_ATTACKS[king][0] & rq)
+               | (BB_DIAG_ATTACKS[king][0] & bq)) & board.occupied_co[not color]
+    out = []
+    for sniper in chess.scan_reversed(snipers):
+        b = chess.between(king, sniper) & board.occupied
+        if b and b & (b - 1) == 0 and b & board.occupied_co[color]:
+            out.append(Pin(b.bit_length() - 1, sniper, king))
+    return out
+
+
+def analyse(board: chess.Board) -> TacticsReport:
+    """Attack masks, hanging pieces with SEE gains, forks and pins for both sides."""
+    rep = TacticsReport()
+    attacks = rep.attacks
+    bbs = _Bitboards(board)
+    occ = board.occupied
+    for color in (chess.WHITE, chess.BLACK):
+        acc = 0
+        own = bbs.occ_co[color]
+        for pt, bb in bbs.types:
+            for sq in chess.scan_forward(bb & own):
+                a = attacks[sq] = bbs.piece_attacks(sq, pt, color, occ)
+                acc |= a
+        rep.attacked[color] = acc
+    for color in (chess.WHITE, chess.BLACK):
+        for sq, gain in _hanging(bbs, occ, color, rep.attacked[not color]):
+            rep.hanging[color].append(sq)
+            rep.gains[sq] = gain
+        rep.pins += pins(board, color)
+    # forks: one piece hitting two or more targets that matter — the king, a piece worth
+    # more than the attacker, or a piece it would win (hanging to it)
+    for color in (chess.WHITE, chess.BLACK):
+        enemy = board.occupied_co[not color]
+        loose = 0
+        for sq in rep.hanging[not color]:
+            loose |= BB_SQUARES[sq]
+        for sq in chess.scan_forward(board.occupied_co[color]):
+            hits = attacks[sq] & enemy
+            if hits & (hits - 1) == 0:
+                continue  # fewer than two targets
+            value = SEE_VALUES[bbs.type_at(sq)]
+            targets = tuple(t for t in chess.scan_forward(hits)
+                            if BB_SQUARES[t] & (bbs.kings | loose) or SEE_VALUES[bbs.type_at(t)] > value)
+            if len(targets) >= 2:
+                rep.forks.append(Fork(sq, color, targets))
+    return rep
@@ -0,0 +1,22 @@
+# tests/fake_uci.py
+# A minimal UCI engine for tests: `python fake_uci.py NAME` identifies as NAME, offers Hash and
+# Threads, and answers every search with a fixed score.
+import sys
+
+name = sys.argv[1] if len(sys.argv) > 1 else "Fake"
+for line in sys.stdin:
+    cmd = line.split()
+    if not cmd:
+        continue
+    if cmd[0] == "uci":
+        print(f"id name {name}\nid author PyBot tests")
+        print("option name Hash type spin default 16 min 1 max 1024")
+        print("option name Threads type spin default 1 min 1 max 64")
+        print("uciok")
+    elif cmd[0] == "isready":
+        print("readyok")
+    elif cmd[0] == "go":
+        print("info depth 1 score cp 12\nbestmove 0000")
+    elif cmd[0] == "quit":
+        break
+    sys.stdout.flush()
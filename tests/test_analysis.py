@@ -0,0 +1,33 @@
+# tests/test_analysis.py
+import sys
+import threading
+
+import chess
+import chess.engine
+
+from analysis import AnalysisCache, AnalysisStream
+from engine_pool import EnginePool
+
+
+def test_stream_stops_and_reports_engine_failure():
+    pool = EnginePool([sys.executable, "-c", "raise SystemExit(1)"], lazy=True)
+    updated = threading.Event()
+    stream = AnalysisStream(pool, on_update=updated.set)
+    try:
+        stream.request(chess.Board())
+        assert updated.wait(10)
+        assert isinstance(stream.error, RuntimeError) and pool.failed is not None
+    finally:
+        stream.close()
+        pool.quit()
+
+
+def test_cache_peek_does_not_count():
+    cache = AnalysisCache()
+    board, limit = chess.Board(), chess.engine.Limit(depth=12)
+    assert cache.peek(board, limit) is None
+    cache.put(board, limit, {"depth": 12})
+    assert cache.peek(board, chess.engine.Limit(depth=8)) == {"depth": 12}  # a deeper search covers it
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert cache.get(board, limit) == {"depth": 12} and cache.get(chess.Board(), chess.engine.Limit(depth=20)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
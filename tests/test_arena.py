@@ -0,0 +1,64 @@
+# tests/test_arena.py
+import argparse
+import math
+from collections import Counter
+
+import pytest
+
+import arena
+from arena import elo_of, expected_score, llr, los, sprt_bounds
+
+
+@pytest.mark.parametrize("elo", [-600, -100, -10, 0, 10, 100, 600])
+def test_elo_and_expected_score_are_inverses(elo):
+    assert elo_of(expected_score(elo)) == pytest.approx(elo, abs=1e-6)
+    assert expected_score(elo_of(expected_score(elo))) == pytest.approx(expected_score(elo))
+
+
+def test_llr_sign_follows_the_elo_side():
+    assert llr(Counter(), 0, 10) == 0.0
+    above = Counter({1.0: 30, 0.5: 100, 0.0: 20})  # about +23 Elo
+    below = Counter({1.0: 20, 0.5: 100, 0.0: 30})  # about -23 Elo
+    assert llr(above, 0, 10) > 0 > llr(below, 0, 10)
+    assert llr(above, 30, 40) < 0  # the same match is below a higher elo0
+
+
+def first_crossing(pairs_of, lower: float, upper: float) -> tuple:
+    for n in range(1, 1000):
+        ratio = llr(pairs_of(n), 0, 10)
+        if not lower < ratio < upper:
+            return n, ratio
+    return None, None
+
+
+def test_sprt_stops_on_the_right_bound():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert (lower, upper) == pytest.approx((-math.log(19), math.log(19)))
+    assert sprt_bounds(0.05, 0.1) == pytest.approx((math.log(0.1 / 0.95), math.log(0.9 / 0.05)))
+    n, ratio = first_crossing(lambda n: Counter({1.0: n}), lower, upper)  # every pair won
+    assert n is not None and ratio >= upper
+    n, ratio = first_crossing(lambda n: Counter({0.5: n}), lower, upper)  # every pair drawn: no stronger
+    assert n is not None and ratio <= lower
+
+
+def test_los():
+    assert los(0, 0) == 0.5 and los(10, 10) == 0.5
+    assert los(20, 5) > 0.99 and los(5, 20) < 0.01
+
+
+def opening_opts(path: str) -> argparse.Namespace:
+    return argparse.Namespace(seed=1, openings=path, book=[], book_plies=8, random_plies=None)
+
+
+def test_openings_skip_finished_lines(tmp_path):
+    path = tmp_path / "openings.epd"
+    path.write_text("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq -\nstartpos\n")  # mated, playable
+    fens = arena.openings(opening_opts(str(path)))
+    assert {next(fens) for _ in range(4)} == {"rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"}
+
+
+def test_openings_raise_when_every_line_is_finished(tmp_path):
+    path = tmp_path / "openings.epd"
+    path.write_text("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq -\n7k/5Q2/6K1/8/8/8/8/8 b - -\n")
+    with pytest.raises(ValueError, match="no playable opening"):
+        next(arena.openings(opening_opts(str(path))))
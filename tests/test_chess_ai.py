@@ -0,0 +1,45 @@
+# tests/test_chess_ai.py
+import sys
+from pathlib import Path
+
+import chess
+
+from chess_ai import ChessAI, StoredQTable, open_qtable
+from engine_pool import EnginePool
+
+
+def test_stored_compaction_trims_overlay(tmp_path):
+    path = str(tmp_path / "q.pbq")
+    q = StoredQTable(compact_every=2)
+    moves = list(chess.Board().legal_moves)
+    q.save(path)  # empty base
+    for state in range(1, 4):  # three delta segments: the second starts a compaction
+        for m in moves:
+            q.set(state, m, state / 10)
+        q.save(path)
+    q.set(99, moves[0], 0.5)  # unsaved change
+    q.wait()
+    assert len(list(q.overlay.items())) < 3 * len(moves)  # compacted entries left the overlay
+    assert q.get(99, moves[0]) == 0.5
+    for state in range(1, 4):
+        assert abs(q.get(state, moves[-1]) - state / 10) < 1e-6
+    q.save(path)
+    q.wait()
+    reopened = open_qtable(path)
+    assert abs(reopened.get(3, moves[0]) - 0.3) < 1e-6 and reopened.get(99, moves[0]) == 0.5
+
+
+def fake_engine(name: str) -> list:
+    return [sys.executable, str(Path(__file__).with_name("fake_uci.py")), name]
+
+
+def test_eval_label_names_engine_and_options():
+    labels = []
+    for name, threads in (("Alpha", 1), ("Beta", 1), ("Alpha", 2)):
+        pool = EnginePool(fake_engine(name), threads=threads)
+        try:
+            labels.append(ChessAI(engine=pool).eval_label)
+        finally:
+            pool.quit()
+    assert "Alpha by PyBot tests" in labels[0] and "Threads=1" in labels[0]
+    assert len(set(labels)) == 3  # another binary or option set never shares memo entries
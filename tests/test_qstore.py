@@ -0,0 +1,57 @@
+# tests/test_qstore.py
+import random
+
+import qstore
+from chess_ai import StoredQTable
+
+
+def random_entries(rng: random.Random, n: int, states: int = 50):
+    # quarter steps are exact in float32, so values compare with ==
+    return [(rng.randrange(1, states), rng.randrange(1, 4096), rng.randrange(-40, 40) / 4) for _ in range(n)]
+
+
+def test_write_table_round_trip(tmp_path):
+    rng = random.Random(1)
+    entries = random_entries(rng, 2000)
+    expected = {(s, c): v for s, c, v in entries}  # later duplicates win
+    path = str(tmp_path / "q.pbq")
+    assert qstore.write_table(path, entries) == len(expected)
+    table = qstore.MappedTable(path)
+    assert len(table) == len(expected)
+    assert list(table.items()) == [(s, c, expected[(s, c)]) for s, c in sorted(expected)]
+    for (s, c), v in expected.items():
+        assert table.lookup(s, c) == v
+    assert table.lookup(0, 1) is None and table.lookup(10 ** 6, 1) is None
+    for s in range(1, 50):
+        assert dict(table.moves_of(s)) == {c: v for (s2, c), v in expected.items() if s2 == s}
+
+
+def write_segmented(path: str, rng: random.Random, segments: int = 4) -> dict:
+    """A base plus delta segments that overwrite each other's keys; returns the merged view."""
+    merged = {}
+    for i in range(segments + 1):
+        entries = random_entries(rng, 300, states=20)
+        qstore.write_table(path if i == 0 else qstore.next_segment_path(path), entries)
+        merged.update({(s, c): v for s, c, v in entries})
+    return merged
+
+
+def test_later_segments_take_precedence(tmp_path):
+    path = str(tmp_path / "q.pbq")
+    merged = write_segmented(path, random.Random(2))
+    assert len(qstore.segment_paths(path)) == 4
+    q = StoredQTable()
+    q.load(path)
+    for (s, c), v in merged.items():
+        assert q._lookup(s, c) == v
+    assert len(q) == len(merged)
+    q.set(1, "e2e4", 9.5)  # unsaved overlay beats every file
+    assert q.get(1, "e2e4") == 9.5
+
+
+def test_compact_matches_merged_view(tmp_path):
+    path = str(tmp_path / "q.pbq")
+    merged = write_segmented(path, random.Random(3))
+    assert qstore.compact(path) == len(merged)
+    assert qstore.segment_paths(path) == []
+    assert list(qstore.MappedTable(path).items()) == [(s, c, merged[(s, c)]) for s, c in sorted(merged)]
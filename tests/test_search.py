@@ -0,0 +1,17 @@
+# tests/test_search.py
+import chess
+import chess.engine
+import pytest
+
+from search import Searcher
+
+
+@pytest.mark.parametrize("fen, expected", [
+    ("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", chess.engine.Cp(0)),       # stalemate
+    ("8/8/8/3k4/8/3K4/8/8 w - - 0 1", chess.engine.Cp(0)),        # insufficient material
+    ("7k/6Q1/6K1/8/8/8/8/8 b - - 0 1", chess.engine.Mate(-0)),    # checkmated
+])
+def test_finished_root_scores(fen, expected):
+    info = Searcher().analyse(chess.Board(fen), chess.engine.Limit(depth=2))
+    assert info["score"].relative == expected
+    assert info["pv"] == []
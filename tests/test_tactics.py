@@ -0,0 +1,38 @@
+# tests/test_tactics.py
+import chess
+import pytest
+
+import tactics
+from tactics import Fork, Pin
+
+
+@pytest.mark.parametrize("fen, square, expected", [
+    # NxP, PxN, RxP, BxR, QxB, RxQ: white gives up a knight for a pawn
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", chess.E5, -220),
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", chess.E5, 100),       # undefended pawn
+    ("4k3/8/4p3/3p4/8/4N3/8/4K3 w - - 0 1", chess.D5, -220),                  # pawn-defended pawn
+    ("k7/4r3/8/4p3/8/8/4R3/4R2K w - - 0 1", chess.E5, 100),                   # x-ray: the back rook recaptures
+    ("4k3/8/5p2/4q3/8/8/4R3/4K3 w - - 0 1", chess.E5, 400),                   # defended queen
+    ("4k3/8/8/4p3/8/8/8/4K3 w - - 0 1", chess.E5, 0),                         # no attacker
+    ("4k3/8/8/8/8/8/4R3/4K3 w - - 0 1", chess.E5, 0),                         # empty square
+])
+def test_see(fen, square, expected):
+    assert tactics.see(chess.Board(fen), square, chess.WHITE) == expected
+
+
+def test_absolute_pin():
+    board = chess.Board("4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1")
+    assert tactics.pins(board, chess.WHITE) == [Pin(chess.E2, chess.E7, chess.E1)]
+    assert tactics.analyse(board).pins == [Pin(chess.E2, chess.E7, chess.E1)]
+    board.set_piece_at(chess.E3, chess.Piece(chess.KNIGHT, chess.WHITE))  # two blockers: no pin
+    assert tactics.pins(board, chess.WHITE) == []
+
+
+def test_fork_of_a_loose_piece():
+    # Ne5 hits the rook (worth more) and a knight that only counts while nothing defends it
+    board = chess.Board("4k3/3r4/6n1/4N3/8/8/8/4K3 w - - 0 1")
+    assert tactics.hanging_pieces(board, chess.BLACK) == [(chess.D7, 180), (chess.G6, 320)]  # NxR, Kxd7
+    assert tactics.analyse(board).forks == [Fork(chess.E5, chess.WHITE, (chess.G6, chess.D7))]
+    board.set_piece_at(chess.H7, chess.Piece(chess.PAWN, chess.BLACK))  # ...h7 guards g6
+    rep = tactics.analyse(board)
+    assert rep.hanging[chess.BLACK] == [chess.D7] and rep.forks == []
@@ -0,0 +1,47 @@
+# tests/test_train_pybot.py
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+import chess
+import pytest
+
+from chess_ai import ChessAI
+from train_pybot import GAMES
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def train(cwd: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, str(ROOT / "train_pybot.py"), *args], cwd=cwd,
+                          capture_output=True, text=True, timeout=300)
+
+
+def test_workers_ignore_stale_file_at_save(tmp_path):
+    # a dict-format table left at --save must not reach workers training a compact table
+    assert train(tmp_path, "--games", "2", "--save", "q.json").returncode == 0
+    run = train(tmp_path, "--games", "6", "--workers", "2", "--qtable", "compact", "--save", "q.json")
+    assert run.returncode == 0, run.stderr
+    assert "Game 6/6" in run.stdout
+
+
+class CaptureStart(chess.Board):
+    """White to move, its e4 pawn can take an undefended queen on d5."""
+
+    def __init__(self, fen: Optional[str] = "4k3/8/8/3q4/4P3/8/8/4K3 w - - 0 1", **kwargs):
+        super().__init__(fen, **kwargs)
+
+
+@pytest.mark.parametrize("loop", sorted(GAMES))
+def test_capture_gets_positive_reward(loop, monkeypatch):
+    # evaluate() scores for the side to move, which is the opponent once the learner has moved
+    monkeypatch.setattr(chess, "Board", CaptureStart)
+    bot = ChessAI(epsilon=0.0)
+    bot.choose_move = lambda board, **kwargs: chess.Move.from_uci("e4d5")
+    rewards = []
+    bot.update = lambda s, a, reward, s_next: rewards.append((a, reward))
+    GAMES[loop](bot, max_moves=1)
+    move, reward = rewards[0]
+    assert move == chess.Move.from_uci("e4d5")
+    assert reward > 0
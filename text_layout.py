@@ -0,0 +1,107 @@
+# text_layout.py
+# Text layout for the pygame sidebar. Per font: a glyph-advance table filled lazily from
+# font.metrics(), word wrapping memoised by (text, width), and rendered line surfaces in an
+# LRU cache — so a frame that shows the same commentary does no measuring or rendering.
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import pygame
+
+
+class TextLayout:
+    """
+    Layout and rendering for one pygame font.
+    - width() sums cached glyph advances. Hinting and kerning make that an estimate, so
+      wrap() uses it to place each break and confirms it with font.size (about two calls
+      per wrapped line instead of one per word); the result matches plain greedy wrapping.
+    - wrap() and render() results are memoised with LRU eviction.
+    """
+
+    def __init__(self, font: pygame.font.Font, max_layouts: int = 2048, max_surfaces: int = 512):
+        self.font = font
+        self.advances: Dict[str, int] = {}
+        self.layouts: "OrderedDict[Tuple[str, int], Tuple[str, ...]]" = OrderedDict()
+        self.surfaces: "OrderedDict[Tuple[str, tuple], pygame.Surface]" = OrderedDict()
+        self.max_layouts = max_layouts
+        self.max_surfaces = max_surfaces
+
+    def width(self, text: str) -> int:
+        adv = self.advances
+        try:
+            return sum(adv[c] for c in text)
+        except KeyError:
+            missing = "".join(set(text).difference(adv))
+            for ch, m in zip(missing, self.font.metrics(missing)):
+                adv[ch] = m[4] if m else self.font.size(ch)[0]  # no glyph: ask the font
+            return sum(adv[c] for c in text)
+
+    def wrap(self, text: str, max_px: int) -> Tuple[str, ...]:
+        """Word-wrap one line so each piece fits within max_px pixels."""
+        key = (text, max_px)
+        lines = self.layouts.get(key)
+        if lines is not None:
+            self.layouts.move_to_end(key)
+            return lines
+        lines = self.layouts[key] = self._wrap(text, max_px)
+        if len(self.layouts) > self.max_layouts:
+            self.layouts.popitem(last=False)
+        return lines
+
+    def render(self, text: str, color) -> pygame.Surface:
+        key = (text, tuple(color))
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            return surf
+        surf = self.surfaces[key] = self.font.render(text, True, color)
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def _wrap(self, text: str, max_px: int) -> Tuple[str, ...]:
+        words = text.split()
+        if not words:
+            return ("",)
+        fits = lambda k: self.font.size(" ".join(words[i:i + k]))[0] <= max_px
+        space = self.width(" ")
+        lines: List[str] = []
+        i = 0
+        while i < len(words):
+            # estimate: as many words as the advance table says fit
+            k, w = 1, self.width(words[i])
+            while i + k < len(words) and w + space + self.width(words[i + k]) <= max_px:
+                w += space + self.width(words[i + k])
+                k += 1
+            # confirm with the real metric and nudge the break
+            if fits(k):
+                while i + k < len(words) and fits(k + 1):
+                    k += 1
+            else:
+                while k > 1 and not fits(k):
+                    k -= 1
+            lines.append(" ".join(words[i:i + k]))
+            i += k
+        return tuple(lines)
+
+
+_LAYOUTS: Dict[int, TextLayout] = {}
+
+def layout_for(font: pygame.font.Font) -> TextLayout:
+    """The shared TextLayout of a font (keeps the font alive, so its id stays unique)."""
+    layout = _LAYOUTS.get(id(font))
+    if layout is None:
+        layout = _LAYOUTS[id(font)] = TextLayout(font)
+    return layout
+
+def wrap_lines_by_width(lines: List[str], font: pygame.font.Font, max_px: int) -> List[str]:
+    """Word-wrap lines so each rendered line fits within max_px pixels."""
+    layout = layout_for(font)
+    wrapped: List[str] = []
+    for line in lines:
+        wrapped.extend(layout.wrap(line, max_px))
+    return wrapped
+
+def render_text(font: pygame.font.Font, text: str, color) -> pygame.Surface:
+    """font.render() memoised by (font, text, color)."""
+    return layout_for(font).render(text, color)
@@ -1,21 +1,42 @@
 
 import argparse
 import json
+import multiprocessing as mp
 import random
 from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 
 import chess
 
-from chess_ai import ChessAI
+from chess_ai import ChessAI, EvalMemo, StoredQTable, open_qtable, transform_move
+from engine_pool import EnginePool
+from replay import ReplayBuffer
+from book import OpeningBook
+from rollout import Rollout
+from perf import SPANS, instrument, timed
 
-def play_training_game(bot: ChessAI, opponent="random", max_moves=200):
+# (state, move uci, reward, next state) — exactly the arguments of one ChessAI.update call
+Transition = Tuple[object, str, float, object]
+
+def play_training_game(bot: ChessAI, opponent="random", max_moves=200,
+                       transitions: Optional[List[Transition]] = None):
     board = chess.Board()
     history = []
+    # With an engine pool (or NumPy piece-square eval), rewards are scored in one batch after the game
+    deferred = bot.batched_eval
+    pending = []
+    pushed = bot.replay.pushed if bot.replay is not None else 0
+
+    def learn(s, move: chess.Move, reward: float, s_next):
+        bot.remember(s, move, reward, s_next)
+        if transitions is not None:
+            transitions.append((s, move.uci(), reward, s_next))
+
     while not board.is_game_over() and len(history) < max_moves:
-        s = bot.state(board)
+        s, sym = bot.frame(board)
 
         if board.turn == chess.WHITE:
-            move = bot.choose_move(board)
+            move = bot.choose_move(board, state=s, sym=sym)
         else:
             # Opponent policy
             if opponent == "random":
@@ -27,10 +48,19 @@ def play_training_game(bot: ChessAI, opponent="random", max_moves=200):
 
         # Reward after bot's own move only (skip after opponent)
         if board.turn == chess.BLACK:  # just played as WHITE
-            reward = bot.evaluate(board) / 100.0  # scale
             s_next = bot.state(board)
-            bot.update(s, move, reward, s_next)
-            history.append((s, move.uci(), reward))
+            a = transform_move(move, sym)  # in s's frame (a no-op unless bot.symmetry)
+            if deferred:
+                pending.append((s, a, board.copy(stack=False), s_next))
+            else:
+                reward = -bot.evaluate(board) / 100.0  # evaluate() is for the side to move: the opponent now
+                learn(s, a, reward, s_next)
+            history.append((s, a.uci()))
+
+    if pending:
+        scores = bot.evaluate_many([b for _, _, b, _ in pending])
+        for (s, move, _, s_next), cp in zip(pending, scores):
+            learn(s, move, -cp / 100.0, s_next)
 
     # Final terminal reward
     if board.is_game_over():
@@ -39,12 +69,151 @@ def play_training_game(bot: ChessAI, opponent="random", max_moves=200):
     else:
         terminal_reward = 0.0
     if history:
-        s_last, a_last, _ = history[-1]
-        bot.update(s_last, chess.Move.from_uci(a_last), terminal_reward, bot.state(board))
+        s_last, a_last = history[-1]
+        learn(s_last, chess.Move.from_uci(a_last), terminal_reward, bot.state(board))
+    if bot.replay is not None:
+        bot.learn_from_replay(bot.replay.pushed - pushed)
 
     return board.result() if board.is_game_over() else "unfinished"
 
-def main():
+def play_rollout_game(bot: ChessAI, opponent="random", max_moves=200,
+                      transitions: Optional[List[Transition]] = None):
+    """play_training_game on a Rollout: one move generation per ply (shared by the game-over
+    test and the move choice), the random opponent's move sampled lazily, and each state key
+    computed once (the learner's next state is not rehashed for its next move)."""
+    game = Rollout()
+    board = game.board
+    deferred = bot.batched_eval
+    pending = []
+    pushed = bot.replay.pushed if bot.replay is not None else 0
+    s_last = a_last = None
+    plies = 0
+
+    def learn(s, move: chess.Move, reward: float, s_next):
+        bot.remember(s, move, reward, s_next)
+        if transitions is not None:
+            transitions.append((s, move.uci(), reward, s_next))
+
+    while plies < max_moves:
+        # learner (White)
+        legal = game.legal_moves()
+        if game.over:
+            break
+        s, sym = bot.frame(board)
+        move = bot.choose_move(board, state=s, legal=legal, sym=sym)
+        game.push(move)
+        s_next = bot.state(board)
+        a = transform_move(move, sym)
+        if deferred:
+            pending.append((s, a, board.copy(stack=False), s_next))
+        else:
+            learn(s, a, -bot.evaluate(board) / 100.0, s_next)  # the mover's view: evaluate() is the opponent's
+        s_last, a_last, plies = s, a, plies + 1
+        if game.over:
+            break
+        # opponent (Black)
+        move = game.random_move()
+        if move is None:
+            break
+        game.push(move)
+        if game.over:
+            break
+
+    if pending:
+        scores = bot.evaluate_many([b for _, _, b, _ in pending])
+        for (s, move, _, s_next), cp in zip(pending, scores):
+            learn(s, move, -cp / 100.0, s_next)
+
+    terminal_reward = {"1-0": 1.0, "0-1": -1.0}.get(game.result, 0.0)
+    if s_last is not None:
+        learn(s_last, a_last, terminal_reward, bot.state(board))
+    if bot.replay is not None:
+        bot.learn_from_replay(bot.replay.pushed - pushed)
+
+    return game.result or "unfinished"
+
+GAMES = {"fast": play_rollout_game, "full": play_training_game}
+
+def epsilon_at(epsilon0: float, g: int) -> float:
+    """Exploration rate for game g (1-based) under the per-game decay used by main()."""
+    return max(0.01, epsilon0 * 0.98 ** (g - 1))
+
+# ---------------- parallel self-play ----------------
+# Workers play games against their own copy of the Q-table and send back the transitions;
+# the learner (main process) replays them through ChessAI.update in game order, so the saved
+# table matches what one process would learn from the same games. Workers refresh their copy
+# from the learner's last checkpoint whenever a newer one exists.
+_worker_bot: Optional[ChessAI] = None
+_worker_version = 0
+_worker_rollout = "fast"
+
+def make_bot(args) -> ChessAI:
+    """ChessAI for training; with --engine-pool N>1 its engine is a pool of N processes."""
+    engine = None
+    if args.engine and args.engine_pool > 1:
+        try:
+            engine = EnginePool(args.engine, size=args.engine_pool, threads=args.engine_threads, hash_mb=args.engine_hash)
+        except Exception as e:
+            print(f"[PyBot] Engine pool failed to start: {e}. Falling back to one engine.")
+    memo = None
+    if args.engine and (args.eval_memo > 0 or args.eval_memo_db):
+        memo = EvalMemo(size=args.eval_memo, path=args.eval_memo_db or None)
+    int_keys = args.qtable != "dict" and args.policy != "linear"
+    replay = ReplayBuffer(args.replay, int_keys=int_keys) if args.replay > 0 else None
+    return ChessAI(engine_path=args.engine or None, alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon,
+                   qtable=args.qtable, engine=engine, memo=memo, positional=args.pst,
+                   policy=args.policy, search_time=args.search_time,
+                   replay=replay, replay_batch=args.replay_batch, replay_ratio=args.replay_ratio,
+                   book=OpeningBook(args.book) if args.book else None, symmetry=args.symmetry)
+
+def _init_worker(args) -> None:
+    global _worker_bot, _worker_rollout
+    _worker_rollout = args.rollout
+    random.seed()  # fresh entropy per process, or every worker would play the same games
+    _worker_bot = make_bot(args)
+
+def _worker_game(task: Tuple[int, float, str, int]) -> Tuple[int, str, List[Transition], Tuple[int, int]]:
+    global _worker_version
+    g, epsilon, checkpoint, version = task
+    bot = _worker_bot
+    if version > _worker_version:
+        try:
+            bot.q = open_qtable(checkpoint)
+            _worker_version = version
+        except (OSError, ValueError):
+            pass  # checkpoint mid-write/compaction: keep playing with the copy we have
+    bot.epsilon = epsilon
+    transitions: List[Transition] = []
+    memo = bot.memo
+    before = (memo.hits, memo.misses) if memo is not None else (0, 0)
+    result = GAMES[_worker_rollout](bot, transitions=transitions)
+    if memo is not None:
+        memo.flush()  # share new evaluations with the other workers through the disk tier
+    after = (memo.hits, memo.misses) if memo is not None else (0, 0)
+    return g, result, transitions, (after[0] - before[0], after[1] - before[1])
+
+def parallel_games(bot: ChessAI, args, checkpoint_version) -> Iterator[Tuple[int, str]]:
+    """Yield (game number, result) in order, after applying that game's transitions to `bot`.
+    Games are dispatched in rounds of 2 per worker so each round sees the latest checkpoint."""
+    ctx = mp.get_context("spawn")  # don't fork the learner's engine process / threads
+    with ctx.Pool(args.workers, initializer=_init_worker, initargs=(args,)) as pool:
+        g = 1
+        while g <= args.games:
+            last = min(args.games, g + 2 * args.workers - 1)
+            tasks = [(i, epsilon_at(args.epsilon, i), args.save, checkpoint_version())
+                     for i in range(g, last + 1)]
+            for i, result, transitions, (hits, misses) in pool.imap(_worker_game, tasks):
+                for s, a, reward, s_next in transitions:
+                    bot.remember(s, chess.Move.from_uci(a), reward, s_next)
+                if bot.replay is not None:
+                    bot.learn_from_replay(len(transitions))
+                if bot.memo is not None:  # report the workers' memo traffic as our own
+                    bot.memo.hits += hits
+                    bot.memo.misses += misses
+                yield i, result
+            g = last + 1
+
+def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Train PyBot (tiny Q-learning chess)")
     p.add_argument("--engine", type=str, default="", help="Path to a UCI engine (e.g., stockfish). Optional.")
     p.add_argument("--games", type=int, default=20, help="Number of self-play (vs random) games to train.")
@@ -53,18 +222,72 @@ def main():
     p.add_argument("--epsilon", type=float, default=0.2, help="Exploration rate.")
     p.add_argument("--alpha", type=float, default=0.1, help="Learning rate.")
     p.add_argument("--gamma", type=float, default=0.9, help="Discount factor.")
-    args = p.parse_args()
+    p.add_argument("--workers", type=int, default=1, help="Self-play processes (1 = play in this process).")
+    p.add_argument("--engine-pool", type=int, default=1, help="Engine processes per trainer; >1 scores each game's positions concurrently.")
+    p.add_argument("--engine-threads", type=int, default=1, help="UCI Threads option for pooled engines.")
+    p.add_argument("--engine-hash", type=int, default=16, help="UCI Hash (MB) option for pooled engines.")
+    p.add_argument("--policy", type=str, default="q", choices=["q", "search", "linear"],
+                   help="Learner's move choice (ε-greedy): Q-table, the built-in alpha-beta search, or a linear "
+                        "Q-function over move features (constant memory; --qtable is ignored, --replay N trains it "
+                        "in batches).")
+    p.add_argument("--search-time", type=float, default=0.05, help="Seconds per move for --policy search.")
+    p.add_argument("--replay", type=int, default=0, help="Experience-replay buffer size in transitions (0 = learn online, one update per move).")
+    p.add_argument("--replay-batch", type=int, default=256, help="Transitions per batched replay update.")
+    p.add_argument("--replay-ratio", type=float, default=1.0, help="Replayed transitions per new transition.")
+    p.add_argument("--book", type=str, action="append", default=[],
+                   help="Opening book(s) the learner plays from (Polyglot .bin or book.py JSON); book moves aren't explored.")
+    p.add_argument("--pst", action="store_true", help="Without an engine, add piece-square tables to the material reward.")
+    p.add_argument("--eval-memo", type=int, default=100000, help="Engine evaluations remembered in memory (0 disables).")
+    p.add_argument("--eval-memo-db", type=str, default="", help="Optional sqlite file that keeps engine evaluations across runs.")
+    p.add_argument("--qtable", type=str, default="dict", choices=["dict", "compact", "stored"],
+                   help="Q-table backend: 'dict' (JSON file), 'compact' (Zobrist-keyed arrays, binary file) or "
+                        "'stored' (mmap'd binary base + delta checkpoints; use the same --load and --save path).")
+    p.add_argument("--symmetry", action="store_true",
+                   help="Share Q-values between a position and its colour-flipped (and, without castling rights, "
+                        "left-right) mirror; play the table with the same flag.")
+    p.add_argument("--rollout", type=str, default="fast", choices=sorted(GAMES),
+                   help="Game loop: 'fast' (one move generation per ply, lazy random opponent) or 'full' (the original python-chess loop).")
+    p.add_argument("--perf", action="store_true",
+                   help="time games, evaluate/update and engine calls; p50/p95/p99 table with each log line "
+                        "(with --workers, only the learner's side is timed)")
+    p.add_argument("--trace", type=str, default="",
+                   help="write every timing span to a trace file (Chrome trace JSON; .jsonl: one span per line)")
+    return p
+
+def main():
+    args = build_parser().parse_args()
 
-    bot = ChessAI(engine_path=args.engine or None, alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon)
+    bot = make_bot(args)
+    perf = args.perf or bool(args.trace)
+    if perf:
+        # per-move calls are wrapped only when asked for, so plain training pays nothing
+        SPANS.enabled = True
+        if args.trace:
+            SPANS.open_trace(args.trace)
+        instrument(bot, ("choose_move", "evaluate", "evaluate_many", "update", "update_batch", "learn_from_replay"),
+                   prefix="ChessAI.")
+        if bot.engine is not None:
+            instrument(bot.engine, ("analyse", "analyse_many"), prefix="engine.")
 
     # Optional: load prior knowledge
     if args.load and Path(args.load).exists():
         bot.q.load(args.load)
-        print(f"[PyBot] Loaded Q-table from {args.load}")
+        print(f"[PyBot] Loaded Q-table from {args.load} ({len(bot.q)} entries)")
+
+    saves = 0
+    if args.workers > 1:
+        # workers start from the learner's own table: a file already at --save may be stale
+        # or another backend, so only ever hand them a checkpoint this run wrote
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        bot.q.save(args.save)
+        saves = 1
+        games = parallel_games(bot, args, lambda: saves)
+    else:
+        play = timed("play_training_game")(GAMES[args.rollout])
+        games = ((g, play(bot)) for g in range(1, args.games + 1))
 
     wins = draws = losses = 0
-    for g in range(1, args.games + 1):
-        result = play_training_game(bot)
+    for g, result in games:
         if result == "1-0":
             wins += 1
         elif result == "0-1":
@@ -73,14 +296,23 @@ def main():
             draws += 1
 
         # Light epsilon decay so it starts exploring then exploits a bit more
-        bot.epsilon = max(0.01, bot.epsilon * 0.98)
+        bot.epsilon = epsilon_at(args.epsilon, g + 1)
 
         if g % 5 == 0 or g == args.games:
             Path(args.save).parent.mkdir(parents=True, exist_ok=True)
             bot.q.save(args.save)
-            print(f"[PyBot] Game {g}/{args.games} → W:{wins} D:{draws} L:{losses} | ε={bot.epsilon:.3f} | saved {args.save}")
+            saves += 1
+            memo = f" | {bot.memo.stats()}" if bot.memo is not None else ""
+            print(f"[PyBot] Game {g}/{args.games} → W:{wins} D:{draws} L:{losses} | ε={bot.epsilon:.3f}{memo} | saved {args.save}")
+            if perf:
+                print(SPANS.report())
 
+    if isinstance(bot.q, StoredQTable):
+        bot.q.wait()  # let a background compaction finish
     bot.close()
+    if isinstance(bot.engine, EnginePool):
+        bot.engine.quit()
+    SPANS.close_trace()
     print("[PyBot] Done. Q-table saved to", args.save)
 
 if __name__ == "__main__":